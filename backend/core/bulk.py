@@ -0,0 +1,31 @@
+from django.db import connection
+
+# Toplu yazımlarda tek seferde gönderilecek satır sayısı
+BULK_BATCH_SIZE = 2000
+
+
+def bulk_update_rows(model, fields, objs, batch_size=BULK_BATCH_SIZE, increments=()):
+    """
+    bulk_update'in ürettiği büyük CASE WHEN ifadesi yerine tek satırlık parametreli
+    UPDATE'i executemany ile parça parça çalıştırır (on binlerce satırda çok daha hızlı).
+    increments içindeki alanlar üzerine yazılmaz, nesnedeki değer kadar artırılır
+    ('alan = alan + %s'); böylece okuma ile yazma arasındaki eş zamanlı değişiklikler korunur.
+    """
+    meta = model._meta
+    qn = connection.ops.quote_name
+    columns = [meta.get_field(name) for name in fields]
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        qn(meta.db_table),
+        ', '.join(
+            ('%s = %s + %%s' % (qn(field.column), qn(field.column))) if field.name in increments
+            else '%s = %%s' % qn(field.column)
+            for field in columns
+        ),
+        qn(meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), batch_size):
+            cursor.executemany(sql, [
+                [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in columns] + [obj.pk]
+                for obj in objs[start:start + batch_size]
+            ])
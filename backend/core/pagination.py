@@ -0,0 +1,140 @@
+import base64
+import json
+from datetime import date, datetime
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Sıralama anahtarına göre (ör. transaction_date, id) sayfalama. İmleç son satırın anahtar
+    değerlerini taşır; sonraki sayfa OFFSET yerine 'anahtar < son anahtar' koşuluyla indeksten
+    okunur. Bu yüzden sayfa maliyeti sabittir ve araya yeni kayıt girse de satır atlanmaz/tekrarlanmaz.
+
+    Sıralama view'daki keyset_ordering ile verilir; son alan benzersiz olmalıdır (id).
+    ?page_size= ile sayfa boyutu, ?count=1 ile yaklaşık toplam kayıt sayısı istenebilir.
+    """
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+        self.count = None
+
+        if request.query_params.get(self.count_query_param) in ('1', 'true', 'True'):
+            self.count = approximate_count(queryset)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        page = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.next_cursor = None
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, settings.LIST_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "Sayfa boyutu bir sayı olmalı."})
+        return min(max(size, 1), settings.LIST_MAX_PAGE_SIZE)
+
+    def after(self, values):
+        return keyset_after(self.ordering, values)
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.ordering:
+            # values() sorgularında satırlar dict olarak gelir
+            value = obj[name.lstrip('-')] if isinstance(obj, dict) else getattr(obj, name.lstrip('-'))
+            values.append(value.isoformat() if isinstance(value, (date, datetime)) else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        return decode_cursor(cursor, self.fields, self.cursor_query_param)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        response = {"next": self.get_next_link(), "next_cursor": self.next_cursor}
+        if self.count is not None:
+            response["count"], response["count_is_estimate"] = self.count
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+
+def decode_cursor(cursor, fields, param='cursor'):
+    """
+    İmleçteki anahtar değerlerini çözer; her değer sıralama alanının to_python'u ile tipine
+    çevrilir. Bozuk, eksik ya da tipi uymayan imleç 400 (ValidationError) olarak döner.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        values = None
+    if isinstance(values, list) and len(values) == len(fields):
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (DjangoValidationError, TypeError, ValueError):
+            values = None
+        if values is not None and None not in values:
+            return values
+    raise ValidationError({param: "Geçersiz sayfa imleci."})
+
+
+def keyset_after(ordering, values):
+    """
+    Sıralamada (a, b) anahtarından sonraki satırlar: a <= x AND (a < x OR (a = x AND b < y)).
+    Baştaki aralık koşulu, veritabanının ilk alanın indeksinden doğrudan okumasını sağlar.
+    """
+    fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+    condition = Q()
+    for i, (field, descending) in enumerate(fields):
+        equal = {name: value for (name, _), value in zip(fields[:i], values[:i])}
+        condition |= Q(**equal, **{f"{field}__{'lt' if descending else 'gt'}": values[i]})
+    first, descending = fields[0]
+    return Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+
+def approximate_count(queryset):
+    """
+    Ucuz toplam kayıt sayısı: (sayı, tahmin mi). PostgreSQL'de filtresiz listelerde tablo
+    istatistiğinden okunur; diğer durumlarda en fazla LIST_COUNT_LIMIT satıra kadar sayılır.
+    """
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return int(row[0]), True
+    limit = settings.LIST_COUNT_LIMIT
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count > limit
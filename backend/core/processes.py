@@ -0,0 +1,10 @@
+def setup_django(database_name):
+    """
+    'spawn' ile başlatılan havuz süreçlerinin başlangıç fonksiyonu: Django kurulur ve ana süreçle
+    aynı veritabanına bağlanılır (testlerde ana süreç test veritabanını kullanır). Bu modül
+    modelleri içe aktarmaz; aksi halde çocuk süreç onu Django kurulmadan yüklerken hata verirdi.
+    """
+    import django
+    django.setup()
+    from django.db import connection
+    connection.settings_dict['NAME'] = database_name
@@ -34,16 +34,63 @@ ROOT_URLCONF = 'core.urls'
 TEMPLATES = [{'BACKEND': 'django.template.backends.django.DjangoTemplates','DIRS': [],'APP_DIRS': True,'OPTIONS': {'context_processors': ['django.template.context_processors.request','django.contrib.auth.context_processors.auth','django.contrib.messages.context_processors.messages',],},},]
 WSGI_APPLICATION = 'core.wsgi.application'
 
-DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3','NAME': BASE_DIR / 'db.sqlite3',}}
+# IMMEDIATE: yazma kilidi işlem başında alınır; eş zamanlı yazan thread'ler (içe aktarma
+# işleri, satışlar) kilit yükseltirken "database is locked" almak yerine sırayla bekler.
+# Testler de dosya üzerinde çalışır: bellek içi paylaşımlı SQLite bekleme süresini yok sayar.
+DATABASES = {'default': {
+    'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3',
+    'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+    'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+}}
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 STATIC_URL = 'static/'
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # --- GÜVENLİ CORS AYARLARI ---
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
-CSRF_TRUSTED_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
\ No newline at end of file
+CSRF_TRUSTED_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
+
+# --- İÇE AKTARMA (EXCEL/CSV) AYARLARI ---
+# Bu boyuttan büyük dosyalar parça parça (sabit bellekle) işlenir
+IMPORT_STREAM_MIN_BYTES = 5 * 1024 * 1024
+IMPORT_STREAM_CHUNK_SIZE = 10000
+# Yüklemeler arka planda bu kadar paralel işlenir (süreç içi thread havuzu)
+IMPORT_WORKERS = 2
+# ZIP içindeki dosyaları okuyan süreç sayısı (None: CPU sayısı, 0: havuz kullanma)
+IMPORT_PARSE_PROCESSES = None
+# True ise işler kuyruğa alınmadan istek içinde çalışır (testler için)
+IMPORT_JOBS_SYNC = False
+# Bu kadar saniye ilerleme kaydetmeyen iş sahipsiz sayılır (recover_import_jobs, tekrar yükleme kontrolü)
+IMPORT_JOB_STALE_SECONDS = 30 * 60
+
+# --- RAPOR ÖNBELLEĞİ ---
+# Dashboard/rapor yanıtları veri sürümüne göre önbelleğe alınır; Transaction, Expense veya
+# Product yazıldığında sürüm artar ve eski yanıtlar kendiliğinden geçersiz olur.
+# Birden fazla süreçle çalışırken FileBasedCache ile tüm süreçler aynı önbelleği görür.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'karlilik-raporlari',
+    }
+}
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# --- LİSTE SAYFALAMA ---
+# İşlem ve ürün listeleri imleçle (keyset) sayfalanır; ?page_size= bu üst sınırla kısıtlanır
+LIST_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 1000
+# ?count=1 istendiğinde en fazla bu kadar satır sayılır (fazlası "en az" olarak döner)
+LIST_COUNT_LIMIT = 10000
+
+# --- MALİYET YÖNTEMİ ---
+# 'AVERAGE': satış maliyeti ürünün ağırlıklı ortalama maliyetidir.
+# 'FIFO': satışlar alış katmanlarını giriş sırasıyla tüketir (bkz. products/costing.py).
+# Kurulum sonradan FIFO'ya geçirilirse önce 'manage.py reset_cost_layers' çalıştırılmalıdır.
+INVENTORY_COSTING = 'AVERAGE'
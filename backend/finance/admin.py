@@ -1,8 +1,13 @@
 from django.contrib import admin
-from .models import Transaction
+from .models import Transaction, DailyRollup
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'transaction_type', 'marketplace', 'product', 'sale_price', 'quantity', 'transaction_date')
+    list_display = ('order_number', 'transaction_type', 'marketplace', 'product', 'sale_price', 'quantity', 'net_profit', 'transaction_date')
     search_fields = ('order_number',)
-    list_filter = ('transaction_type', 'marketplace', 'transaction_date')
\ No newline at end of file
+    list_filter = ('transaction_type', 'marketplace', 'transaction_date')
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'transaction_type', 'marketplace', 'product', 'revenue', 'profit', 'quantity', 'transaction_count')
+    list_filter = ('transaction_type', 'marketplace', 'date')
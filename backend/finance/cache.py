@@ -0,0 +1,68 @@
+import functools
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+DATA_VERSION_KEY = 'finance:data_version'
+HITS_KEY = 'finance:cache_hits'
+MISSES_KEY = 'finance:cache_misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Anahtar yoksa (ilk kullanım ya da önbellek temizlendi) baştan başlatılır
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def data_version():
+    return cache.get_or_set(DATA_VERSION_KEY, 1, timeout=None)
+
+
+def bump_data_version():
+    """
+    Veri sürümünü artırır; önbellekteki tüm rapor yanıtları geçersiz olur.
+    Commit'ten sonra bir kez daha artırılır: commit öncesi eski veriyle hesaplanıp yeni
+    sürüme yazılmış bir yanıt varsa o da geçersiz sayılır.
+    """
+    _incr(DATA_VERSION_KEY)
+    transaction.on_commit(lambda: _incr(DATA_VERSION_KEY))
+
+
+def cache_stats():
+    hits, misses = cache.get(HITS_KEY, 0), cache.get(MISSES_KEY, 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "data_version": data_version(),
+    }
+
+
+def cached_response(name, params=()):
+    """
+    APIView.get için: yanıtı uç nokta adı + verilen sorgu parametreleri + veri sürümü + bugünün
+    tarihi anahtarıyla önbellekten döner ("bugün", "bu ay" gibi varsayılan aralıklar gün
+    dönünce eski günün yanıtından verilmesin). Yalnızca 200 yanıtları önbelleğe alınır.
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            query = urlencode(sorted((p, request.query_params.get(p, '')) for p in params))
+            key = f"finance:response:{name}:{data_version()}:{timezone.localdate().isoformat()}:{query}"
+            data = cache.get(key)
+            if data is not None:
+                _incr(HITS_KEY)
+                return Response(data)
+            _incr(MISSES_KEY)
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
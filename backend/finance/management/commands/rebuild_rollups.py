@@ -0,0 +1,14 @@
+import time
+from django.core.management.base import BaseCommand
+from finance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Günlük özet tablosunu (DailyRollup) tüm işlemlerden sıfırdan yeniden kurar."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {count} özet satırı {time.perf_counter() - started:.2f} sn içinde yeniden oluşturuldu."
+        ))
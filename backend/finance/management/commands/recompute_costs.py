@@ -0,0 +1,33 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from finance.recompute import RECOMPUTE_CHUNK_SIZE, recompute_costs
+
+
+class Command(BaseCommand):
+    help = (
+        "İşlem geçmişini ürün bazında kronolojik olarak yeniden yürütür: ağırlıklı maliyet ve "
+        "satışların cost_at_transaction değerleri (toplam maliyet, net kâr, günlük özet ve stok "
+        "defteri dahil) yeniden yazılır. Geçmişte bir alış fiyatı düzeltildiğinde çalıştırılır. "
+        "Kesilirse aynı komutla kaldığı yerden devam eder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Paralel süreç sayısı (ürünler bölüştürülür)")
+        parser.add_argument('--chunk-size', type=int, default=RECOMPUTE_CHUNK_SIZE, help="Sayfa (kayıt noktası) başına satır")
+        parser.add_argument('--restart', action='store_true', help="Yarım kalmış çalışmayı yok sayıp baştan başla")
+
+    def handle(self, *args, **options):
+        if settings.INVENTORY_COSTING != 'AVERAGE':
+            raise CommandError("Bu komut ağırlıklı ortalama maliyet yöntemi içindir (INVENTORY_COSTING = 'AVERAGE').")
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers ve --chunk-size en az 1 olmalı.")
+        started = time.perf_counter()
+        try:
+            processed, changed = recompute_costs(options['workers'], options['chunk_size'], options['restart'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {processed} işlem yeniden yürütüldü, {changed} satırın maliyeti düzeltildi "
+            f"({time.perf_counter() - started:.2f} sn)."
+        ))
@@ -0,0 +1,82 @@
+# Generated by Django 6.0 on 2026-10-18 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_rollups(apps, schema_editor):
+    # Mevcut işlemler için özet tablosunu doldurur (sonradan: manage.py rebuild_rollups).
+    # İfadeler bu migration anındaki kurallarla burada tanımlıdır; finance.rollups sonradan değişebilir.
+    from decimal import Decimal
+    from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+    from django.db.models.functions import Coalesce, NullIf, TruncDate
+
+    money_field = DecimalField(max_digits=20, decimal_places=2)
+    # Adet 0 girilmiş satırlar maliyette 1 adet sayılır
+    line_cost = ExpressionWrapper(
+        F('cost_at_transaction') * Coalesce(NullIf(F('quantity'), Value(0)), Value(1)), output_field=money_field,
+    )
+    sale_profit = ExpressionWrapper(
+        F('sale_price') - (line_cost + F('commission_amount') + F('shipping_cost')), output_field=money_field,
+    )
+
+    def money(value):
+        return (value or Decimal('0')).quantize(Decimal('0.01'))
+
+    Transaction = apps.get_model('finance', 'Transaction')
+    DailyRollup = apps.get_model('finance', 'DailyRollup')
+    rows = (
+        Transaction.objects.annotate(day=TruncDate('transaction_date'))
+        .values('day', 'marketplace_id', 'product_id', 'transaction_type')
+        .annotate(
+            revenue=Sum('sale_price'), cost=Sum(line_cost), commission=Sum('commission_amount'),
+            shipping=Sum('shipping_cost'), total_quantity=Sum('quantity'), profit=Sum(sale_profit),
+            transaction_count=Count('id'),
+        )
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create([
+        DailyRollup(
+            date=row['day'], marketplace_id=row['marketplace_id'], product_id=row['product_id'],
+            transaction_type=row['transaction_type'], revenue=money(row['revenue']), cost=money(row['cost']),
+            commission=money(row['commission']), shipping=money(row['shipping']),
+            quantity=row['total_quantity'] or 0, profit=money(row['profit']),
+            transaction_count=row['transaction_count'],
+        )
+        for row in rows.iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_transaction_natural_key_idx'),
+        ('integrations', '0001_initial'),
+        ('products', '0002_product_barcode_product_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('SALE', 'Satış'), ('RETURN', 'İade'), ('CANCEL', 'İptal'), ('PURCHASE', 'Stok Alışı/Fatura')], max_length=10)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ciro')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ürün Maliyeti')),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Komisyon')),
+                ('shipping', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Kargo')),
+                ('quantity', models.IntegerField(default=0)),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Brüt Kâr')),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('marketplace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='integrations.marketplace')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Günlük Özet',
+                'indexes': [models.Index(fields=['transaction_type', 'date'], name='dailyrollup_type_date_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('product__isnull', False)), fields=('date', 'marketplace', 'product', 'transaction_type'), name='dailyrollup_unique_key'), models.UniqueConstraint(condition=models.Q(('product__isnull', True)), fields=('date', 'marketplace', 'transaction_type'), name='dailyrollup_unique_key_no_product')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
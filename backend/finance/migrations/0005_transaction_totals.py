@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_totals(apps, schema_editor):
+    # Mevcut satırlar tek bir UPDATE ile doldurulur (Transaction.calculate_totals ile aynı formül)
+    Transaction = apps.get_model('finance', 'Transaction')
+    total_cost = F('cost_at_transaction') * F('quantity') + F('commission_amount') + F('shipping_cost')
+    Transaction.objects.update(total_cost=total_cost, net_profit=F('sale_price') - total_cost)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='net_profit',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Net Kâr'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Toplam Maliyet'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_type', 'net_profit'], name='transaction_net_profit_idx'),
+        ),
+    ]
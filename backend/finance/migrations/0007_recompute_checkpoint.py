@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_transaction_date_indexes'),
+        ('integrations', '0004_importjob_error_report'),
+        ('products', '0005_costlayer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomputeCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partitions', models.PositiveIntegerField()),
+                ('partition', models.PositiveIntegerField()),
+                ('product_id', models.BigIntegerField(null=True)),
+                ('transaction_date', models.DateTimeField(null=True)),
+                ('transaction_id', models.BigIntegerField(null=True)),
+                ('stock', models.IntegerField(default=0)),
+                ('weighted_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('processed', models.BigIntegerField(default=0, verbose_name='İşlenen Satır')),
+                ('changed', models.BigIntegerField(default=0, verbose_name='Değişen Satır')),
+                ('first_changed_at', models.DateTimeField(null=True, verbose_name='Değişen İlk İşlem Tarihi')),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['product', 'transaction_date', 'id'], name='transaction_product_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recomputecheckpoint',
+            constraint=models.UniqueConstraint(fields=('partitions', 'partition'), name='recomputecheckpoint_unique_key'),
+        ),
+    ]
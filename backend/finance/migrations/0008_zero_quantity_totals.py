@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 16:30
+
+from django.db import migrations
+from django.db.models import F
+
+
+def recalculate_zero_quantity_totals(apps, schema_editor):
+    # Adet 0 olan satırlar maliyette 1 adet sayılır (Transaction.calculate_totals ile aynı formül);
+    # 0005'te saklanan toplamlar bu satırlarda maliyeti hiç içermiyordu
+    Transaction = apps.get_model('finance', 'Transaction')
+    total_cost = F('cost_at_transaction') + F('commission_amount') + F('shipping_cost')
+    Transaction.objects.filter(quantity=0).update(total_cost=total_cost, net_profit=F('sale_price') - total_cost)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_recompute_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalculate_zero_quantity_totals, migrations.RunPython.noop),
+    ]
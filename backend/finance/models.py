@@ -1,7 +1,11 @@
+from decimal import Decimal
 from django.db import models
 from products.models import Product
 from integrations.models import Marketplace
 
+CENT = Decimal('0.01')
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
         ('SALE', 'Satış'),
@@ -27,17 +31,136 @@ class Transaction(models.Model):
     cost_at_transaction = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="O anki Maliyet")
     
     transaction_date = models.DateTimeField()
-    
+
+    # Yazım anında hesaplanıp saklanır (bkz. calculate_totals); kâra göre sıralama/filtreleme
+    # veritabanında yapılabilsin diye
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Toplam Maliyet")
+    net_profit = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False, verbose_name="Net Kâr")
+
+    # Alan değildir: satışın tüketilen FIFO katmanlarındaki toplam maliyeti (bkz. products/costing.sale_costs).
+    # Verilirse toplamlar kuruşa yuvarlanmış birim maliyet * adet yerine bundan hesaplanır.
+    line_cost = None
+
+    def calculate_totals(self):
+        """
+        Toplam Maliyet = Maliyet * Adet + Komisyon + Kargo
+        Net Kâr = Satış - Toplam Maliyet
+        Adet 0 girilmiş satırlar maliyette 1 adet sayılır (raporlar eskiden beri böyle hesaplar).
+        line_cost biliniyorsa Maliyet * Adet yerine o kullanılır; saklanan toplam defterdeki
+        satış değeriyle aynı kalır.
+        Değerler float/metin gelse de (Excel içe aktarımı) Decimal olarak hesaplanır.
+        """
+        def amount(value):
+            if isinstance(value, Decimal):
+                return value
+            return Decimal(str(value)) if value not in (None, '') else Decimal('0')
+
+        if self.line_cost is not None and self.quantity:
+            line_cost = amount(self.line_cost)
+        else:
+            line_cost = amount(self.cost_at_transaction) * int(self.quantity or 1)
+        total_cost = line_cost + amount(self.commission_amount) + amount(self.shipping_cost)
+        self.total_cost = total_cost.quantize(CENT)
+        self.net_profit = (amount(self.sale_price) - total_cost).quantize(CENT)
+
+    def save(self, *args, **kwargs):
+        self.calculate_totals()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'total_cost', 'net_profit'}
+        super().save(*args, **kwargs)
+
     def get_net_profit(self):
         """
         Net Kâr = Satış - (Maliyet + Komisyon + Kargo + KDV vb.)
-        Bu hesabı daha detaylı yapacağız.
         """
-        total_deductions = self.commission_amount + self.shipping_cost + (self.cost_at_transaction * self.quantity)
-        return self.sale_price - total_deductions
+        self.calculate_totals()
+        return self.net_profit
+
+    class Meta:
+        indexes = [
+            # Doğal anahtar: aynı raporun tekrar yüklenmesinde mükerrer satır kontrolü için
+            models.Index(fields=['marketplace', 'order_number', 'product', 'transaction_type'], name='transaction_natural_key_idx'),
+            # Dashboard/liste: tipe göre filtre + tarih aralığı + tarihe göre sıralama
+            models.Index(fields=['transaction_type', 'transaction_date'], name='transaction_type_date_idx'),
+            # Filtresiz liste ve son işlemler (-transaction_date, -id)
+            models.Index(fields=['transaction_date'], name='transaction_date_idx'),
+            # En çok zarar/kâr ettiren satırlar düz bir ORDER BY ile listelenir
+            models.Index(fields=['transaction_type', 'net_profit'], name='transaction_net_profit_idx'),
+            # Maliyet yeniden hesaplama: ürün bazında kronolojik geçmiş (bkz. finance/recompute.py)
+            models.Index(fields=['product', 'transaction_date', 'id'], name='transaction_product_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.order_number} - {self.transaction_type}"
+
+
+class RecomputeCheckpoint(models.Model):
+    """
+    recompute_costs komutunun bölüm (worker) bazında kaldığı yer: son işlenen işlemin anahtarı
+    ve o ürünün o ana kadarki stok/maliyet durumu. Kesilen çalışma buradan devam eder.
+    """
+    partitions = models.PositiveIntegerField()
+    partition = models.PositiveIntegerField()
+    product_id = models.BigIntegerField(null=True)
+    transaction_date = models.DateTimeField(null=True)
+    transaction_id = models.BigIntegerField(null=True)
+    stock = models.IntegerField(default=0)
+    weighted_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    processed = models.BigIntegerField(default=0, verbose_name="İşlenen Satır")
+    changed = models.BigIntegerField(default=0, verbose_name="Değişen Satır")
+    first_changed_at = models.DateTimeField(null=True, verbose_name="Değişen İlk İşlem Tarihi")
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['partitions', 'partition'], name='recomputecheckpoint_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.partition + 1}/{self.partitions}: {self.processed} satır"
+
+
+class DailyRollup(models.Model):
+    """
+    Gün + pazaryeri + ürün + işlem tipi bazında önceden toplanmış tutarlar.
+    Transaction yazıldıkça artımlı güncellenir (bkz. finance/rollups.py); dashboard ve
+    dönem raporları ham işlemler yerine bu tabloyu okur.
+    """
+    date = models.DateField()
+    marketplace = models.ForeignKey(Marketplace, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True)
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ciro")
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ürün Maliyeti")
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Komisyon")
+    shipping = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Kargo")
+    quantity = models.IntegerField(default=0)
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Brüt Kâr")
+    transaction_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'marketplace', 'product', 'transaction_type'],
+                condition=models.Q(product__isnull=False), name='dailyrollup_unique_key',
+            ),
+            # NULL'lar unique kısıtında birbirinden farklı sayıldığından ürünsüz satırlar ayrıca korunur
+            models.UniqueConstraint(
+                fields=['date', 'marketplace', 'transaction_type'],
+                condition=models.Q(product__isnull=True), name='dailyrollup_unique_key_no_product',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['transaction_type', 'date'], name='dailyrollup_type_date_idx'),
+        ]
+        verbose_name = "Günlük Özet"
+
+    def __str__(self):
+        return f"{self.date} - {self.transaction_type} ({self.transaction_count})"
+
 class Expense(models.Model):
     CATEGORY_CHOICES = [
         ('RENT', 'Kira'),
@@ -0,0 +1,273 @@
+import multiprocessing
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Decimal
+from django.db import connection, transaction
+from django.db.models import Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Mod
+from core.bulk import bulk_update_rows
+from core.pagination import keyset_after
+from core.processes import setup_django
+from products.ledger import local_day
+from products.models import Product, StockMovement, StockSnapshot
+from .cache import bump_data_version
+from .models import CENT, DailyRollup, RecomputeCheckpoint, Transaction
+from .rollups import rollup_key
+
+# Her sayfada okunan işlem sayısı; sayfa sonu aynı zamanda kayıt noktasıdır
+RECOMPUTE_CHUNK_SIZE = 5000
+
+RECOMPUTE_ORDERING = ('product_id', 'transaction_date', 'id')
+# İşleme bağlı olmayan stok girişleri/çıkışları; geçmiş bunlarla birlikte yürütülür
+LEDGER_KINDS = ('OPENING', 'IMPORT', 'ADJUSTMENT')
+Row = namedtuple('Row', (
+    'id', 'product_id', 'transaction_date', 'marketplace_id', 'transaction_type', 'quantity',
+    'sale_price', 'commission_amount', 'shipping_cost', 'cost_at_transaction',
+))
+
+
+def replay_purchase(stock, cost, quantity, price):
+    """
+    Alıştan sonraki (stok, ağırlıklı maliyet); receive_stock kurallarıyla. Maliyet yoksa alış
+    fiyatı alınır, stok artıyorsa ortalamaya girilir. Eksi stok ortalamada ağırlık taşımaz.
+    """
+    if price > 0:
+        held = max(stock, 0)
+        if cost <= 0:
+            cost = price
+        elif quantity > 0:
+            cost = ((held * cost + quantity * price) / (held + quantity)).quantize(CENT, ROUND_HALF_UP)
+    return stock + quantity, cost
+
+
+def ledger_movements(checkpoint, page):
+    """
+    Sayfadaki ürünlerin işleme bağlı olmayan defter hareketleri, zaman sırasıyla:
+    {ürün id: deque[(zaman, adet, değer)]}. Kayıt noktasındaki ürünün zaten yürütülmüş
+    (son işlenen işlemden önceki) hareketleri yeniden okunmaz.
+    Açılış hareketi yalnızca ürünün ilk işleminden önceyse başlangıç bakiyesidir. Defter
+    kurulurken (products 0004) mevcut stoklar o anın tarihiyle açılış olarak yazıldı; bu stok
+    daha eski işlemlerin sonucudur ve eski maliyetle tekrar eklenmesin diye atlanır.
+    """
+    product_ids = {row.product_id for row in page} - {checkpoint.product_id}
+    query = Q(product_id__in=product_ids)
+    if checkpoint.product_id is not None:
+        query |= Q(product_id=checkpoint.product_id, occurred_at__gt=checkpoint.transaction_date)
+    pending = defaultdict(deque)
+    rows = (
+        StockMovement.objects.filter(query, kind__in=LEDGER_KINDS)
+        .exclude(kind='OPENING', occurred_at__gt=Subquery(
+            Transaction.objects.filter(product_id=OuterRef('product_id'))
+            .order_by('transaction_date').values('transaction_date')[:1]
+        ))
+        .order_by('product_id', 'occurred_at', 'id').values_list('product_id', 'occurred_at', 'quantity', 'value')
+    )
+    for product_id, occurred_at, quantity, value in rows:
+        pending[product_id].append((occurred_at, quantity, value))
+    return pending
+
+
+def replay_movements(stock, cost, pending, until=None):
+    """
+    until anına kadarki (None ise tüm) defter hareketlerini yürütür. Girişler değer / adet birim
+    fiyatıyla alış gibi ortalamaya girer (açılış, içe aktarma ve düzeltmede değer = adet * alış
+    fiyatıdır); çıkışlar yalnızca stoğu düşürür.
+    """
+    while pending and (until is None or pending[0][0] <= until):
+        _, quantity, value = pending.popleft()
+        if quantity > 0:
+            stock, cost = replay_purchase(stock, cost, quantity, (value / quantity).quantize(CENT, ROUND_HALF_UP))
+        else:
+            stock += quantity
+    return stock, cost
+
+
+def partition_rows(partition, partitions):
+    rows = Transaction.objects.filter(product__isnull=False)
+    if partitions > 1:
+        rows = rows.annotate(partition=Mod('product_id', Value(partitions))).filter(partition=partition)
+    return rows.order_by(*RECOMPUTE_ORDERING).values_list(*Row._fields)
+
+
+def recompute_partition(partition=0, partitions=1, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """
+    product_id % partitions == partition olan ürünlerin işlem geçmişini (ürün, tarih, id)
+    sırasıyla yürütür: alışlarla (ve araya giren açılış, içe aktarma, düzeltme hareketleriyle)
+    ağırlıklı maliyet yeniden hesaplanır, diğer işlemlerin maliyeti o anki ağırlıklı maliyete eşitlenir. Geçmiş anahtar sırasıyla sayfa sayfa okunur (bellek sabit);
+    her sayfanın değişiklikleri ve kayıt noktası tek transaction'da yazılır. Kesilirse kayıt
+    noktasından devam eder. Dönüş: (işlenen, değişen) satır sayısı.
+    """
+    checkpoint, _ = RecomputeCheckpoint.objects.get_or_create(partitions=partitions, partition=partition)
+    rows = partition_rows(partition, partitions)
+    while not checkpoint.finished:
+        page = rows
+        if checkpoint.transaction_id is not None:
+            page = page.filter(keyset_after(
+                RECOMPUTE_ORDERING, [checkpoint.product_id, checkpoint.transaction_date, checkpoint.transaction_id],
+            ))
+        page = [Row(*values) for values in page[:chunk_size]]
+        apply_page(checkpoint, page, final=len(page) < chunk_size)
+    return checkpoint.processed, checkpoint.changed
+
+
+def apply_page(checkpoint, page, final):
+    product_id, stock, cost = checkpoint.product_id, checkpoint.stock, checkpoint.weighted_cost
+    changed, movements, products = [], [], []
+    deltas = defaultdict(Decimal)
+    first_changed_at = checkpoint.first_changed_at
+    pending = ledger_movements(checkpoint, page)
+
+    for row in page:
+        if row.product_id != product_id:
+            # Önceki ürünün geçmişi bitti: kalan hareketlerden sonraki ağırlıklı maliyet ürüne yazılır
+            if product_id is not None:
+                stock, cost = replay_movements(stock, cost, pending[product_id])
+                if cost > 0:
+                    products.append(Product(id=product_id, weighted_cost=cost))
+            product_id, stock, cost = row.product_id, 0, Decimal('0')
+        stock, cost = replay_movements(stock, cost, pending[product_id], row.transaction_date)
+        quantity = row.quantity or 0
+        if row.transaction_type == 'PURCHASE':
+            stock, cost = replay_purchase(stock, cost, quantity, row.cost_at_transaction)
+            continue
+        if row.transaction_type == 'SALE':
+            stock -= quantity
+        # Öncesinde alış olmayan satırların maliyeti bilinmiyor; olduğu gibi kalır
+        if cost <= 0 or cost == row.cost_at_transaction:
+            continue
+        tx = Transaction(
+            id=row.id, quantity=quantity, sale_price=row.sale_price, commission_amount=row.commission_amount,
+            shipping_cost=row.shipping_cost, cost_at_transaction=cost,
+        )
+        tx.calculate_totals()
+        changed.append(tx)
+        if row.transaction_type == 'SALE':
+            movements.append((-(quantity * cost), row.id))
+        deltas[rollup_key(row)] += (cost - row.cost_at_transaction) * (row.quantity or 1)
+        if first_changed_at is None or row.transaction_date < first_changed_at:
+            first_changed_at = row.transaction_date
+
+    if final and product_id is not None:
+        stock, cost = replay_movements(stock, cost, pending[product_id])
+        if cost > 0:
+            products.append(Product(id=product_id, weighted_cost=cost))
+
+    with transaction.atomic():
+        update_transactions(changed)
+        update_sale_movements(movements)
+        apply_cost_deltas(deltas)
+        bulk_update_rows(Product, ['weighted_cost'], products)
+        if page:
+            last = page[-1]
+            checkpoint.product_id, checkpoint.transaction_date, checkpoint.transaction_id = (
+                last.product_id, last.transaction_date, last.id,
+            )
+        checkpoint.stock, checkpoint.weighted_cost = stock, cost
+        checkpoint.processed += len(page)
+        checkpoint.changed += len(changed)
+        checkpoint.first_changed_at = first_changed_at
+        checkpoint.finished = final
+        checkpoint.save()
+
+
+def update_transactions(changed):
+    """
+    Yeni maliyet ve saklanan toplamları yazar. bulk_update_rows'tan farkı: tutarlar zaten
+    kuruşa yuvarlı Decimal olduğundan alan başına get_db_prep_save (yavaş) çağrılmaz.
+    """
+    if not changed:
+        return
+    meta = Transaction._meta
+    qn = connection.ops.quote_name
+    sql = 'UPDATE %s SET %s WHERE %s = %%s' % (
+        qn(meta.db_table),
+        ', '.join('%s = %%s' % qn(meta.get_field(name).column) for name in ('cost_at_transaction', 'total_cost', 'net_profit')),
+        qn(meta.pk.column),
+    )
+    adapt = connection.ops.adapt_decimalfield_value
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [adapt(tx.cost_at_transaction), adapt(tx.total_cost), adapt(tx.net_profit), tx.pk] for tx in changed
+        ])
+
+
+def apply_cost_deltas(deltas):
+    """
+    Maliyet farklarını günlük özet tablosuna yazar: {(gün, pazaryeri, ürün, tip): fark}.
+    İşlemler zaten var olduğundan özet satırları da vardır; rollups.apply_deltas'ın aksine boş
+    satır eklenmez ve yalnızca maliyet/kâr sütunları güncellenir.
+    """
+    if not deltas:
+        return
+    meta = DailyRollup._meta
+    qn = connection.ops.quote_name
+    cost, profit = qn(meta.get_field('cost').column), qn(meta.get_field('profit').column)
+    sql = 'UPDATE %s SET %s = %s + %%s, %s = %s - %%s WHERE %s' % (
+        qn(meta.db_table), cost, cost, profit, profit,
+        ' AND '.join('%s = %%s' % qn(meta.get_field(name).column) for name in ('date', 'marketplace', 'product', 'transaction_type')),
+    )
+    adapt = connection.ops.adapt_decimalfield_value
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [adapt(difference), adapt(difference), connection.ops.adapt_datefield_value(day), marketplace_id, product_id, transaction_type]
+            for (day, marketplace_id, product_id, transaction_type), difference in deltas.items()
+        ])
+
+
+def update_sale_movements(movements):
+    """Satışların defterdeki değerini yeni maliyetle yazar: [(değer, işlem id)]."""
+    if not movements:
+        return
+    meta = StockMovement._meta
+    qn = connection.ops.quote_name
+    sql = 'UPDATE %s SET %s = %%s WHERE %s = %%s AND %s = %%s' % (
+        qn(meta.db_table), qn(meta.get_field('value').column),
+        qn(meta.get_field('transaction').column), qn(meta.get_field('kind').column),
+    )
+    adapt = connection.ops.adapt_decimalfield_value
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[adapt(amount), tx_id, 'SALE'] for amount, tx_id in movements])
+
+
+def _run_partition(partition, partitions, chunk_size):
+    try:
+        return recompute_partition(partition, partitions, chunk_size)
+    finally:
+        connection.close()
+
+
+def recompute_costs(workers=1, chunk_size=RECOMPUTE_CHUNK_SIZE, restart=False):
+    """
+    Tüm ürünlerin maliyet geçmişini yeniden hesaplar. Ürünler workers bölüme ayrılır ve
+    workers > 1 ise her bölüm ayrı bir süreçte çalışır. Yarım kalmış bir çalışma varsa (aynı
+    workers sayısıyla) kaldığı yerden devam edilir; restart=True baştan başlatır.
+    Bittiğinde değişen ilk işlemden sonraki stok görüntüleri silinir (snapshot_stock ile yeniden
+    alınır) ve rapor önbelleği geçersiz olur. Dönüş: (işlenen, değişen) satır sayısı.
+    """
+    if restart:
+        RecomputeCheckpoint.objects.all().delete()
+    existing = set(RecomputeCheckpoint.objects.values_list('partitions', flat=True))
+    if existing - {workers}:
+        raise ValueError(
+            f"Yarım kalmış çalışma {sorted(existing)[0]} bölümle başlatılmış; aynı sayıda worker ile "
+            f"devam edin ya da baştan başlatın."
+        )
+
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_django,
+            initargs=(connection.settings_dict['NAME'],),
+        ) as pool:
+            results = list(pool.map(_run_partition, range(workers), [workers] * workers, [chunk_size] * workers))
+    else:
+        results = [recompute_partition(0, 1, chunk_size)]
+
+    first_changed_at = RecomputeCheckpoint.objects.aggregate(first=Min('first_changed_at'))['first']
+    with transaction.atomic():
+        if first_changed_at is not None:
+            StockSnapshot.objects.filter(date__gte=local_day(first_changed_at)).delete()
+            bump_data_version()
+        RecomputeCheckpoint.objects.all().delete()
+    return sum(processed for processed, _ in results), sum(changed for _, changed in results)
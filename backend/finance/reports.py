@@ -0,0 +1,256 @@
+import base64
+import json
+from datetime import timedelta
+from django.db.models import CharField, F, FloatField, IntegerField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from core.pagination import decode_cursor, keyset_after
+from .models import DailyRollup, Expense
+from .rollups import MONEY, money
+
+REPORT_PAGE_SIZE = 50
+REPORT_MAX_PAGE_SIZE = 200
+
+# Sıralanabilir sütunlar -> özet tablosundaki toplam ifadesi
+PRODUCT_REPORT_SUMS = {
+    'revenue': Sum('revenue'),
+    'units': Sum('quantity'),
+    'cogs': Sum('cost'),
+    'commission': Sum('commission'),
+    'shipping': Sum('shipping'),
+    'profit': Sum('profit'),
+}
+MONEY_COLUMNS = ('revenue', 'cogs', 'commission', 'shipping', 'profit')
+
+SERIES_INTERVALS = ('day', 'week', 'month')
+SERIES_DEFAULT_DAYS = 30
+SERIES_MAX_BUCKETS = 1000
+
+
+def parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: "Tarih YYYY-AA-GG biçiminde olmalı."})
+    return day
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def product_profitability(params):
+    """
+    Ürün (isteğe bağlı ürün + pazaryeri) bazında ciro, adet, SMM, komisyon, kargo, kâr
+    ve marj. Tamamı günlük özet tablosu üzerinde tek gruplanmış sorguyla hesaplanır.
+
+    Parametreler: date_from, date_to, marketplace, by_marketplace=1, transaction_type
+    (varsayılan SALE), ordering (ör. -profit, margin, sku), limit, cursor.
+    Sayfalama keyset ile yapılır: bir sonraki sayfa OFFSET yerine son satırın
+    (sıralama değeri, ürün, pazaryeri) anahtarından devam eder.
+    """
+    rows = DailyRollup.objects.filter(transaction_type=params.get('transaction_type', 'SALE'))
+    date_from, date_to = parse_day(params, 'date_from'), parse_day(params, 'date_to')
+    if date_from:
+        rows = rows.filter(date__gte=date_from)
+    if date_to:
+        rows = rows.filter(date__lte=date_to)
+    if params.get('marketplace'):
+        if not params['marketplace'].isdigit():
+            raise ValidationError({"marketplace": "Pazaryeri bir sayı olmalı."})
+        rows = rows.filter(marketplace_id=params['marketplace'])
+
+    by_marketplace = params.get('by_marketplace') in ('1', 'true', 'True')
+    group = ['product_id', 'product__sku', 'product__name']
+    if by_marketplace:
+        group += ['marketplace_id', 'marketplace__name']
+    rows = rows.values(*group).annotate(**PRODUCT_REPORT_SUMS).annotate(
+        # Pay float'a çevrilir; SQLite tam sayı tutarlarda tam sayı bölmesi yapmasın
+        margin=Round(Coalesce(Cast('profit', FloatField()) * 100 / NullIf(F('revenue'), 0), 0), 2, output_field=MONEY),
+    )
+
+    ordering = params.get('ordering', '-profit')
+    field = ordering.lstrip('-')
+    if field not in PRODUCT_REPORT_SUMS and field not in ('margin', 'sku'):
+        raise ValidationError({"ordering": f"Geçersiz sıralama: {ordering}"})
+    descending = ordering.startswith('-')
+    # Ürünsüz satırlar (product NULL) için de kararlı bir anahtar olsun diye 0 kullanılır
+    tie_fields = ['tie_product'] + (['marketplace_id'] if by_marketplace else [])
+    rows = rows.annotate(
+        tie_product=Coalesce('product_id', 0),
+        # Kuruşa yuvarlanmış değerle sıralanır; imleçteki değerle birebir karşılaştırılabilsin
+        sort_value=(
+            Coalesce('product__sku', Value(''), output_field=CharField()) if field == 'sku'
+            else Round(F(field), 2, output_field=MONEY)
+        ),
+    )
+
+    try:
+        limit = min(max(int(params.get('limit', REPORT_PAGE_SIZE)), 1), REPORT_MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError({"limit": "limit bir sayı olmalı."})
+
+    direction = '-' if descending else ''
+    keys = [direction + name for name in ['sort_value'] + tie_fields]
+    if params.get('cursor'):
+        # İmleç değerleri sıralama anahtarının tipine çevrilir (bozuk imleç 400 döner)
+        key_fields = [CharField() if field == 'sku' else MONEY] + [IntegerField()] * len(tie_fields)
+        rows = rows.filter(keyset_after(keys, decode_cursor(params['cursor'], key_fields)))
+
+    rows = rows.order_by(*keys)
+    page = list(rows[:limit + 1])
+
+    results = [report_row(row, by_marketplace) for row in page[:limit]]
+    next_cursor = None
+    if len(page) > limit:
+        last = page[limit - 1]
+        next_cursor = encode_cursor([
+            str(last['sort_value']) if last['sort_value'] is not None else None,
+            *[last[name] for name in tie_fields],
+        ])
+    return {"results": results, "next_cursor": next_cursor, "ordering": ordering}
+
+
+def report_row(row, by_marketplace):
+    result = {
+        "product_id": row['product_id'],
+        "sku": row['product__sku'],
+        "name": row['product__name'],
+        "units": row['units'],
+        "margin": money(row['margin']),
+    }
+    for column in MONEY_COLUMNS:
+        result[column] = money(row[column])
+    if by_marketplace:
+        result["marketplace_id"] = row['marketplace_id']
+        result["marketplace_name"] = row['marketplace__name']
+    return result
+
+
+def bucket_start(day, interval):
+    """Günün ait olduğu kovanın ilk günü (hafta Pazartesi başlar)."""
+    if interval == 'month':
+        return day.replace(day=1)
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def bucket_starts(date_from, date_to, interval):
+    starts = []
+    current = bucket_start(date_from, interval)
+    while current <= date_to:
+        starts.append(current)
+        if interval == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if interval == 'week' else 1)
+    return starts
+
+
+def previous_year(day, interval):
+    """
+    Geçen yılın karşılık gelen günü. Gün/hafta kovalarında 52 hafta geri gidilir ki
+    haftanın günleri hizalı kalsın; ay kovalarında takvim yılı kullanılır.
+    """
+    if interval != 'month':
+        return day - timedelta(weeks=52)
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 Şubat
+        return day.replace(year=day.year - 1, day=28)
+
+
+def truncate(field, interval):
+    if interval == 'month':
+        return TruncMonth(field)
+    if interval == 'week':
+        return TruncWeek(field)
+    return F(field)
+
+
+def time_series(params):
+    """
+    Keyfi tarih aralığı için gün/hafta/ay kovalarında ciro, brüt kâr, gider ve net kâr.
+    Giderler tüm zamanların toplamı olarak değil expense_date'e göre ilgili kovaya yazılır.
+
+    Parametreler: date_from, date_to (varsayılan son 30 gün), interval (day|week|month),
+    compare=previous_year. Karşılaştırma dahil toplam iki sorgu çalışır: özet tablosu ve
+    giderler, ikisi de her iki aralığı tek seferde kovalara göre gruplar; birleştirme bellekte yapılır.
+    """
+    interval = params.get('interval', 'day')
+    if interval not in SERIES_INTERVALS:
+        raise ValidationError({"interval": f"Geçersiz aralık: {interval}"})
+    date_to = parse_day(params, 'date_to') or timezone.localdate()
+    date_from = parse_day(params, 'date_from') or date_to - timedelta(days=SERIES_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise ValidationError({"date_from": "Başlangıç tarihi bitiş tarihinden sonra olamaz."})
+    starts = bucket_starts(date_from, date_to, interval)
+    if len(starts) > SERIES_MAX_BUCKETS:
+        raise ValidationError({"interval": f"En fazla {SERIES_MAX_BUCKETS} kova istenebilir; daha geniş bir aralık seçin."})
+
+    compare = params.get('compare')
+    if compare not in (None, '', 'previous_year'):
+        raise ValidationError({"compare": f"Geçersiz karşılaştırma: {compare}"})
+    ranges = [(date_from, date_to)]
+    if compare:
+        ranges.append((previous_year(date_from, interval), previous_year(date_to, interval)))
+
+    def in_ranges(field):
+        condition = Q()
+        for start, end in ranges:
+            condition |= Q(**{f'{field}__range': (start, end)})
+        return condition
+
+    sales = (
+        DailyRollup.objects.filter(in_ranges('date'), transaction_type='SALE')
+        .annotate(bucket=truncate('date', interval))
+        .values('bucket')
+        .annotate(revenue=Sum('revenue'), gross_profit=Sum('profit'))
+        .order_by()
+    )
+    sales = {row['bucket']: row for row in sales}
+    expenses = (
+        Expense.objects.filter(in_ranges('expense_date'))
+        .annotate(bucket=truncate('expense_date', interval))
+        .values('bucket')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    expenses = {row['bucket']: row['total'] for row in expenses}
+
+    def point(start):
+        row = sales.get(start, {})
+        point = {
+            "revenue": money(row.get('revenue')),
+            "gross_profit": money(row.get('gross_profit')),
+            "expenses": money(expenses.get(start)),
+        }
+        point["net_profit"] = point["gross_profit"] - point["expenses"]
+        return point
+
+    def totals(points):
+        return {key: sum((p[key] for p in points), money(0)) for key in ('revenue', 'gross_profit', 'expenses', 'net_profit')}
+
+    results = [{"bucket": start, **point(start)} for start in starts]
+    data = {
+        "interval": interval, "date_from": date_from, "date_to": date_to,
+        "results": results, "totals": totals(results),
+    }
+    if compare:
+        # Önceki yılın kovaları sırayla eşleştirilir (ay kovaları takvimle, gün/hafta 52 hafta ile hizalı)
+        previous = [
+            {"bucket": start, **point(start)}
+            for start in bucket_starts(ranges[1][0], ranges[1][1], interval)
+        ][:len(results)]
+        for result, prev in zip(results, previous):
+            result["previous"] = prev
+        data["previous_totals"] = totals(previous)
+    return data
@@ -0,0 +1,175 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .cache import bump_data_version
+from .models import CENT, DailyRollup, Transaction
+
+ROLLUP_BATCH_SIZE = 2000
+
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+
+# Özet tablosu işlemlerde saklanan toplamlardan beslenir (bkz. Transaction.calculate_totals):
+# ürün maliyeti = toplam maliyet - komisyon - kargo, kâr = net kâr
+LINE_COST = ExpressionWrapper(F('total_cost') - F('commission_amount') - F('shipping_cost'), output_field=MONEY)
+
+# Özet tablosunda toplanan alanlar (sıra executemany parametreleriyle aynıdır)
+SUM_FIELDS = ('revenue', 'cost', 'commission', 'shipping', 'quantity', 'profit', 'transaction_count')
+
+_local = threading.local()
+
+
+def money(value):
+    """Tutarı kuruşa sabitler (SQLite hesaplanan ifadeleri yuvarlamadan döndürür)."""
+    return (value or Decimal('0')).quantize(CENT)
+
+
+def _decimal(value):
+    # Excel içe aktarımı tutarları float (ya da metin) olarak verir; ikili kayan nokta hatası taşınmasın
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value)) if value not in (None, '') else Decimal('0')
+
+
+def rollup_key(tx):
+    """İşlemin özet satırı: (yerel gün, pazaryeri, ürün, tip)."""
+    day = tx.transaction_date
+    if not isinstance(day, datetime):
+        # Eski içe aktarma yolu tarihi metin olarak verebilir
+        day = Transaction._meta.get_field('transaction_date').to_python(day)
+    if timezone.is_aware(day):
+        day = timezone.localtime(day)
+    return day.date(), tx.marketplace_id, tx.product_id, tx.transaction_type
+
+
+def rollup_amounts(tx):
+    """İşlemin özet tablosuna katkısı; SUM_FIELDS sırasıyla. Saklanan toplamların hesaplanmış olması gerekir."""
+    commission = _decimal(tx.commission_amount)
+    shipping = _decimal(tx.shipping_cost)
+    cost = _decimal(tx.total_cost) - commission - shipping
+    return (_decimal(tx.sale_price), cost, commission, shipping, tx.quantity or 0, _decimal(tx.net_profit), 1)
+
+
+@contextmanager
+def rollup_batch():
+    """
+    Blok içindeki tüm işlem değişikliklerini biriktirip çıkışta tek seferde yazar
+    (toplu silme gibi her satır için sinyal gelen yollarda). İç içe kullanılabilir.
+    """
+    if getattr(_local, 'deltas', None) is not None:
+        yield
+        return
+    _local.deltas = defaultdict(lambda: [0] * len(SUM_FIELDS))
+    _local.stale = False
+    try:
+        yield
+        deltas, stale = _local.deltas, _local.stale
+    finally:
+        _local.deltas = None
+    apply_deltas(deltas)
+    if stale:
+        bump_data_version()
+
+
+def invalidate_reports():
+    """
+    Rapor önbelleğini geçersiz kılar. Açık bir rollup_batch varsa veri sürümü blok sonunda
+    bir kez artırılır (her satırın sinyali ayrı ayrı artırmaz).
+    """
+    if getattr(_local, 'deltas', None) is not None:
+        _local.stale = True
+    else:
+        bump_data_version()
+
+
+def record_transactions(transactions, sign=1):
+    """
+    İşlemleri özet tablosuna ekler (sign=-1 ile çıkarır). Açık bir rollup_batch
+    varsa ona biriktirilir, yoksa hemen yazılır.
+    """
+    deltas = getattr(_local, 'deltas', None)
+    batched = deltas is not None
+    if not batched:
+        deltas = defaultdict(lambda: [0] * len(SUM_FIELDS))
+    for tx in transactions:
+        totals = deltas[rollup_key(tx)]
+        for i, amount in enumerate(rollup_amounts(tx)):
+            totals[i] += sign * amount
+    if not batched:
+        apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """
+    Farkları veritabanında toplar: eksik özet satırları önce boş olarak eklenir
+    (çakışanlar yok sayılır), ardından tüm satırlar 'alan = alan + fark' ile artırılır.
+    Artırım veritabanında yapıldığından eş zamanlı yazımlarda fark kaybolmaz.
+    """
+    if not deltas:
+        return
+    meta = DailyRollup._meta
+    qn = connection.ops.quote_name
+    columns = [meta.get_field(name) for name in SUM_FIELDS]
+    key_fields = [meta.get_field(name) for name in ('date', 'marketplace', 'transaction_type')]
+    update = 'UPDATE %s SET %s WHERE %s AND %s' % (
+        qn(meta.db_table),
+        ', '.join('%s = %s + %%s' % (qn(field.column), qn(field.column)) for field in columns),
+        ' AND '.join('%s = %%s' % qn(field.column) for field in key_fields),
+        qn(meta.get_field('product').column),
+    )
+    with_product, without_product = [], []
+    for (day, marketplace_id, product_id, transaction_type), totals in deltas.items():
+        params = [field.get_db_prep_save(value, connection) for field, value in zip(columns, totals)]
+        params += [connection.ops.adapt_datefield_value(day), marketplace_id, transaction_type]
+        if product_id is None:
+            without_product.append(params)
+        else:
+            with_product.append(params + [product_id])
+
+    with transaction.atomic():
+        DailyRollup.objects.bulk_create([
+            DailyRollup(date=day, marketplace_id=marketplace_id, product_id=product_id, transaction_type=transaction_type)
+            for day, marketplace_id, product_id, transaction_type in deltas
+        ], batch_size=ROLLUP_BATCH_SIZE, ignore_conflicts=True)
+        with connection.cursor() as cursor:
+            for sql, rows in ((update + ' = %s', with_product), (update + ' IS NULL', without_product)):
+                for start in range(0, len(rows), ROLLUP_BATCH_SIZE):
+                    cursor.executemany(sql, rows[start:start + ROLLUP_BATCH_SIZE])
+        if any(totals[-1] < 0 for totals in deltas.values()):
+            DailyRollup.objects.filter(transaction_count__lte=0).delete()
+
+
+def rebuild_rollups():
+    """
+    Özet tablosunu ham işlemlerden sıfırdan kurar (tek gruplanmış sorgu). Dönüş: satır sayısı.
+    """
+    rows = (
+        Transaction.objects.annotate(day=TruncDate('transaction_date'))
+        .values('day', 'marketplace_id', 'product_id', 'transaction_type')
+        .annotate(
+            revenue=Sum('sale_price'), cost=Sum(LINE_COST), commission=Sum('commission_amount'),
+            shipping=Sum('shipping_cost'), total_quantity=Sum('quantity'), profit=Sum('net_profit'),
+            transaction_count=Count('id'),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        objs = [
+            DailyRollup(
+                date=row['day'], marketplace_id=row['marketplace_id'], product_id=row['product_id'],
+                transaction_type=row['transaction_type'], revenue=money(row['revenue']), cost=money(row['cost']),
+                commission=money(row['commission']), shipping=money(row['shipping']),
+                quantity=row['total_quantity'] or 0, profit=money(row['profit']),
+                transaction_count=row['transaction_count'],
+            )
+            for row in rows.iterator()
+        ]
+        DailyRollup.objects.bulk_create(objs, batch_size=ROLLUP_BATCH_SIZE)
+        bump_data_version()
+    return len(objs)
@@ -1,3 +1,4 @@
+from django.db.models import F
 from rest_framework import serializers
 from .models import Transaction
 from products.models import Product
@@ -20,8 +21,9 @@ class TransactionSerializer(serializers.ModelSerializer):
     marketplace = serializers.PrimaryKeyRelatedField(queryset=Marketplace.objects.all(), write_only=True)
 
     cost_at_transaction = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    net_profit = serializers.SerializerMethodField()
-    total_cost = serializers.SerializerMethodField()
+    # Kayıt anında hesaplanıp saklanan değerler (Transaction.calculate_totals)
+    net_profit = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
+    total_cost = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True, coerce_to_string=False)
 
     class Meta:
         model = Transaction
@@ -34,15 +36,58 @@ class TransactionSerializer(serializers.ModelSerializer):
             'cost_at_transaction', 'total_cost', 'net_profit', 'transaction_type'
         ]
 
-    def get_total_cost(self, obj):
-        if not obj.product: return 0
-        product_cost = (obj.cost_at_transaction * obj.quantity)
-        return product_cost + obj.commission_amount + obj.shipping_cost
+    def create(self, validated_data):
+        # save(line_cost=...) ile gelen FIFO satır maliyeti model alanı değildir (bkz. Transaction.line_cost)
+        line_cost = validated_data.pop('line_cost', None)
+        instance = Transaction(**validated_data)
+        instance.line_cost = line_cost
+        instance.save()
+        return instance
+
+
+# Liste yanıtının hafif okuma yolu: çıktı alanı -> ORM yolu. Model örneği kurulmaz; satırlar
+# values() ile ilişkiler JOIN'lenmiş olarak okunur ve TransactionListEncoder ile kodlanır.
+TRANSACTION_LIST_COLUMNS = {
+    'product_name': 'product__name',
+    'product_sku': 'product__sku',
+    'marketplace_name': 'marketplace__name',
+}
+
+
+def transaction_rows(queryset):
+    """Listede gösterilen sütunları tek sorguda dict olarak okuyan values() sorgusu."""
+    fields = [name for name in TransactionListEncoder.field_names() if name not in TRANSACTION_LIST_COLUMNS]
+    return queryset.values(*fields, **{name: F(path) for name, path in TRANSACTION_LIST_COLUMNS.items()})
+
+
+class TransactionListEncoder:
+    """
+    values() satırlarını TransactionSerializer ile birebir aynı biçime çevirir. Alan başına
+    yalnızca serializer alanının to_representation'ı çağrılır; örnek/ilişki erişimi yoktur.
+    """
+
+    @staticmethod
+    def field_names():
+        return [name for name, field in TransactionSerializer().fields.items() if not field.write_only]
+
+    def __init__(self):
+        fields = TransactionSerializer().fields
+        self.converters = [(name, fields[name].to_representation) for name in self.field_names()]
+
+    def encode(self, rows):
+        return [self.encode_row(row) for row in rows]
+
+    def encode_row(self, row):
+        data = {}
+        for name, convert in self.converters:
+            value = row[name]
+            if value is not None:
+                data[name] = convert(value)
+            elif name not in TRANSACTION_LIST_COLUMNS:
+                # Ürünü olmayan satırda serializer product_name/product_sku alanlarını hiç yazmaz
+                data[name] = None
+        return data
 
-    def get_net_profit(self, obj):
-        revenue = obj.sale_price 
-        cost = self.get_total_cost(obj)
-        return revenue - cost
 class ExpenseSerializer(serializers.ModelSerializer): # Burası models. değil serializers. olacak
     category_display = serializers.CharField(source='get_category_display', read_only=True)
 
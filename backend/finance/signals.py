@@ -0,0 +1,34 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from products.models import Product
+from .models import Transaction, Expense
+from .rollups import invalidate_reports, record_transactions, rollup_batch
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_values(sender, instance, **kwargs):
+    """
+    Güncellemede eski değerler özet tablosundan düşülebilsin diye kaydı önceden okur.
+    """
+    instance._rollup_previous = Transaction.objects.filter(pk=instance.pk).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    with rollup_batch():
+        previous = getattr(instance, '_rollup_previous', None)
+        if previous is not None:
+            record_transactions([previous], sign=-1)
+        record_transactions([instance])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    record_transactions([instance], sign=-1)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Expense)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_report_cache(sender, **kwargs):
+    invalidate_reports()
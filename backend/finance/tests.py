@@ -1,3 +1,841 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+import base64
+import io
+import json
+import re
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from integrations.models import Marketplace
+from products.models import CostLayer, Product, StockMovement
+from .models import Transaction, Expense, DailyRollup
+from .cache import cache_stats
+from .models import RecomputeCheckpoint
+from .recompute import apply_page, recompute_costs
+from .rollups import rebuild_rollups
 
-# Create your tests here.
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'))
+        now = timezone.now()
+        for days_ago, price, cost, quantity in ((0, '100.10', '20.20', 2), (0, '0.30', '0.10', 1), (3, '50', '5', 0), (40, '70', '10', 1)):
+            Transaction.objects.create(
+                marketplace=self.marketplace, product=self.product, transaction_type='SALE',
+                order_number=f'S{days_ago}{price}', quantity=quantity, sale_price=Decimal(price),
+                commission_amount=Decimal('1.10'), shipping_cost=Decimal('2.20'),
+                cost_at_transaction=Decimal(cost), transaction_date=now - timedelta(days=days_ago),
+            )
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='RETURN', order_number='R1',
+            sale_price=Decimal('999'), cost_at_transaction=Decimal('0'), transaction_date=now,
+        )
+        Expense.objects.create(category='RENT', amount=Decimal('25.05'), expense_date=now.date())
+
+    def test_totals_are_exact(self):
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/finance/dashboard/').data
+
+        # 100.10-(40.40+3.30) + 0.30-(0.10+3.30) + 50-(5*1+3.30) + 70-(10+3.30)
+        self.assertEqual(data['total_sales'], Decimal('220.40'))
+        self.assertEqual(data['gross_profit'], Decimal('151.70'))
+        self.assertEqual(data['total_expenses'], Decimal('25.05'))
+        self.assertEqual(data['net_profit'], Decimal('126.65'))
+        self.assertEqual(len(data['recent_transactions']), 5)
+
+    def test_daily_chart_fills_missing_days(self):
+        chart = self.client.get('/api/finance/dashboard/').data['chart_data']
+        today = timezone.localdate()
+
+        self.assertEqual(len(chart), 30)
+        self.assertEqual(chart[-1], {"date": today.strftime("%d/%m"), "profit": Decimal('53.30')})
+        self.assertEqual(chart[-4]['profit'], Decimal('41.70'))
+        self.assertEqual(sum(point['profit'] for point in chart), Decimal('95.00'))
+
+    def test_monthly_chart(self):
+        with self.assertNumQueries(3):
+            chart = self.client.get('/api/finance/dashboard/', {'period': 'monthly'}).data['chart_data']
+        today = timezone.localdate()
+
+        self.assertEqual(len(chart), 12)
+        self.assertEqual(chart[-1]['date'], f"{today.month}/{today.year}")
+        self.assertEqual(sum(point['profit'] for point in chart), Decimal('151.70'))
+
+    def test_empty_database(self):
+        Transaction.objects.all().delete()
+        Expense.objects.all().delete()
+        data = self.client.get('/api/finance/dashboard/').data
+
+        self.assertEqual((data['total_sales'], data['gross_profit'], data['net_profit']), (0, 0, 0))
+        self.assertTrue(all(point['profit'] == 0 for point in data['chart_data']))
+
+
+class DailyRollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'), stock_quantity=50)
+        self.now = timezone.now()
+
+    def snapshot(self):
+        return sorted(DailyRollup.objects.values_list(
+            'date', 'product_id', 'transaction_type', 'revenue', 'cost', 'commission', 'shipping',
+            'quantity', 'profit', 'transaction_count',
+        ), key=str)
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_create_edit_delete_keep_rollup_in_sync(self):
+        response = self.client.post('/api/finance/transactions/', {
+            'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+            'order_number': 'S1', 'quantity': 2, 'sale_price': '100.00', 'commission_amount': '5.50',
+            'shipping_cost': '3.25', 'transaction_date': self.now.isoformat(),
+        }, format='json')
+        row = DailyRollup.objects.get()
+        self.assertEqual((row.revenue, row.cost, row.profit, row.quantity), (Decimal('100'), Decimal('20'), Decimal('71.25'), 2))
+
+        tx = Transaction.objects.get(pk=response.data['id'])
+        tx.sale_price = Decimal('80')
+        tx.transaction_date = self.now - timedelta(days=2)
+        tx.save()
+        self.assertEqual(DailyRollup.objects.get().date, timezone.localtime(tx.transaction_date).date())
+        self.assertEqual(DailyRollup.objects.get().profit, Decimal('51.25'))
+        self.assert_matches_rebuild()
+
+        tx.delete()
+        self.assertFalse(DailyRollup.objects.exists())
+
+    def test_zero_quantity_uses_the_same_cost_in_totals_and_rollup(self):
+        tx = Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='SALE', order_number='S0',
+            quantity=0, sale_price=Decimal('50'), commission_amount=Decimal('1'), cost_at_transaction=Decimal('5'),
+            transaction_date=self.now,
+        )
+        row = DailyRollup.objects.get()
+
+        self.assertEqual((tx.total_cost, tx.net_profit), (Decimal('6'), Decimal('44')))
+        self.assertEqual((row.cost, row.profit, row.quantity), (Decimal('5'), tx.net_profit, 0))
+        self.assert_matches_rebuild()
+
+    def test_basket_and_bulk_delete(self):
+        self.client.post('/api/finance/transactions/bulk_create/', {
+            'common': {
+                'marketplace': self.marketplace.id, 'transaction_date': self.now.date().isoformat(),
+                'order_number': 'B1', 'shipping_cost': '10',
+            },
+            'items': [
+                {'product': self.product.id, 'quantity': 1, 'sale_price': '40', 'commission_amount': '4'},
+                {'product': self.product.id, 'quantity': 3, 'sale_price': '90', 'commission_amount': '9'},
+            ],
+        }, format='json')
+        row = DailyRollup.objects.get()
+        self.assertEqual((row.transaction_count, row.quantity, row.revenue, row.shipping), (2, 4, Decimal('130'), Decimal('10')))
+        self.assert_matches_rebuild()
+
+        ids = list(Transaction.objects.values_list('id', flat=True))
+        self.client.post('/api/finance/transactions/bulk_delete/', {'ids': ids[:1]}, format='json')
+        self.assertEqual(DailyRollup.objects.get().transaction_count, 1)
+        self.assert_matches_rebuild()
+
+    def test_excel_import_updates_rollup(self):
+        from integrations.services import ExcelProcessor
+        from integrations.tests import make_csv
+
+        rows = [
+            {'order_number': f'S{i}', 'sku': 'A1' if i % 2 else 'YOK', 'sale_price': 10.1, 'quantity': 1,
+             'transaction_date': '2025-01-0%d' % (1 + i % 3)}
+            for i in range(12)
+        ]
+        ExcelProcessor(marketplace=self.marketplace, file_type='SALES').process_sales_file(make_csv(rows))
+
+        self.assertEqual(sum(DailyRollup.objects.values_list('transaction_count', flat=True)), 12)
+        self.assertEqual(DailyRollup.objects.filter(product__isnull=True).count(), 3)
+        self.assert_matches_rebuild()
+
+
+class BasketCheckoutTests(TestCase):
+    URL = '/api/finance/transactions/bulk_create/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.products = [
+            Product.objects.create(sku=f'P{i}', name=f'Ürün {i}', buying_price=Decimal('10'), stock_quantity=100)
+            for i in range(20)
+        ]
+
+    def checkout(self, items, order_number='B1', shipping_cost='10', transaction_type='SALE'):
+        return self.client.post(self.URL, {
+            'common': {
+                'marketplace': self.marketplace.id, 'transaction_date': '2025-03-01',
+                'order_number': order_number, 'shipping_cost': shipping_cost, 'transaction_type': transaction_type,
+            },
+            'items': items,
+        }, format='json')
+
+    def test_query_count_does_not_grow_with_basket_size(self):
+        counts = []
+        for size in (2, 20):
+            items = [{'product': p.id, 'quantity': 2, 'sale_price': '40'} for p in self.products[:size]]
+            with CaptureQueriesContext(connection) as captured:
+                response = self.checkout(items, order_number=f'B{size}')
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(captured))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Product.objects.get(sku='P19').stock_quantity, 98)
+        self.assertEqual(Product.objects.get(sku='P0').stock_quantity, 96)
+
+    def test_lines_of_the_same_product_and_shipping_split(self):
+        product = self.products[0]
+        response = self.checkout([
+            {'product': product.id, 'quantity': 1, 'sale_price': '40'},
+            {'product': product.id, 'quantity': 3, 'sale_price': '90'},
+            {'product': product.id, 'quantity': 1, 'sale_price': '10'},
+        ])
+        self.assertEqual(response.data, {'status': 'ok', 'created': 3})
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 95)
+        shipping = list(Transaction.objects.order_by('id').values_list('shipping_cost', flat=True))
+        self.assertEqual(shipping, [Decimal('3.34'), Decimal('3.33'), Decimal('3.33')])
+        self.assertEqual(Transaction.objects.get(sale_price=10).net_profit, Decimal('-3.33'))
+
+    def test_unknown_product_writes_nothing(self):
+        response = self.checkout([{'product': self.products[0].id}, {'product': 9999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(Product.objects.get(sku='P0').stock_quantity, 100)
+
+    def test_unknown_marketplace_is_rejected(self):
+        self.marketplace.id = 9999
+        response = self.checkout([{'product': self.products[0].id, 'quantity': 1, 'sale_price': '40'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Pazaryeri', response.data['error'])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(Product.objects.get(sku='P0').stock_quantity, 100)
+
+    @override_settings(INVENTORY_COSTING='FIFO')
+    def test_purchase_basket_receives_stock(self):
+        first, second = self.products[:2]
+        Product.objects.filter(pk=first.pk).update(weighted_cost=Decimal('8'))
+        response = self.checkout([
+            {'product': first.id, 'quantity': 5, 'sale_price': '0'},
+            {'product': second.id, 'quantity': 3, 'sale_price': '0'},
+        ], transaction_type='PURCHASE')
+        self.assertEqual(response.status_code, 201)
+
+        # Tekli alış kaydıyla aynı: işlem maliyetinden mal kabulü
+        first.refresh_from_db()
+        self.assertEqual((first.stock_quantity, first.weighted_cost, first.buying_price), (105, Decimal('8.00'), Decimal('8.00')))
+        self.assertEqual(Product.objects.get(pk=second.pk).stock_quantity, 103)
+        tx = Transaction.objects.get(product=first)
+        movement = StockMovement.objects.get(transaction=tx)
+        self.assertEqual((movement.kind, movement.quantity, movement.value), ('PURCHASE', 5, Decimal('40.00')))
+        self.assertEqual(list(CostLayer.objects.filter(transaction=tx).values_list('remaining', 'unit_cost')), [(5, Decimal('8.0000'))])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'))
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='SALE', order_number='S1',
+            sale_price=Decimal('100'), cost_at_transaction=Decimal('40'), transaction_date=timezone.now(),
+        )
+
+    def test_repeated_requests_are_served_from_cache(self):
+        first = self.client.get('/api/finance/dashboard/').data
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/finance/dashboard/').data
+        self.assertEqual(first, second)
+
+        self.client.get('/api/finance/dashboard/', {'period': 'monthly'})
+        self.assertEqual((cache_stats()['hits'], cache_stats()['misses']), (1, 2))
+
+    def test_cached_responses_expire_at_midnight(self):
+        self.client.get('/api/finance/dashboard/')
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.now', return_value=tomorrow):
+            chart = self.client.get('/api/finance/dashboard/').data['chart_data']
+        self.assertEqual(chart[-1]['date'], timezone.localtime(tomorrow).strftime("%d/%m"))
+        self.assertEqual((cache_stats()['hits'], cache_stats()['misses']), (0, 2))
+
+    def test_writes_invalidate_cached_responses(self):
+        self.assertEqual(self.client.get('/api/finance/dashboard/').data['net_profit'], Decimal('60'))
+
+        Expense.objects.create(category='RENT', amount=Decimal('15'), expense_date=timezone.localdate())
+        self.assertEqual(self.client.get('/api/finance/dashboard/').data['net_profit'], Decimal('45'))
+
+        self.product.name = 'Yeni Ad'
+        self.product.save()
+        recent = self.client.get('/api/finance/dashboard/').data['recent_transactions']
+        self.assertEqual(recent[0]['product_details']['name'], 'Yeni Ad')
+
+    def test_bulk_delete_bumps_data_version_once(self):
+        for i in range(5):
+            Transaction.objects.create(
+                marketplace=self.marketplace, product=self.product, transaction_type='SALE', order_number=f'B{i}',
+                sale_price=Decimal('10'), cost_at_transaction=Decimal('4'), transaction_date=timezone.now(),
+            )
+        before = cache_stats()['data_version']
+        self.client.post('/api/finance/transactions/bulk_delete/', {
+            'ids': list(Transaction.objects.values_list('id', flat=True)),
+        }, format='json')
+
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertEqual(cache_stats()['data_version'], before + 1)
+
+    def test_import_invalidates_cached_responses(self):
+        from integrations.services import ExcelProcessor
+        from integrations.tests import make_csv
+
+        self.client.get('/api/finance/dashboard/')
+        ExcelProcessor(marketplace=self.marketplace, file_type='SALES').process_sales_file(make_csv([
+            {'order_number': 'S2', 'sku': 'A1', 'sale_price': 50, 'transaction_date': timezone.now().isoformat()},
+        ]))
+        self.assertEqual(self.client.get('/api/finance/dashboard/').data['total_sales'], Decimal('150'))
+
+        stats = self.client.get('/api/finance/cache-stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+
+class StoredTotalsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('30'))
+
+    def create(self, order_number, sale_price, quantity=1, **extra):
+        return Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='SALE', order_number=order_number,
+            quantity=quantity, sale_price=Decimal(sale_price), cost_at_transaction=Decimal('30'),
+            commission_amount=Decimal('2.50'), transaction_date=timezone.now(), **extra,
+        )
+
+    def test_totals_are_stored_on_every_write(self):
+        tx = self.create('S1', '100', quantity=2)
+        tx.refresh_from_db()
+        self.assertEqual((tx.total_cost, tx.net_profit), (Decimal('62.50'), Decimal('37.50')))
+
+        tx.sale_price = Decimal('50')
+        tx.save(update_fields=['sale_price'])
+        tx.refresh_from_db()
+        self.assertEqual(tx.net_profit, Decimal('-12.50'))
+
+        data = self.client.get(f'/api/finance/transactions/{tx.id}/').data
+        self.assertEqual((data['total_cost'], data['net_profit']), (Decimal('62.50'), Decimal('-12.50')))
+
+    def test_import_stores_totals(self):
+        from integrations.services import ExcelProcessor
+        from integrations.tests import make_csv
+
+        Product.objects.filter(pk=self.product.pk).update(weighted_cost=Decimal('30'))
+        ExcelProcessor(marketplace=self.marketplace, file_type='SALES').process_sales_file(make_csv([
+            {'order_number': 'S1', 'sku': 'A1', 'sale_price': 45.1, 'quantity': 1, 'commission_amount': 5.2},
+        ]))
+        self.assertEqual(Transaction.objects.values_list('total_cost', 'net_profit').get(), (Decimal('35.20'), Decimal('9.90')))
+
+    def test_top_losses_use_the_index(self):
+        for i, price in enumerate(['10', '100', '25', '5']):
+            self.create(f'S{i}', price)
+
+        losses = self.client.get('/api/finance/transactions/top_losses/', {'limit': 2}).data
+        self.assertEqual([row['order_number'] for row in losses], ['S3', 'S0'])
+
+        query = Transaction.objects.filter(transaction_type='SALE', net_profit__lt=0).order_by('net_profit')
+        self.assertIn('transaction_net_profit_idx', query.explain())
+
+
+class ProductProfitabilityTests(TestCase):
+    URL = '/api/finance/reports/products/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.trendyol = Marketplace.objects.create(name='Trendyol')
+        self.hepsiburada = Marketplace.objects.create(name='Hepsiburada')
+        self.products = [
+            Product.objects.create(sku=f'P{i:02d}', name=f'Ürün {i}', buying_price=Decimal('10')) for i in range(12)
+        ]
+        self.now = timezone.now()
+
+    def sell(self, product, sale_price, quantity=1, marketplace=None, days_ago=0, commission='0'):
+        return Transaction.objects.create(
+            marketplace=marketplace or self.trendyol, product=product, transaction_type='SALE',
+            order_number=f'S{Transaction.objects.count()}', quantity=quantity, sale_price=Decimal(sale_price),
+            cost_at_transaction=Decimal('10'), commission_amount=Decimal(commission), shipping_cost=Decimal('2'),
+            transaction_date=self.now - timedelta(days=days_ago),
+        )
+
+    def test_aggregates_per_product_and_marketplace(self):
+        first, second = self.products[:2]
+        self.sell(first, '100', quantity=2, commission='5')
+        self.sell(first, '60', marketplace=self.hepsiburada)
+        self.sell(second, '15')
+
+        rows = self.client.get(self.URL).data['results']
+        self.assertEqual([row['sku'] for row in rows], ['P00', 'P01'])
+        self.assertEqual(rows[0], {
+            'product_id': first.id, 'sku': 'P00', 'name': 'Ürün 0', 'units': 3, 'revenue': Decimal('160.00'),
+            'cogs': Decimal('30.00'), 'commission': Decimal('5.00'), 'shipping': Decimal('4.00'),
+            'profit': Decimal('121.00'), 'margin': Decimal('75.63'),
+        })
+
+        rows = self.client.get(self.URL, {'by_marketplace': '1', 'ordering': 'revenue'}).data['results']
+        self.assertEqual(
+            [(row['sku'], row['marketplace_name'], row['revenue']) for row in rows],
+            [('P01', 'Trendyol', Decimal('15.00')), ('P00', 'Hepsiburada', Decimal('60.00')), ('P00', 'Trendyol', Decimal('100.00'))],
+        )
+
+        rows = self.client.get(self.URL, {'marketplace': self.hepsiburada.id}).data['results']
+        self.assertEqual([(row['sku'], row['units']) for row in rows], [('P00', 1)])
+
+    def test_date_range(self):
+        self.sell(self.products[0], '50', days_ago=10)
+        self.sell(self.products[1], '50')
+        today = timezone.localdate()
+        rows = self.client.get(self.URL, {'date_from': (today - timedelta(days=1)).isoformat()}).data['results']
+        self.assertEqual([row['sku'] for row in rows], ['P01'])
+        rows = self.client.get(self.URL, {'date_to': (today - timedelta(days=5)).isoformat()}).data['results']
+        self.assertEqual([row['sku'] for row in rows], ['P00'])
+        self.assertEqual(self.client.get(self.URL, {'date_from': '2025-13-01'}).status_code, 400)
+
+    def test_keyset_pages_cover_every_product_once(self):
+        # Eşit kâra sahip ürünler de sayfalar arasında kaybolmamalı / tekrar etmemeli
+        for i, product in enumerate(self.products):
+            self.sell(product, str(20 + i % 3))
+
+        for ordering in ('-profit', 'margin', 'sku', '-units'):
+            seen, cursor = [], None
+            while True:
+                params = {'ordering': ordering, 'limit': 5}
+                if cursor:
+                    params['cursor'] = cursor
+                data = self.client.get(self.URL, params).data
+                seen += [row['sku'] for row in data['results']]
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+            self.assertEqual(sorted(seen), [product.sku for product in self.products], ordering)
+            self.assertEqual(len(seen), len(set(seen)), ordering)
+        profits = [row['profit'] for row in self.client.get(self.URL, {'limit': 200}).data['results']]
+        self.assertEqual(profits, sorted(profits, reverse=True))
+        self.assertEqual(self.client.get(self.URL, {'ordering': 'name'}).status_code, 400)
+
+    def test_malformed_cursor_is_rejected(self):
+        for values in (1, ['x', 1], ['10.00', 'x'], ['10.00']):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            self.assertEqual(self.client.get(self.URL, {'cursor': cursor}).status_code, 400, values)
+
+    def test_malformed_marketplace_is_rejected(self):
+        response = self.client.get(self.URL, {'marketplace': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('marketplace', response.data)
+        self.assertEqual(self.client.get(self.URL, {'marketplace': str(self.trendyol.id)}).status_code, 200)
+
+
+class TimeSeriesTests(TestCase):
+    URL = '/api/finance/reports/timeseries/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'))
+
+    def sell(self, day, sale_price):
+        moment = timezone.make_aware(datetime.combine(day, time(12)))
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='SALE',
+            order_number=f'S{Transaction.objects.count()}', sale_price=Decimal(sale_price),
+            cost_at_transaction=Decimal('10'), transaction_date=moment,
+        )
+
+    def test_expenses_land_in_their_own_bucket(self):
+        self.sell(date(2025, 3, 3), '100')
+        self.sell(date(2025, 3, 20), '50')
+        self.sell(date(2025, 4, 1), '30')
+        Expense.objects.create(category='RENT', amount=Decimal('25'), expense_date=date(2025, 3, 15))
+        Expense.objects.create(category='RENT', amount=Decimal('999'), expense_date=date(2024, 1, 1))
+
+        data = self.client.get(self.URL, {'date_from': '2025-03-01', 'date_to': '2025-04-30', 'interval': 'month'}).data
+        self.assertEqual([
+            (row['bucket'], row['revenue'], row['gross_profit'], row['expenses'], row['net_profit'])
+            for row in data['results']
+        ], [
+            (date(2025, 3, 1), Decimal('150.00'), Decimal('130.00'), Decimal('25.00'), Decimal('105.00')),
+            (date(2025, 4, 1), Decimal('30.00'), Decimal('20.00'), Decimal('0.00'), Decimal('20.00')),
+        ])
+        self.assertEqual(data['totals']['net_profit'], Decimal('125.00'))
+
+        weeks = self.client.get(self.URL, {'date_from': '2025-03-01', 'date_to': '2025-03-31', 'interval': 'week'}).data
+        self.assertEqual(weeks['results'][0]['bucket'], date(2025, 2, 24))
+        self.assertEqual(
+            [(row['bucket'], row['revenue']) for row in weeks['results'] if row['revenue']],
+            [(date(2025, 3, 3), Decimal('100.00')), (date(2025, 3, 17), Decimal('50.00'))],
+        )
+
+    def test_year_over_year_costs_two_queries(self):
+        self.sell(date(2025, 3, 3), '100')
+        self.sell(date(2024, 3, 10), '40')
+        Expense.objects.create(category='RENT', amount=Decimal('5'), expense_date=date(2024, 3, 1))
+
+        with self.assertNumQueries(2):
+            data = self.client.get(self.URL, {
+                'date_from': '2025-01-01', 'date_to': '2025-12-31', 'interval': 'month', 'compare': 'previous_year',
+            }).data
+        march = data['results'][2]
+        self.assertEqual((march['revenue'], march['previous']['bucket'], march['previous']['revenue']),
+                         (Decimal('100.00'), date(2024, 3, 1), Decimal('40.00')))
+        self.assertEqual(data['previous_totals']['net_profit'], Decimal('25.00'))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.URL, {'interval': 'hour'}).status_code, 400)
+        self.assertEqual(self.client.get(self.URL, {'date_from': '2025-02-01', 'date_to': '2025-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.URL, {'date_from': '2000-01-01', 'interval': 'day'}).status_code, 400)
+
+
+class TransactionPaginationTests(TestCase):
+    URL = '/api/finance/transactions/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.now = timezone.now()
+        # Aynı tarihli işlemler: sıra id ile kırılmalı
+        for i in range(25):
+            self.create(f'S{i}', self.now - timedelta(hours=i // 2))
+
+    def create(self, order_number, moment):
+        return Transaction.objects.create(
+            marketplace=self.marketplace, transaction_type='SALE', order_number=order_number,
+            sale_price=Decimal('10'), cost_at_transaction=Decimal('4'), transaction_date=moment,
+        )
+
+    def walk(self, **params):
+        seen, cursor = [], None
+        while True:
+            data = self.client.get(self.URL, {**params, **({'cursor': cursor} if cursor else {})}).data
+            seen += [row['order_number'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen
+
+    def test_pages_follow_date_then_id(self):
+        expected = list(
+            Transaction.objects.order_by('-transaction_date', '-id').values_list('order_number', flat=True)
+        )
+        self.assertEqual(self.walk(page_size=4), expected)
+
+        first = self.client.get(self.URL, {'page_size': 2, 'count': '1'}).data
+        self.assertEqual((len(first['results']), first['count'], first['count_is_estimate']), (2, 25, False))
+        self.assertIn('cursor=', first['next'])
+        self.assertEqual(self.client.get(self.URL, {'cursor': 'bozuk'}).status_code, 400)
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        for values in (['x', 1], ['2025-03-01T10:00:00+00:00', 'x'], [1, 2], [None, 1], {'a': 1}, 1):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            self.assertEqual(self.client.get(self.URL, {'cursor': cursor}).status_code, 400, values)
+
+    def test_cursor_is_stable_under_concurrent_inserts(self):
+        first = self.client.get(self.URL, {'page_size': 5}).data
+        # Sayfalar arasında hem listenin başına hem de sayfa sınırına denk gelen kayıtlar eklenir
+        self.create('YENI-1', self.now + timedelta(hours=1))
+        boundary = Transaction.objects.get(order_number=first['results'][-1]['order_number'])
+        self.create('YENI-2', boundary.transaction_date)
+
+        second = self.client.get(self.URL, {'page_size': 5, 'cursor': first['next_cursor']}).data
+        first_rows = [row['order_number'] for row in first['results']]
+        second_rows = [row['order_number'] for row in second['results']]
+        self.assertFalse(set(first_rows) & set(second_rows))
+        self.assertNotIn('YENI-1', second_rows)
+        # Daha sonra eklenen ama aynı tarihli kayıt daha büyük id'ye sahip; önceki sayfaya düşer
+        self.assertNotIn('YENI-2', second_rows)
+        expected = list(
+            Transaction.objects.exclude(order_number__startswith='YENI')
+            .order_by('-transaction_date', '-id').values_list('order_number', flat=True)[5:10]
+        )
+        self.assertEqual(second_rows, expected)
+
+    def test_list_query_count_is_constant(self):
+        product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('4'))
+        Transaction.objects.filter(order_number__in=['S0', 'S1']).update(product=product)
+        for page_size in (2, 25):
+            with self.assertNumQueries(1):
+                response = self.client.get(self.URL, {'page_size': page_size})
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_lean_list_matches_the_serializer(self):
+        from .serializers import TransactionSerializer
+
+        product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('4'))
+        Transaction.objects.filter(order_number='S3').update(product=product, commission_amount=Decimal('1.5'))
+        rows = self.client.get(self.URL, {'page_size': 100}).data['results']
+        expected = TransactionSerializer(
+            Transaction.objects.order_by('-transaction_date', '-id'), many=True,
+        ).data
+        self.assertEqual(rows, expected)
+        self.assertEqual([row['product_name'] for row in rows if 'product_sku' in row], ['Ürün A'])
+
+    def test_export_streams_filtered_rows(self):
+        import csv
+        import io
+        from openpyxl import load_workbook
+
+        Transaction.objects.filter(order_number__in=['S0', 'S1']).update(transaction_type='RETURN')
+        response = self.client.get('/api/finance/transactions/export/', {'transaction_type': 'RETURN'})
+        self.assertTrue(response.streaming)
+        self.assertIn('islemler.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:3], ['Tarih', 'Sipariş No', 'Pazaryeri'])
+        self.assertEqual([row[1] for row in rows[1:]], ['S1', 'S0'])
+        self.assertEqual(rows[1][7], '10.00')
+
+        response = self.client.get('/api/finance/transactions/export/', {'file_format': 'xlsx'})
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        values = list(sheet.values)
+        self.assertEqual(len(values), 26)
+        self.assertEqual((values[1][1], values[1][2], values[1][7]), ('S1', 'Trendyol', 10))
+        self.assertEqual(self.client.get('/api/finance/transactions/export/', {'file_format': 'pdf'}).status_code, 400)
+
+    def test_filters_apply_before_the_cursor(self):
+        Transaction.objects.filter(order_number__in=['S0', 'S1']).update(transaction_type='RETURN')
+        self.assertEqual(len(self.walk(page_size=3, transaction_type='SALE')), 23)
+
+    def test_search_and_marketplace_filters(self):
+        other = Marketplace.objects.create(name='Hepsiburada')
+        Transaction.objects.filter(order_number__in=['S3', 'S13']).update(marketplace=other)
+
+        self.assertEqual(sorted(self.walk(page_size=2, search='s1')), sorted(f'S1{i}' for i in ['', *range(10)]))
+        self.assertEqual(sorted(self.walk(page_size=2, marketplace=other.id)), ['S13', 'S3'])
+        self.assertEqual(self.walk(marketplace=other.id, search='13'), ['S13'])
+        self.assertEqual(self.client.get(self.URL, {'marketplace': 'x'}).status_code, 400)
+
+        # Dışa aktarma ekrandaki listeyle aynı filtreleri uygular
+        response = self.client.get('/api/finance/transactions/export/', {'marketplace': other.id, 'search': '13'})
+        rows = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual([row.split(',')[1] for row in rows[1:]], ['S13'])
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN çıktısı SQLite'a özgü")
+class QueryPlanTests(TestCase):
+    """
+    Sık kullanılan uç noktaların çalıştırdığı her SELECT için EXPLAIN QUERY PLAN alınır;
+    tablo indekssiz baştan sona taranıyorsa (SCAN <tablo>) test başarısız olur.
+    """
+    # Tüm satırların toplamı istendiği için taranması beklenen küçük tablolar
+    ALLOWED_SCANS = {'finance_expense'}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        marketplace = Marketplace.objects.create(name='Trendyol')
+        product = Product.objects.create(sku='A1', name='Ürün A', barcode='8690001', buying_price=Decimal('10'))
+        for i in range(3):
+            Transaction.objects.create(
+                marketplace=marketplace, product=product, transaction_type='SALE', order_number=f'S{i}',
+                sale_price=Decimal('50'), cost_at_transaction=Decimal('10'), transaction_date=timezone.now(),
+            )
+
+    def full_scans(self, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in captured.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                # Alt sorgulardaki takma adlar (FROM "finance_expense" U0) tablo adına çevrilir
+                aliases = dict((alias, table) for table, alias in re.findall(r'"(\w+)" (U\d+)', query['sql']))
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                for row in cursor.fetchall():
+                    match = re.match(r'SCAN (\w+)', row[-1])
+                    table = match and aliases.get(match.group(1), match.group(1))
+                    if match and 'INDEX' not in row[-1] and table not in self.ALLOWED_SCANS:
+                        scans.append(f"{row[-1]}  <-  {query['sql']}")
+        return scans
+
+    def test_dashboard(self):
+        for period in ('daily', 'monthly'):
+            self.assertEqual(self.full_scans('/api/finance/dashboard/', {'period': period}), [])
+
+    def test_transaction_list(self):
+        today = timezone.localdate().isoformat()
+        self.assertEqual(self.full_scans('/api/finance/transactions/'), [])
+        self.assertEqual(self.full_scans('/api/finance/transactions/', {
+            'transaction_type': 'SALE', 'date_from': today, 'date_to': today,
+        }), [])
+        self.assertEqual(self.full_scans('/api/finance/transactions/top_losses/'), [])
+        cursor = self.client.get('/api/finance/transactions/', {'page_size': 1}).data['next_cursor']
+        self.assertEqual(self.full_scans('/api/finance/transactions/', {'page_size': 1, 'cursor': cursor}), [])
+
+    def test_product_lookup(self):
+        self.assertEqual(self.full_scans('/api/products/lookup/', {'barcode': '8690001'}), [])
+        self.assertEqual(self.full_scans('/api/products/'), [])
+
+    def test_product_profitability(self):
+        self.assertEqual(self.full_scans('/api/finance/reports/products/', {'date_from': '2025-01-01'}), [])
+
+    def test_time_series(self):
+        self.assertEqual(self.full_scans('/api/finance/reports/timeseries/', {'interval': 'week', 'compare': 'previous_year'}), [])
+
+
+class RecomputeCostsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A')
+        start = timezone.make_aware(datetime(2025, 3, 1, 12))
+        # Alış 10 @ 10, satış 4, alış 10 @ 20 (ortalama 16.25), satış 5
+        self.first_purchase = self.purchase(10, '10', start)
+        self.sell(4, start + timedelta(days=1), 'S1')
+        self.purchase(10, '20', start + timedelta(days=2))
+        self.sell(5, start + timedelta(days=3), 'S2')
+
+    def purchase(self, quantity, price, moment):
+        return Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='PURCHASE',
+            order_number=f'P{moment:%d}', quantity=quantity, sale_price=0, cost_at_transaction=Decimal(price),
+            transaction_date=moment,
+        )
+
+    def sell(self, quantity, moment, order_number):
+        response = self.client.post('/api/finance/transactions/', {
+            'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+            'order_number': order_number, 'quantity': quantity, 'sale_price': '200.00',
+            'transaction_date': moment.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def sale_costs(self):
+        return list(Transaction.objects.filter(transaction_type='SALE').order_by('transaction_date')
+                    .values_list('cost_at_transaction', 'total_cost', 'net_profit'))
+
+    def rollups(self):
+        return sorted(DailyRollup.objects.values_list('date', 'transaction_type', 'cost', 'profit'))
+
+    def test_corrected_purchase_price_is_replayed(self):
+        self.assertEqual(self.sale_costs()[1][0], Decimal('16.25'))
+        self.first_purchase.cost_at_transaction = Decimal('12')
+        self.first_purchase.save()
+
+        call_command('recompute_costs', stdout=io.StringIO())
+
+        # 4 * 12 = 48; (6 * 12 + 10 * 20) / 16 = 17 → 5 * 17 = 85
+        self.assertEqual(self.sale_costs(), [
+            (Decimal('12.00'), Decimal('48.00'), Decimal('152.00')),
+            (Decimal('17.00'), Decimal('85.00'), Decimal('115.00')),
+        ])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.weighted_cost, Decimal('17.00'))
+        values = list(StockMovement.objects.filter(kind='SALE').order_by('occurred_at').values_list('value', flat=True))
+        self.assertEqual(values, [Decimal('-48.00'), Decimal('-85.00')])
+        # Özet tablosu farklarla güncellendi: sıfırdan kurulanla aynı
+        updated = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(updated, self.rollups())
+        self.assertFalse(RecomputeCheckpoint.objects.exists())
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self):
+        self.first_purchase.cost_at_transaction = Decimal('12')
+        self.first_purchase.save()
+        calls = []
+
+        def interrupt(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return apply_page(*args, **kwargs)
+
+        with mock.patch('finance.recompute.apply_page', side_effect=interrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                recompute_costs(chunk_size=1)
+        checkpoint = RecomputeCheckpoint.objects.get()
+        self.assertEqual((checkpoint.processed, checkpoint.changed), (2, 1))
+        self.assertEqual(self.sale_costs()[0][0], Decimal('12.00'))
+
+        with self.assertRaises(ValueError):
+            recompute_costs(workers=2)
+        self.assertEqual(recompute_costs(chunk_size=1), (4, 2))
+        self.assertEqual([cost for cost, _, _ in self.sale_costs()], [Decimal('12.00'), Decimal('17.00')])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.weighted_cost, Decimal('17.00'))
+
+    def test_opening_balance_written_after_the_history_is_not_replayed(self):
+        # Defter sonradan kuruldu: mevcut stok (11 @ 16.25) bugünün tarihiyle açılış olarak yazılmış
+        StockMovement.objects.create(product=self.product, kind='OPENING', quantity=11, value=Decimal('178.75'))
+        self.first_purchase.cost_at_transaction = Decimal('12')
+        self.first_purchase.save()
+
+        recompute_costs()
+        self.assertEqual([cost for cost, _, _ in self.sale_costs()], [Decimal('12.00'), Decimal('17.00')])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.weighted_cost, Decimal('17.00'))
+
+    def test_stock_import_is_replayed_with_later_purchases(self):
+        from integrations.services import ExcelProcessor
+        from integrations.tests import make_csv
+
+        # İçe aktarma: 10 @ 10 (defterde IMPORT), sonra alış 10 @ 20 (ortalama 15), satış 5, sayım -2
+        ExcelProcessor(marketplace=self.marketplace, file_type='STOCK').process_stock_file(make_csv([
+            {'sku': 'B1', 'name': 'Ürün B', 'stock_quantity': 10, 'buying_price': 10},
+        ]))
+        product = Product.objects.get(sku='B1')
+        later = timezone.now() + timedelta(days=1)
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=product, transaction_type='PURCHASE', order_number='PB',
+            quantity=10, sale_price=0, cost_at_transaction=Decimal('20'), transaction_date=later,
+        )
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=product, transaction_type='SALE', order_number='SB',
+            quantity=5, sale_price=100, cost_at_transaction=Decimal('15'), transaction_date=later + timedelta(days=1),
+        )
+        product.refresh_from_db()
+        product.stock_quantity -= 2
+        product.save()
+        StockMovement.objects.filter(product=product, kind='ADJUSTMENT').update(occurred_at=later + timedelta(days=2))
+        self.assertEqual(list(StockMovement.objects.filter(product=product).exclude(kind__in=['PURCHASE', 'SALE'])
+                              .values_list('kind', 'quantity')), [('IMPORT', 10), ('ADJUSTMENT', -2)])
+
+        for chunk_size in (1, 100):
+            recompute_costs(chunk_size=chunk_size)
+            self.assertEqual(Transaction.objects.get(order_number='SB').cost_at_transaction, Decimal('15.00'))
+            product.refresh_from_db()
+            self.assertEqual(product.weighted_cost, Decimal('15.00'))
+
+
+class RecomputeCostsWorkerTests(TransactionTestCase):
+    def test_products_are_split_across_processes(self):
+        marketplace = Marketplace.objects.create(name='Trendyol')
+        moment = timezone.make_aware(datetime(2025, 3, 1, 12))
+        for i in range(4):
+            product = Product.objects.create(sku=f'P{i}', name=f'Ürün {i}')
+            for day, (kind, quantity, cost) in enumerate((('PURCHASE', 10, 10 + i), ('SALE', 5, 0), ('PURCHASE', 5, 20 + i), ('SALE', 1, 0))):
+                Transaction.objects.create(
+                    marketplace=marketplace, product=product, transaction_type=kind, order_number=f'O{i}{day}',
+                    quantity=quantity, sale_price=100, cost_at_transaction=cost,
+                    transaction_date=moment + timedelta(days=day),
+                )
+
+        self.assertEqual(recompute_costs(workers=2, chunk_size=3), (16, 8))
+        # (5 * (10 + i) + 5 * (20 + i)) / 10 = 15 + i
+        costs = dict(Transaction.objects.filter(transaction_type='SALE', order_number__endswith='3')
+                     .values_list('product__sku', 'cost_at_transaction'))
+        self.assertEqual(costs, {f'P{i}': Decimal(15 + i) for i in range(4)})
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'weighted_cost')),
+            {f'P{i}': Decimal(15 + i) for i in range(4)},
+        )
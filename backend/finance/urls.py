@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import DashboardStatsView, TransactionViewSet
-from .views import DashboardStatsView, TransactionViewSet, ExpenseViewSet # Import'a ekleyin
+from .views import DashboardStatsView, TransactionViewSet, ExpenseViewSet, CacheStatsView # Import'a ekleyin
+from .views import ProductProfitabilityView, TimeSeriesView
 
 router = DefaultRouter()
 router.register(r'transactions', TransactionViewSet) # /api/finance/transactions/
@@ -10,4 +11,7 @@ router.register(r'expenses', ExpenseViewSet) # <--- YENİ EKLENEN SATIR
 urlpatterns = [
     path('', include(router.urls)),
     path('dashboard/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('reports/products/', ProductProfitabilityView.as_view(), name='product-profitability'),
+    path('reports/timeseries/', TimeSeriesView.as_view(), name='time-series'),
 ]
\ No newline at end of file
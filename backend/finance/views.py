@@ -3,83 +3,199 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status, viewsets
-from django.db.models import Sum
+from django.db.models import F, Func, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 from django.db import transaction
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 import traceback
-from decimal import Decimal
-from .models import Transaction, Expense
-from .serializers import TransactionSerializer, ExpenseSerializer
+from decimal import ROUND_DOWN, Decimal
+from .models import CENT, Transaction, Expense, DailyRollup
+from .cache import bump_data_version, cache_stats, cached_response
+from .reports import product_profitability, time_series
+from .rollups import MONEY, money, record_transactions, rollup_batch
+from .serializers import TransactionListEncoder, TransactionSerializer, ExpenseSerializer, transaction_rows
+from integrations.models import Marketplace
+from products.costing import sale_costs, unit_cost
 from products.models import Product
+from products.stock import adjust_stock, receive_stock, sale_movement
+from core.exports import export_response
+from core.pagination import KeysetPagination
+
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+def chart_buckets(period, today):
+    """
+    Grafiğin kovaları (en eskiden bugüne): [(kova başlangıcı, etiket), ...].
+    monthly: son 12 ay, diğer her değer: son 30 gün.
+    """
+    if period == 'monthly':
+        buckets = []
+        year, month = today.year, today.month
+        for _ in range(12):
+            buckets.append((date(year, month, 1), f"{month}/{year}"))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return buckets[::-1]
+    return [
+        (day, day.strftime("%d/%m"))
+        for day in (today - timedelta(days=i) for i in range(29, -1, -1))
+    ]
+
+
+def split_amount(total, parts):
+    """
+    Tutarı kuruş kaybı olmadan parçalara böler (sepet kargosu satırlara): artan kuruşlar
+    ilk satırlara eklenir, toplam her zaman girilen tutara eşittir.
+    """
+    total = Decimal(str(total or '0')).quantize(CENT)
+    share = (total / parts).quantize(CENT, rounding=ROUND_DOWN)
+    remainder = int((total - share * parts) / CENT)
+    return [share + CENT if i < remainder else share for i in range(parts)]
+
+
+def day_start(value, param):
+    """'YYYY-MM-DD' değerini o günün (geçerli saat dilimindeki) başlangıç anına çevirir."""
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({param: "Tarih YYYY-AA-GG biçiminde olmalı."})
+    return timezone.make_aware(datetime.combine(day, time.min))
+
 
 class DashboardStatsView(APIView):
+    """
+    Özet kartlar, kâr grafiği ve son işlemler. Tutarlar ham işlemlerden değil günlük
+    özet tablosundan (DailyRollup) okunur; süre işlem geçmişinin uzunluğuna bağlı değildir.
+    Toplamlar, kova bazında gruplanmış grafik ve son işlemler olmak üzere üç sorgu çalışır.
+    """
+
+    @cached_response('dashboard', params=('period',))
     def get(self, request):
         try:
-            sales_agg = Transaction.objects.filter(transaction_type='SALE').aggregate(total=Sum('sale_price'))
-            total_sales = float(sales_agg['total'] or 0)
-            
-            gross_profit_from_sales = 0.0
-            all_sales = Transaction.objects.filter(transaction_type='SALE').select_related('product')
-            
-            for t in all_sales:
-                s = float(t.sale_price or 0)
-                m = float(t.cost_at_transaction or 0)
-                c = float(t.commission_amount or 0)
-                k = float(t.shipping_cost or 0)
-                q = float(t.quantity or 1)
-                gross_profit_from_sales += (s - (m * q + c + k))
-
-            expense_agg = Expense.objects.aggregate(total=Sum('amount'))
-            total_expenses = float(expense_agg['total'] or 0)
-            real_net_profit = gross_profit_from_sales - total_expenses
+            sales = DailyRollup.objects.filter(transaction_type='SALE')
+
+            # 1) Özet: satış, brüt kâr ve (alt sorguyla) giderler tek sorguda
+            expenses = Expense.objects.order_by().values(total=Func(F('amount'), function='SUM'))
+            totals = sales.aggregate(
+                total_sales=Coalesce(Sum('revenue'), ZERO),
+                gross_profit=Coalesce(Sum('profit'), ZERO),
+                net_profit=Coalesce(Sum('profit'), ZERO) - Coalesce(Subquery(expenses, output_field=MONEY), ZERO),
+            )
+            totals = {key: money(value) for key, value in totals.items()}
+            total_expenses = totals['gross_profit'] - totals['net_profit']
 
+            # 2) Grafik: kovalara göre gruplanmış tek sorgu; satışı olmayan kovalar 0 ile doldurulur
             period = request.query_params.get('period', 'daily')
-            chart_data = []
-            today = timezone.now().date()
-
-            if period == 'monthly':
-                for i in range(11, -1, -1):
-                    target_month = today.month - i
-                    target_year = today.year
-                    while target_month <= 0:
-                        target_month += 12
-                        target_year -= 1
-                    monthly_txs = Transaction.objects.filter(transaction_type='SALE', transaction_date__year=target_year, transaction_date__month=target_month)
-                    monthly_profit = 0
-                    for t in monthly_txs:
-                        s, m, c, k, q = float(t.sale_price or 0), float(t.cost_at_transaction or 0), float(t.commission_amount or 0), float(t.shipping_cost or 0), float(t.quantity or 1)
-                        monthly_profit += (s - (m * q + c + k))
-                    chart_data.append({"date": f"{target_month}/{target_year}", "profit": round(monthly_profit, 2)})
-            else:
-                for i in range(29, -1, -1):
-                    target_date = today - timezone.timedelta(days=i)
-                    daily_txs = Transaction.objects.filter(transaction_type='SALE', transaction_date__year=target_date.year, transaction_date__month=target_date.month, transaction_date__day=target_date.day)
-                    daily_profit = 0
-                    for t in daily_txs:
-                        s, m, c, k, q = float(t.sale_price or 0), float(t.cost_at_transaction or 0), float(t.commission_amount or 0), float(t.shipping_cost or 0), float(t.quantity or 1)
-                        daily_profit += (s - (m * q + c + k))
-                    chart_data.append({"date": target_date.strftime("%d/%m"), "profit": round(daily_profit, 2)})
-
-            recent_qs = Transaction.objects.all().order_by('-transaction_date', '-id')[:5]
+            buckets = chart_buckets(period, timezone.localdate())
+            rows = (
+                sales.filter(date__gte=buckets[0][0])
+                .annotate(bucket=TruncMonth('date') if period == 'monthly' else F('date'))
+                .values('bucket')
+                .annotate(profit=Sum('profit'))
+                .order_by()
+            )
+            profits = {row['bucket']: money(row['profit']) for row in rows}
+            chart_data = [
+                {"date": label, "profit": profits.get(start, money(0))}
+                for start, label in buckets
+            ]
+
+            # 3) Son işlemler: ürün ve pazaryeri aynı sorguda
+            recent_qs = Transaction.objects.select_related('product', 'marketplace').order_by('-transaction_date', '-id')[:5]
             recent_transactions = []
             for tx in recent_qs:
                 recent_transactions.append({
                     "id": tx.id,
                     "transaction_date": tx.transaction_date,
-                    "sale_price": float(tx.sale_price or 0),
+                    "sale_price": tx.sale_price,
                     "product_details": {"name": tx.product.name if tx.product else "Bilinmeyen"},
                     "marketplace_details": {"name": str(tx.marketplace.name) if tx.marketplace else "-"},
                 })
 
-            return Response({"total_sales": total_sales, "gross_profit": gross_profit_from_sales, "total_expenses": total_expenses, "net_profit": real_net_profit, "chart_data": chart_data, "recent_transactions": recent_transactions})
+            return Response({
+                "total_sales": totals['total_sales'],
+                "gross_profit": totals['gross_profit'],
+                "total_expenses": total_expenses,
+                "net_profit": totals['net_profit'],
+                "chart_data": chart_data,
+                "recent_transactions": recent_transactions,
+            })
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+class CacheStatsView(APIView):
+    """Rapor önbelleğinin isabet/ıskalama sayıları ve güncel veri sürümü."""
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class ProductProfitabilityView(APIView):
+    """
+    Ürün bazında kârlılık sıralaması (bkz. reports.product_profitability).
+    SMM özet tablosundan gelir; panodaki gibi adedi 0 girilmiş satırlar 1 adet sayılır.
+    """
+
+    @cached_response('product_profitability', params=(
+        'date_from', 'date_to', 'marketplace', 'by_marketplace', 'transaction_type', 'ordering', 'limit', 'cursor',
+    ))
+    def get(self, request):
+        return Response(product_profitability(request.query_params))
+
+
+class TimeSeriesView(APIView):
+    """Gün/hafta/ay kovalarında ciro, kâr ve dönemine göre dağıtılmış giderler (bkz. reports.time_series)."""
+
+    @cached_response('time_series', params=('date_from', 'date_to', 'interval', 'compare'))
+    def get(self, request):
+        return Response(time_series(request.query_params))
+
 class TransactionViewSet(ModelViewSet):
-    queryset = Transaction.objects.all().order_by('-transaction_date')
+    queryset = Transaction.objects.select_related('product', 'marketplace').order_by('-transaction_date')
     serializer_class = TransactionSerializer
     filterset_fields = ['transaction_type']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-transaction_date', '-id')
+
+    def get_queryset(self):
+        """
+        ?transaction_type=SALE&date_from=2025-01-01&date_to=2025-01-31 filtreleri;
+        (transaction_type, transaction_date) indeksini kullanır. ?marketplace= pazaryerine,
+        ?search= sipariş numarası ya da ürün adına göre süzer.
+        """
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get('transaction_type'):
+            queryset = queryset.filter(transaction_type=params['transaction_type'])
+        if params.get('marketplace'):
+            if not params['marketplace'].isdigit():
+                raise ValidationError({"marketplace": "Pazaryeri bir sayı olmalı."})
+            queryset = queryset.filter(marketplace_id=params['marketplace'])
+        search = params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(Q(order_number__icontains=search) | Q(product__name__icontains=search))
+        # Gün sınırları saat dilimine göre zaman aralığına çevrilir; __date araması sütunu
+        # fonksiyona sardığı için indeks kullanılamazdı
+        if params.get('date_from'):
+            queryset = queryset.filter(transaction_date__gte=day_start(params['date_from'], 'date_from'))
+        if params.get('date_to'):
+            queryset = queryset.filter(transaction_date__lt=day_start(params['date_to'], 'date_to') + timedelta(days=1))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Liste hafif yoldan okunur: yalnızca gereken sütunlar JOIN'lenmiş values() satırları olarak
+        gelir ve model örneği kurulmadan kodlanır. Satır sayısından bağımsız olarak tek sorgu
+        (?count=1 ile iki) çalışır; çıktı TransactionSerializer ile aynıdır.
+        """
+        rows = transaction_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(TransactionListEncoder().encode(page))
 
     def perform_create(self, serializer):
         """
@@ -89,23 +205,25 @@ class TransactionViewSet(ModelViewSet):
         quantity = serializer.validated_data.get('quantity', 1)
         transaction_type = serializer.validated_data.get('transaction_type', 'SALE')
         
-        cost = Decimal('0')
-        if product:
-            cost = product.weighted_cost if product.weighted_cost > 0 else product.buying_price
-            
-            # --- STOKTAN DÜŞÜM ---
-            if transaction_type == 'SALE':
-                product.stock_quantity -= quantity
-                product.save() # Product modelindeki save mantığı tetiklenir
-        
-        serializer.save(cost_at_transaction=cost)
+        cost, line_cost = Decimal('0'), None
+        with transaction.atomic():
+            if product and transaction_type == 'SALE':
+                # Maliyet yöntemine göre (ortalama / FIFO katmanları); bkz. products/costing.py
+                (cost, line_cost), = sale_costs([(product, quantity)])
+            elif product:
+                cost = unit_cost(product)
+            tx = serializer.save(cost_at_transaction=cost, line_cost=line_cost)
+            # --- STOKTAN DÜŞÜM: veritabanında 'stok = stok - adet' (eş zamanlı satışlarda kayıp olmaz) ---
+            if product and transaction_type == 'SALE':
+                adjust_stock([sale_movement(tx, line_cost)])
     
     @action(detail=False, methods=['post'], url_path='bulk_create')
     def bulk_create(self, request):
         """
-        SEPET (TOPLU) SATIŞ: Her ürün için stoğu düşer ve kaydeder.
+        SEPET (TOPLU) SATIŞ: Sepet boyutundan bağımsız sabit sayıda sorgu çalışır; ürünler tek
+        sorguda okunur, stoklar tek UPDATE ile düşülür, işlemler tek bulk_create ile yazılır.
+        Alış sepetinde her satır için mal kabulü yapılır (stok, maliyet, defter, FIFO katmanı).
         """
-        print("\n🚀 [DEBUG] BULK_CREATE BASLADI (Stok Düşümü Dahil)")
         try:
             items = request.data.get('items', [])
             common_data = request.data.get('common', {})
@@ -113,48 +231,103 @@ class TransactionViewSet(ModelViewSet):
             if not items:
                 return Response({"error": "Sepet boş"}, status=status.HTTP_400_BAD_REQUEST)
 
+            transaction_type = common_data.get('transaction_type', 'SALE')
+            aware_date = timezone.make_aware(datetime.strptime(common_data['transaction_date'], '%Y-%m-%d'))
+            lines = [(int(item['product']), int(item.get('quantity', 1)), item) for item in items]
+
+            products = Product.objects.only('id', 'weighted_cost', 'buying_price').in_bulk({pid for pid, _, _ in lines})
+            missing = sorted({pid for pid, _, _ in lines} - products.keys())
+            if missing:
+                return Response({"error": f"Ürün bulunamadı: {missing}"}, status=status.HTTP_400_BAD_REQUEST)
+            marketplace_id = int(common_data['marketplace'])
+            if not Marketplace.objects.filter(pk=marketplace_id).exists():
+                return Response({"error": f"Pazaryeri bulunamadı: {marketplace_id}"}, status=status.HTTP_400_BAD_REQUEST)
+
             with transaction.atomic():
-                total_shipping = Decimal(str(common_data.get('shipping_cost') or '0'))
-                shipping_per_item = total_shipping / len(items) if len(items) > 0 else 0
-                
-                aware_date = timezone.make_aware(datetime.strptime(common_data['transaction_date'], '%Y-%m-%d'))
-
-                for item in items:
-                    product = Product.objects.get(id=item['product'])
-                    qty = int(item.get('quantity', 1))
-                    
-                    # Maliyet Hesapla
-                    cost = product.weighted_cost if product.weighted_cost > 0 else product.buying_price
-                    
-                    # --- STOKTAN DÜŞÜM ---
-                    if common_data.get('transaction_type', 'SALE') == 'SALE':
-                        product.stock_quantity -= qty
-                        product.save()
-                    
-                    # Satışı Kaydet
-                    Transaction.objects.create(
-                        marketplace_id=common_data['marketplace'],
+                # Maliyet: ortalama maliyet (yoksa son alış fiyatı) ya da FIFO'da tüketilen katmanlar
+                if transaction_type == 'SALE':
+                    costs = sale_costs([(products[product_id], qty) for product_id, qty, _ in lines])
+                else:
+                    costs = [(unit_cost(products[product_id]), None) for product_id, _, _ in lines]
+
+                objs = []
+                shipping_costs = split_amount(common_data.get('shipping_cost'), len(lines))
+                for (product_id, qty, item), shipping, (cost, line_cost) in zip(lines, shipping_costs, costs):
+                    tx = Transaction(
+                        marketplace_id=marketplace_id,
                         transaction_date=aware_date,
                         order_number=common_data['order_number'],
-                        transaction_type=common_data.get('transaction_type', 'SALE'),
-                        shipping_cost=shipping_per_item,
-                        product=product,
+                        transaction_type=transaction_type,
+                        shipping_cost=shipping,
+                        product=products[product_id],
                         quantity=qty,
                         sale_price=Decimal(str(item.get('sale_price', 0))),
                         commission_amount=Decimal(str(item.get('commission_amount', 0))),
-                        cost_at_transaction=cost
+                        cost_at_transaction=cost,
                     )
-                
-            print("✅ [DEBUG] SATIŞLAR VE STOK GÜNCELLEMELERİ TAMAMLANDI")
-            return Response({"status": "ok"}, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            print(f"❌ [DEBUG] HATA: {str(e)}")
+                    tx.line_cost = line_cost
+                    tx.calculate_totals()
+                    objs.append(tx)
+
+                Transaction.objects.bulk_create(objs)
+                # --- STOKTAN DÜŞÜM: aynı ürünün satırları toplanıp tek UPDATE ile düşülür, hareketler deftere yazılır ---
+                if transaction_type == 'SALE':
+                    adjust_stock([sale_movement(tx, line_cost) for tx, (_, line_cost) in zip(objs, costs)])
+                elif transaction_type == 'PURCHASE':
+                    # bulk_create post_save göndermez: tekli kayıttaki mal kabulü (products/signals.py) burada yapılır
+                    for tx in objs:
+                        receive_stock(tx.product_id, tx.quantity, tx.cost_at_transaction, tx=tx)
+                # bulk_create sinyal göndermez; özet tablosu ve rapor önbelleği burada güncellenir
+                record_transactions(objs)
+                bump_data_version()
+
+            return Response({"status": "ok", "created": len(objs)}, status=status.HTTP_201_CREATED)
+        except (KeyError, ValueError, TypeError, ArithmeticError) as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Liste filtreleriyle (transaction_type, date_from, date_to) tüm işlemleri CSV/XLSX
+        olarak akıtır: GET /api/finance/transactions/export/?file_format=xlsx
+        """
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by(*self.keyset_ordering)
+            .values_list(
+                'transaction_date', 'order_number', 'marketplace__name', 'product__sku', 'product__name',
+                'transaction_type', 'quantity', 'sale_price', 'commission_amount', 'shipping_cost',
+                'cost_at_transaction', 'total_cost', 'net_profit',
+            )
+            .iterator(chunk_size=2000)
+        )
+        headers = [
+            'Tarih', 'Sipariş No', 'Pazaryeri', 'SKU', 'Ürün', 'İşlem Tipi', 'Adet', 'Satış Fiyatı',
+            'Komisyon', 'Kargo', 'Birim Maliyet', 'Toplam Maliyet', 'Net Kâr',
+        ]
+        return export_response(request, 'islemler', headers, rows, sheet='İşlemler')
+
+    @action(detail=False, methods=['get'])
+    def top_losses(self, request):
+        """
+        En çok zarar ettiren satışlar (saklanan net_profit üzerinde indeksli ORDER BY).
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 200)
+        except ValueError:
+            return Response({"error": "limit bir sayı olmalı"}, status=status.HTTP_400_BAD_REQUEST)
+        losses = (
+            Transaction.objects.filter(transaction_type='SALE', net_profit__lt=0)
+            .select_related('product', 'marketplace')
+            .order_by('net_profit', 'id')[:limit]
+        )
+        return Response(self.get_serializer(losses, many=True).data)
+
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
         ids = request.data.get('ids', [])
-        Transaction.objects.filter(id__in=ids).delete()
+        with transaction.atomic(), rollup_batch():
+            Transaction.objects.filter(id__in=ids).delete()
         return Response({"status": "ok"}, status=status.HTTP_200_OK)
 
 class ExpenseViewSet(viewsets.ModelViewSet):
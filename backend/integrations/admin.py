@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Marketplace, ColumnMapping
+from .models import Marketplace, ColumnMapping, ImportJob
 
 @admin.register(Marketplace)
 class MarketplaceAdmin(admin.ModelAdmin):
@@ -8,4 +8,9 @@ class MarketplaceAdmin(admin.ModelAdmin):
 @admin.register(ColumnMapping)
 class ColumnMappingAdmin(admin.ModelAdmin):
     list_display = ('marketplace', 'file_type', 'excel_column_name', 'db_field_name')
-    list_filter = ('marketplace', 'file_type')
\ No newline at end of file
+    list_filter = ('marketplace', 'file_type')
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'marketplace', 'file_type', 'status', 'rows_processed', 'error_count', 'created_at')
+    list_filter = ('status', 'file_type', 'marketplace')
\ No newline at end of file
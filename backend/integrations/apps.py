@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class IntegrationsConfig(AppConfig):
     name = 'integrations'
+
+    def ready(self):
+        import integrations.signals  # ColumnMapping değişince eşleştirme önbelleğini temizler
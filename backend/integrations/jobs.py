@@ -0,0 +1,133 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ImportJob
+from .readers import sniff_format
+from .services import ExcelProcessor
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_parse_pool = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    İçe aktarma işleri için süreç içi iş havuzu (harici broker gerekmez).
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix='import')
+    return _executor
+
+
+def get_parse_pool():
+    """
+    ZIP içindeki dosyaları paralel okumak için süreç havuzu. Çocuk süreçler 'spawn'
+    ile başlatılır (Django/DB bağlantısı kopyalanmaz) ve yalnızca pandas ile dosya okur.
+    IMPORT_PARSE_PROCESSES = 0 ise havuz kullanılmaz, dosyalar sırayla okunur.
+    """
+    global _parse_pool
+    if settings.IMPORT_PARSE_PROCESSES == 0:
+        return None
+    with _executor_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_PARSE_PROCESSES,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+    return _parse_pool
+
+
+def enqueue_import(job):
+    """
+    İşi havuza gönderir. IMPORT_JOBS_SYNC açıksa (testler) aynı thread'de hemen çalıştırır.
+    """
+    if settings.IMPORT_JOBS_SYNC:
+        run_import_job(job.pk)
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.pk))
+
+
+def _run_in_worker(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        # Her worker thread'i kendi bağlantısını açar; iş bitince kapatılır
+        connection.close()
+
+
+def run_import_job(job_id):
+    # İş atomik olarak sahiplenilir: aynı iş iki kez kuyruğa alınsa da (ör. kurtarma sonrası) bir kez çalışır
+    now = timezone.now()
+    if not ImportJob.objects.filter(pk=job_id, status='PENDING').update(status='RUNNING', started_at=now, heartbeat_at=now):
+        return None
+    job = ImportJob.objects.select_related('marketplace').get(pk=job_id)
+
+    def progress(**counts):
+        ImportJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now(), **counts)
+
+    processor = ExcelProcessor(marketplace=job.marketplace, file_type=job.file_type)
+    try:
+        chunksize = settings.IMPORT_STREAM_CHUNK_SIZE if job.file.size >= settings.IMPORT_STREAM_MIN_BYTES else None
+        with job.file.open('rb'):
+            if sniff_format(job.file.file)[0] == 'zip':
+                result = processor.process_archive(job.file.file, parse_pool=get_parse_pool(), progress=progress)
+            elif job.file_type == 'SALES':
+                result = processor.process_sales_file(job.file.file, chunksize=chunksize, progress=progress)
+            else:
+                result = processor.process_stock_file(job.file.file, chunksize=chunksize, progress=progress)
+    except Exception as e:
+        logger.exception("İçe aktarma işi %s başarısız", job_id)
+        result = {"success": False, "error": str(e)}
+
+    job.refresh_from_db(fields=['rows_processed'])
+    job.status = 'SUCCESS' if result['success'] else 'FAILED'
+    job.result = result
+    job.error = result.get('error', '')
+    job.created_count = result.get('created_count', 0)
+    job.updated_count = result.get('updated_count', 0)
+    job.skipped_count = result.get('skipped_count', 0)
+    job.error_count = result.get('error_count', 0)
+    job.finished_at = timezone.now()
+    if len(processor.issues):
+        job.error_report.save(f"import_{job.pk}_errors.csv", ContentFile(processor.issues.to_csv()), save=False)
+    job.save()
+    return job
+
+
+def stale_before():
+    """Bu andan önce yenilenmemiş PENDING/RUNNING işler sahipsiz sayılır."""
+    return timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+
+
+def recover_jobs():
+    """
+    Süreç yeniden başlatıldığında yarım kalan işleri toparlar: bekleyen (PENDING) işler yeniden
+    kuyruğa alınır, kalp atışı IMPORT_JOB_STALE_SECONDS'tan eski RUNNING işler başarısız sayılır
+    ve yüklenen dosyaları silinir. Dönüş: (kuyruğa alınan, başarısız sayılan) iş sayısı.
+    """
+    failed = 0
+    for job in ImportJob.objects.filter(status='RUNNING', heartbeat_at__lt=stale_before()):
+        claimed = ImportJob.objects.filter(pk=job.pk, status='RUNNING', heartbeat_at__lt=stale_before()).update(
+            status='FAILED', finished_at=timezone.now(),
+            error="İşlem yarıda kesildi (sunucu yeniden başlatıldı); dosyayı yeniden yükleyin.",
+        )
+        if claimed:
+            job.file.delete(save=False)
+            failed += 1
+    pending = list(ImportJob.objects.filter(status='PENDING').values_list('pk', flat=True))
+    for job_id in pending:
+        if settings.IMPORT_JOBS_SYNC:
+            run_import_job(job_id)
+        else:
+            get_executor().submit(_run_in_worker, job_id)
+    return len(pending), failed
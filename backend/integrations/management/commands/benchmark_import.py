@@ -0,0 +1,87 @@
+import io
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from integrations.models import Marketplace
+from integrations.services import ExcelProcessor
+from products.models import Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Sentetik raporla içe aktarma yollarının hızını (satır/sn) ölçer. Veritabanına kalıcı yazmaz."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--skus', type=int, default=2000)
+        parser.add_argument('--file-type', choices=['SALES', 'STOCK', 'ALL'], default='ALL')
+        parser.add_argument('--chunksize', type=int, default=None, help="Verilirse dosya parça parça (streaming) işlenir")
+
+    def build_sales_csv(self, rows, skus):
+        rng = np.random.default_rng(42)
+        df = pd.DataFrame({
+            'order_number': [f"ORD{i}" for i in range(rows)],
+            'sku': [f"BENCH-{i}" for i in rng.integers(0, skus, rows)],
+            'quantity': rng.integers(1, 4, rows),
+            'sale_price': rng.uniform(50, 500, rows).round(2),
+            'commission_amount': rng.uniform(5, 50, rows).round(2),
+            'shipping_cost': rng.uniform(10, 40, rows).round(2),
+            'transaction_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        })
+        buffer = io.BytesIO(df.to_csv(index=False).encode())
+        buffer.name = 'bench.csv'
+        return buffer
+
+    def build_stock_csv(self, skus):
+        """Yarısı mevcut, yarısı yeni SKU'lardan oluşan envanter dosyası."""
+        rng = np.random.default_rng(7)
+        df = pd.DataFrame({
+            'sku': [f"BENCH-{i}" for i in range(skus // 2, skus // 2 + skus)],
+            'name': [f"Bench {i}" for i in range(skus)],
+            'stock_quantity': rng.integers(1, 50, skus),
+            'buying_price': rng.uniform(20, 200, skus).round(2),
+        })
+        buffer = io.BytesIO(df.to_csv(index=False).encode())
+        buffer.name = 'bench.csv'
+        return buffer
+
+    def run_isolated(self, func):
+        """Ölçümü bir transaction içinde çalıştırır ve sonunda geri alır."""
+        result = {}
+        try:
+            with transaction.atomic():
+                result = func()
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return result
+
+    def handle(self, *args, **options):
+        rows, skus, chunksize = options['rows'], options['skus'], options['chunksize']
+
+        def prepare(file_type):
+            marketplace = Marketplace.objects.create(name='__benchmark__')
+            Product.objects.bulk_create([
+                Product(sku=f"BENCH-{i}", name=f"Bench {i}", buying_price=100, weighted_cost=100, stock_quantity=10)
+                for i in range(skus)
+            ])
+            return ExcelProcessor(marketplace=marketplace, file_type=file_type)
+
+        jobs = []
+        if options['file_type'] in ('SALES', 'ALL'):
+            jobs.append(('SALES', rows, lambda p, bulk: p.process_sales_file(self.build_sales_csv(rows, skus), bulk=bulk, chunksize=chunksize)))
+        if options['file_type'] in ('STOCK', 'ALL'):
+            jobs.append(('STOCK', skus, lambda p, bulk: p.process_stock_file(self.build_stock_csv(skus), bulk=bulk, chunksize=chunksize)))
+
+        for file_type, row_count, process in jobs:
+            for label, bulk in (("iterrows (eski)", False), ("bulk", True)):
+                result = self.run_isolated(lambda: process(prepare(file_type), bulk))
+                self.stdout.write(
+                    f"{file_type} {label:<16} {row_count} satır: {result['elapsed_seconds']} sn, "
+                    f"{result['rows_per_sec']} satır/sn, oluşturulan={result['created_count']}, "
+                    f"güncellenen={result.get('updated_count', '-')}, hata={result['error_count']}"
+                )
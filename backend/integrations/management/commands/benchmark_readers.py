@@ -0,0 +1,79 @@
+import io
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from integrations import readers
+
+
+class Command(BaseCommand):
+    help = "Rapor okuma motorlarını (openpyxl, calamine, C, pyarrow, streaming) örnek dosyalarda karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--file', action='append', default=[], help="Sentetik dosya yerine gerçek rapor(lar) kullan")
+
+    def sample_files(self, rows):
+        rng = np.random.default_rng(42)
+        df = pd.DataFrame({
+            'Sipariş No': [f"ORD{i}" for i in range(rows)],
+            'Stok Kodu': [f"SKU-{i}" for i in rng.integers(0, 5000, rows)],
+            'Adet': rng.integers(1, 4, rows),
+            'Satış Tutarı': rng.uniform(50, 500, rows).round(2),
+            'Komisyon': rng.uniform(5, 50, rows).round(2),
+            'Kargo': rng.uniform(10, 40, rows).round(2),
+            'Sipariş Tarihi': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        })
+        xlsx = io.BytesIO()
+        df.to_excel(xlsx, index=False)
+        return {
+            'ornek.xlsx': xlsx.getvalue(),
+            'ornek.csv': df.to_csv(index=False).encode(),
+            'ornek.tsv': df.to_csv(index=False, sep='\t').encode(),
+        }
+
+    def engines_for(self, file_format):
+        engines = [readers.DEFAULT_ENGINES[file_format]]
+        if file_format in ('xlsx', 'xls') and readers.HAS_CALAMINE:
+            engines.append('calamine')
+        if file_format == 'csv':
+            engines.append('python')
+            if readers.HAS_PYARROW:
+                engines.append('pyarrow')
+        return engines
+
+    def measure(self, content, name, read):
+        best = None
+        rows = 0
+        for _ in range(self.repeat):
+            buffer = io.BytesIO(content)
+            buffer.name = name
+            started = time.perf_counter()
+            rows = read(buffer)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, rows
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        if options['file']:
+            files = {}
+            for path in options['file']:
+                with open(path, 'rb') as f:
+                    files[path] = f.read()
+        else:
+            files = self.sample_files(options['rows'])
+
+        for name, content in files.items():
+            file_format, separator = readers.sniff_format(io.BytesIO(content))
+            self.stdout.write(f"{name} ({file_format}, {len(content) / 1024 / 1024:.1f} MB) — seçilen motor: {readers.pick_engine(file_format)}")
+
+            for engine in self.engines_for(file_format):
+                seconds, rows = self.measure(content, name, lambda f: len(readers.read_frame(f, engine=engine)))
+                self.stdout.write(f"  {engine:<12} {seconds:8.3f} sn  {rows / seconds:12,.0f} satır/sn")
+
+            seconds, rows = self.measure(
+                content, name, lambda f: sum(len(chunk) for chunk in readers.iter_frames(f, chunksize=10000))
+            )
+            self.stdout.write(f"  {'streaming':<12} {seconds:8.3f} sn  {rows / seconds:12,.0f} satır/sn")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from integrations.jobs import get_executor, recover_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Sunucu yeniden başlatıldığında yarım kalan içe aktarma işlerini toparlar: bekleyen işler "
+        "yeniden çalıştırılır, takılı kalan işler başarısız sayılır. Sunucu başlamadan önce çalıştırın."
+    )
+
+    def handle(self, *args, **options):
+        queued, failed = recover_jobs()
+        # Kuyruğa alınan işler bu süreçte çalışır; bitmeden çıkılmaz
+        get_executor().shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"{queued} bekleyen iş yeniden çalıştırıldı, {failed} yarım kalan iş başarısız olarak işaretlendi."
+        ))
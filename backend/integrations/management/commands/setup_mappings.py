@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from integrations.models import Marketplace, ColumnMapping
+from integrations.mappings import invalidate_mappings
 
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
@@ -23,4 +24,5 @@ class Command(BaseCommand):
                 excel_column_name=excel_col.lower(),
                 db_field_name=db_field
             )
+        invalidate_mappings(mp.id)
         self.stdout.write(self.style.SUCCESS(f'✅ Harita "{mp.name}" için başarıyla güncellendi.'))
\ No newline at end of file
@@ -0,0 +1,127 @@
+import threading
+import time
+import pandas as pd
+from django.utils import timezone
+from .models import ColumnMapping
+
+# Her veritabanı alanının içe aktarmada hangi tipe dönüştürüleceği
+FIELD_TYPES = {
+    'SALES': {
+        'order_number': 'text',
+        'sku': 'text',
+        'quantity': 'number',
+        'sale_price': 'number',
+        'commission_amount': 'number',
+        'shipping_cost': 'number',
+        'transaction_date': 'datetime',
+    },
+    'STOCK': {
+        'sku': 'text',
+        'name': 'text',
+        'barcode': 'text',
+        'description': 'text',
+        'stock_quantity': 'number',
+        'buying_price': 'number',
+    },
+}
+
+# Süreç içi önbellek. Sinyaller yalnızca kendi sürecini temizleyebildiği için, başka bir
+# süreçte (ör. diğer gunicorn worker'ı) yapılan değişiklik en geç bu süre sonra görülür.
+MAPPING_CACHE_TTL = 300
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class CoercedFrame:
+    """
+    Bir parçanın tek geçişte dönüştürülmüş sütunları.
+    values: alan -> dönüştürülmüş Series
+    missing: alan -> ham değer boş mu (NaN / None / 'nan')
+    invalid: alan -> ham değer dolu ama dönüştürülemedi mi
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.missing = {}
+        self.invalid = {}
+
+
+class CompiledMapping:
+    """
+    Bir (pazaryeri, dosya türü) için önceden hazırlanmış sütun eşleştirme planı:
+    başlık normalizasyonu + yeniden adlandırma sözlüğü + alan bazında tip dönüşümleri.
+    """
+
+    def __init__(self, file_type, mapping):
+        self.file_type = file_type
+        # Stok raporlarında başlıklar boşluk/büyük-küçük harf farkına duyarsız eşlenir
+        self.normalize_headers = file_type == 'STOCK'
+        if self.normalize_headers:
+            mapping = {str(k).strip().lower(): v for k, v in mapping.items()}
+        self.rename = mapping
+        self.field_types = FIELD_TYPES.get(file_type, {})
+        self.compiled_at = time.monotonic()
+
+    def apply(self, df):
+        """Başlıkları normalize edip eşleştirmeyi uygular (yerinde)."""
+        if df is None:
+            return None
+        if self.normalize_headers:
+            df.columns = [str(c).strip().lower() for c in df.columns]
+        df.rename(columns=self.rename, inplace=True)
+        return df
+
+    def coerce(self, df):
+        """
+        Eşlenmiş tablodaki bilinen alanları tek geçişte hedef tipe çevirir.
+        """
+        coerced = CoercedFrame()
+        for field, kind in self.field_types.items():
+            if field not in df.columns:
+                continue
+            raw = df[field]
+            missing = raw.isna()
+            if raw.dtype == object or pd.api.types.is_string_dtype(raw):
+                missing |= raw.astype(str).str.strip().str.lower() == 'nan'
+
+            if kind == 'number':
+                values = pd.to_numeric(raw, errors='coerce')
+            elif kind == 'datetime':
+                values = pd.to_datetime(raw, errors='coerce')
+                if values.dt.tz is None:
+                    values = values.dt.tz_localize(timezone.get_current_timezone())
+            else:
+                values = raw.map(str).str.strip()
+
+            coerced.values[field] = values
+            coerced.missing[field] = missing
+            coerced.invalid[field] = values.isna() & ~missing
+        return coerced
+
+
+def get_compiled_mapping(marketplace, file_type):
+    """
+    Önbellekten derlenmiş eşleştirmeyi döndürür; yoksa (ya da süresi dolduysa) tek
+    sorguyla oluşturur.
+    """
+    key = (marketplace.pk, file_type)
+    compiled = _cache.get(key)
+    if compiled is None or time.monotonic() - compiled.compiled_at > MAPPING_CACHE_TTL:
+        mappings = ColumnMapping.objects.filter(marketplace=marketplace, file_type=file_type)
+        compiled = CompiledMapping(file_type, {m.excel_column_name: m.db_field_name for m in mappings})
+        with _cache_lock:
+            _cache[key] = compiled
+    return compiled
+
+
+def invalidate_mappings(marketplace_id=None):
+    """
+    Önbelleği temizler. marketplace_id verilirse yalnızca o pazaryerinin planları silinir.
+    """
+    with _cache_lock:
+        if marketplace_id is None:
+            _cache.clear()
+        else:
+            for key in [k for k in _cache if k[0] == marketplace_id]:
+                del _cache[key]
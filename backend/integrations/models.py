@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Marketplace(models.Model):
     """
@@ -36,4 +37,59 @@ class ColumnMapping(models.Model):
         verbose_name = "Sütun Eşleştirmesi"
 
     def __str__(self):
-        return f"{self.marketplace} - {self.excel_column_name} -> {self.db_field_name}"
\ No newline at end of file
+        return f"{self.marketplace} - {self.excel_column_name} -> {self.db_field_name}"
+
+class ImportJob(models.Model):
+    """
+    Arka planda çalışan Excel/CSV içe aktarma işi.
+    Yükleme isteği işi kuyruğa koyup hemen döner; ilerleme bu tablodan okunur.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Kuyrukta'),
+        ('RUNNING', 'İşleniyor'),
+        ('SUCCESS', 'Tamamlandı'),
+        ('FAILED', 'Başarısız'),
+    )
+
+    marketplace = models.ForeignKey(Marketplace, on_delete=models.CASCADE, related_name='import_jobs')
+    file_type = models.CharField(max_length=20, choices=ColumnMapping.FILE_TYPES)
+    file = models.FileField(upload_to='imports/')
+    original_name = models.CharField(max_length=255)
+    # Dosya içeriğinin SHA-256 özeti; aynı dosyanın tekrar yüklenmesini yakalamak için
+    file_hash = models.CharField(max_length=64, db_index=True, blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+
+    # İlerleme (her parça yazıldıktan sonra güncellenir)
+    rows_processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    updated_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+
+    # Bitişte servisin döndürdüğü sonuç (hatalar dahil)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    # Tüm satır sorunlarının (satır, sütun, değer, sebep) CSV raporu; sorun yoksa boş
+    error_report = models.FileField(upload_to='import_reports/', null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # İşi çalıştıran süreç her parçada yeniler; uzun süre değişmeyen PENDING/RUNNING iş sahipsizdir
+    # (süreç yeniden başlatılmış) ve recover_import_jobs ile kurtarılır
+    heartbeat_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "İçe Aktarma İşi"
+
+    @property
+    def rows_per_sec(self):
+        if not self.started_at:
+            return None
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else None
+
+    def __str__(self):
+        return f"{self.marketplace} - {self.original_name} ({self.status})"
@@ -0,0 +1,238 @@
+import hashlib
+import io
+import time
+import zipfile
+import pandas as pd
+from openpyxl import load_workbook
+
+# Opsiyonel hızlı motorlar: kuruluysa kullanılır, değilse pandas'ın varsayılanına düşülür
+try:
+    import python_calamine  # noqa: F401  (Rust tabanlı xlsx/xls okuyucu)
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+try:
+    import pyarrow  # noqa: F401  (çok thread'li CSV okuyucu)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+REPORT_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.tsv')
+
+# Dosya imzaları (magic bytes)
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'  # eski .xls (BIFF)
+ZIP_MAGIC = b'PK\x03\x04'  # .xlsx de aslında bir ZIP'tir
+
+# Her format için pandas'ın kendi (her zaman kurulu) motoru
+DEFAULT_ENGINES = {'xlsx': 'openpyxl', 'xls': 'xlrd', 'csv': 'c'}
+
+
+def fingerprint_file(file_obj):
+    """
+    Dosya içeriğinin SHA-256 özetini parça parça okuyarak hesaplar.
+    """
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def is_report_name(name):
+    """ZIP içindeki rapor dosyalarını seçer (klasörler ve macOS artıkları hariç)."""
+    return name.lower().endswith(REPORT_EXTENSIONS) and not name.startswith('__MACOSX/') and not name.endswith('/')
+
+
+def parse_report(name, content):
+    """
+    Süreç havuzunda çalışır: ham dosya içeriğini DataFrame'e çevirir.
+    Django'ya dokunmaz; dönüş: (DataFrame ya da None, süre sn, hata mesajı ya da None).
+    """
+    started = time.perf_counter()
+    buffer = io.BytesIO(content)
+    buffer.name = name
+    try:
+        df = read_frame(buffer)
+    except Exception as e:
+        return None, time.perf_counter() - started, str(e)
+    return df, time.perf_counter() - started, None
+
+
+def sniff_format(file_obj):
+    """
+    Dosyanın gerçek formatını uzantıya değil içeriğin ilk baytlarına bakarak bulur.
+    Dönüş: (format, ayraç). format: 'xlsx', 'xls', 'zip' ya da 'csv'; ayraç yalnızca
+    metin dosyalarında dolar (',', ';' veya TAB).
+    """
+    head = file_obj.read(4096)
+    file_obj.seek(0)
+    if head.startswith(OLE2_MAGIC):
+        return 'xls', None
+    if head.startswith(ZIP_MAGIC):
+        try:
+            names = zipfile.ZipFile(file_obj).namelist()
+        except zipfile.BadZipFile:
+            names = []
+        finally:
+            file_obj.seek(0)
+        is_workbook = '[Content_Types].xml' in names and any(name.startswith('xl/') for name in names)
+        return ('xlsx' if is_workbook else 'zip'), None
+
+    first_line = head.decode('utf-8-sig', errors='ignore').splitlines()[:1]
+    first_line = first_line[0] if first_line else ''
+    separator = max(('\t', ';', ','), key=first_line.count)
+    return 'csv', separator if first_line.count(separator) else ','
+
+
+def pick_engine(file_format):
+    """
+    Formata göre kurulu olan en hızlı motoru seçer.
+    """
+    if file_format in ('xlsx', 'xls') and HAS_CALAMINE:
+        return 'calamine'
+    if file_format == 'csv' and HAS_PYARROW:
+        return 'pyarrow'
+    return DEFAULT_ENGINES[file_format]
+
+
+def read_frame(file_obj, engine=None):
+    """
+    Dosyanın tamamını tek bir DataFrame olarak okur (tek seferlik yol). Hızlı motor
+    hata verirse pandas'ın varsayılan motoruyla bir kez daha denenir.
+    """
+    file_format, separator = sniff_format(file_obj)
+    if file_format == 'zip':
+        raise ValueError("ZIP arşivi tek bir rapor olarak okunamaz.")
+
+    engine = engine or pick_engine(file_format)
+    try:
+        return _read_with_engine(file_obj, file_format, separator, engine)
+    except Exception:
+        fallback = DEFAULT_ENGINES[file_format]
+        if engine == fallback:
+            raise
+        file_obj.seek(0)
+        return _read_with_engine(file_obj, file_format, separator, fallback)
+
+
+def _read_with_engine(file_obj, file_format, separator, engine):
+    if file_format == 'csv':
+        return pd.read_csv(file_obj, sep=separator, engine=engine)
+    return pd.read_excel(file_obj, engine=engine)
+
+
+def iter_frames(file_obj, chunksize=None):
+    """
+    Dosyayı DataFrame parçaları halinde okur. chunksize verilmezse tüm dosya tek parça döner.
+    Parçaların index'i dosyadaki satır sırasını korur (0, 1, 2 ...), böylece hata satır
+    numaraları tek seferlik okumayla aynı kalır.
+    """
+    if not chunksize:
+        yield read_frame(file_obj)
+        return
+
+    file_format, separator = sniff_format(file_obj)
+    if file_format == 'csv':
+        # pyarrow motoru parça parça okumayı desteklemez; C motoru kullanılır
+        with pd.read_csv(file_obj, sep=separator, chunksize=chunksize) as reader:
+            yield from reader
+    elif file_format == 'xlsx':
+        yield from iter_xlsx_chunks(file_obj, chunksize)
+    else:
+        # Eski .xls formatı satır satır okunamaz; tek parça okunup bölünür
+        df = read_frame(file_obj)
+        for start in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def read_head(file_obj, nrows):
+    """
+    Önizleme için dosyanın yalnızca ilk nrows satırını okur; dosyanın geri kalanı
+    ayrıştırılmaz. Dönüş: (DataFrame, tahmini toplam satır sayısı ya da None).
+    Tahmin CSV'de dosya boyutu / ortalama satır uzunluğundan, XLSX'te sayfanın
+    kayıtlı boyutundan (dimension) gelir.
+    """
+    file_format, separator = sniff_format(file_obj)
+    if file_format == 'zip':
+        raise ValueError("ZIP arşivi tek bir rapor olarak okunamaz.")
+
+    if file_format == 'csv':
+        size = file_obj.seek(0, io.SEEK_END)
+        file_obj.seek(0)
+        # Bir satır fazla okunur: dosya nrows satırdan kısaysa toplam kesin bilinir
+        df = pd.read_csv(file_obj, sep=separator, nrows=nrows + 1)
+        file_obj.seek(0)
+        if len(df) <= nrows:
+            return df, len(df)
+        df = df.iloc[:nrows]
+        # Ortalama satır uzunluğu okunan satırların yeniden yazılmış halinden tahmin edilir
+        # (tırnak içindeki satır sonları dosyadaki satır sayısını bozmaz)
+        header_bytes = len(separator.join(map(str, df.columns)).encode()) + 1
+        row_bytes = len(df.to_csv(sep=separator, index=False, header=False).encode()) / len(df)
+        return df, round((size - header_bytes) / row_bytes)
+
+    if file_format == 'xlsx':
+        workbook = load_workbook(file_obj, read_only=True, data_only=True)
+        try:
+            sheet = workbook.active
+            estimated = sheet.max_row - 1 if sheet.max_row else None
+            df = next(_iter_sheet_chunks(sheet, nrows))
+        finally:
+            workbook.close()
+        return df, estimated if len(df) >= nrows else len(df)
+
+    # Eski .xls akış halinde okunamaz ama bu dosyalar 65.536 satırla sınırlıdır
+    df = pd.read_excel(file_obj, engine=pick_engine(file_format), nrows=nrows)
+    return df, None if len(df) >= nrows else len(df)
+
+
+def iter_xlsx_chunks(file_obj, chunksize):
+    """
+    XLSX dosyasını openpyxl read-only modunda satır satır gezer; bellekte en fazla
+    bir parça tutulur.
+    """
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        yield from _iter_sheet_chunks(workbook.active, chunksize)
+    finally:
+        workbook.close()
+
+
+def _iter_sheet_chunks(sheet, chunksize):
+    """
+    Boş satırlar pd.read_excel gibi ele alınır: aradakiler korunur, sondakiler atılır.
+    """
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        yield pd.DataFrame()
+        return
+    width = len(header)
+    while width and header[width - 1] is None:
+        width -= 1
+    columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header[:width])]
+
+    batch = []
+    blank_rows = 0
+    offset = 0
+    for row in rows:
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if all(value is None for value in row):
+            blank_rows += 1
+            continue
+        batch.extend([(None,) * width] * blank_rows)
+        blank_rows = 0
+        batch.append(row)
+        while len(batch) >= chunksize:
+            yield _to_frame(batch[:chunksize], columns, offset)
+            offset += chunksize
+            batch = batch[chunksize:]
+    if batch or offset == 0:
+        yield _to_frame(batch, columns, offset)
+
+
+def _to_frame(rows, columns, offset):
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    return df.infer_objects()
@@ -1,22 +1,64 @@
 from rest_framework import serializers
-from .models import Marketplace
+from rest_framework.reverse import reverse
+from .models import Marketplace, ImportJob
 
 # 1. Excel Yükleme İşlemi İçin
+ALLOWED_UPLOAD_EXTENSIONS = ('.xls', '.xlsx', '.csv', '.tsv', '.zip')
+
+
 class FileUploadSerializer(serializers.Serializer):
     marketplace_id = serializers.IntegerField(required=True)
-    file = serializers.FileField(required=True)
+    # Tek dosya (file) ya da aynı istekte birden fazla dosya (files); ZIP de kabul edilir
+    file = serializers.FileField(required=False)
+    files = serializers.ListField(child=serializers.FileField(), required=False)
     file_type = serializers.ChoiceField(choices=[
         ('SALES', 'Satış/Hakediş Raporu'),
         ('STOCK', 'Stok Raporu')
     ])
 
-    def validate_file(self, value):
-        if not value.name.endswith(('.xls', '.xlsx')):
-            raise serializers.ValidationError("Sadece .xls veya .xlsx dosyaları yüklenebilir.")
+    def _check_extension(self, value):
+        if not value.name.lower().endswith(ALLOWED_UPLOAD_EXTENSIONS):
+            raise serializers.ValidationError("Sadece .xls, .xlsx, .csv, .tsv veya .zip dosyaları yüklenebilir.")
         return value
 
+    def validate_file(self, value):
+        return self._check_extension(value)
+
+    def validate_files(self, value):
+        return [self._check_extension(f) for f in value]
+
+    def validate(self, attrs):
+        uploads = ([attrs['file']] if attrs.get('file') else []) + attrs.get('files', [])
+        if not uploads:
+            raise serializers.ValidationError({"file": "Yüklenecek dosya seçilmedi."})
+        attrs['uploads'] = uploads
+        return attrs
+
+class FilePreviewSerializer(FileUploadSerializer):
+    # Önizlemede okunacak satır sayısı (dosyanın geri kalanı okunmaz)
+    rows = serializers.IntegerField(required=False, min_value=1, max_value=5000)
+
 # 2. Pazaryeri Listeleme İşlemi İçin
 class MarketplaceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Marketplace
-        fields = ['id', 'name']
\ No newline at end of file
+        fields = ['id', 'name']
+
+# 3. Arka plan içe aktarma işlerinin durumu
+class ImportJobSerializer(serializers.ModelSerializer):
+    marketplace_name = serializers.CharField(source='marketplace.name', read_only=True)
+    rows_per_sec = serializers.FloatField(read_only=True)
+    error_report_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'marketplace', 'marketplace_name', 'file_type', 'original_name', 'status',
+            'rows_processed', 'rows_per_sec', 'created_count', 'updated_count', 'skipped_count', 'error_count',
+            'result', 'error', 'error_report_url', 'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_error_report_url(self, obj):
+        if not obj.error_report:
+            return None
+        return reverse('import-job-errors', args=[obj.pk], request=self.context.get('request'))
@@ -1,39 +1,153 @@
+import io
+import json
+import time
+import zipfile
+from collections import deque
+import numpy as np
 import pandas as pd
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
 from decimal import Decimal
-from .models import ColumnMapping
+from core.bulk import BULK_BATCH_SIZE, bulk_update_rows
+from .mappings import get_compiled_mapping
+from .readers import iter_frames, is_report_name, parse_report, read_head, sniff_format
+from .validation import IssueCollector, row_errors, ERROR, WARNING, SKIPPED
 from finance.models import Transaction
-from products.models import Product
+from finance.cache import bump_data_version
+from finance.rollups import record_transactions
+from products.ledger import record_movements
+from products.models import Product, StockMovement
+
+# Önizlemede (dry-run) okunan varsayılan satır sayısı
+PREVIEW_ROWS = 200
+
+# ZIP işlenirken süreç havuzuna aynı anda gönderilen en fazla dosya sayısı
+ARCHIVE_PARSE_WINDOW = 8
+
+SALES_REQUIRED_FIELDS = ['order_number', 'sale_price', 'sku']
+SALES_DECIMAL_FIELDS = ['sale_price', 'commission_amount', 'shipping_cost']
+
+SALES_MISSING_REASON = "değeri boş"
+STOCK_ERROR_MESSAGE = "Satır {row}: '{column}' {reason} ({value})"
+INVALID_REASONS = {
+    'number': "sayıya çevrilemedi",
+    'datetime': "tarih olarak okunamadı",
+}
+
+
+def _rows_per_sec(row_count, elapsed):
+    return round(row_count / elapsed, 1) if elapsed > 0 else None
+
+
+def _div_round_half_even(numerator, denominator):
+    """
+    Tamsayı dizilerini bölüp en yakın tamsayıya yuvarlar. Yarım değerlerde Django'nun
+    DecimalField okurken kullandığı varsayılan Decimal bağlamı gibi çifte yuvarlar.
+    """
+    sign = np.sign(numerator) * np.sign(denominator)
+    numerator, denominator = np.abs(numerator), np.abs(denominator)
+    quotient, remainder = np.divmod(numerator, denominator)
+    round_up = (2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1))
+    return sign * (quotient + round_up)
+
+
+def apply_stock_receipt(old_stock, old_price, old_cost, quantity, price):
+    """
+    Product.save'deki ağırlıklı ortalama maliyet kurallarının vektörel karşılığı.
+    Fiyat/maliyet dizileri kuruş cinsinden int64'tür. Dönüş: (stok, alış fiyatı,
+    ağırlıklı maliyet, hata maskesi). Hata maskesi, satır satır yolda sıfıra bölme
+    hatası verecek (yeni stoğu 0 olan) satırları işaretler.
+    """
+    new_price = np.where(price > 0, price, old_price)
+    new_stock = old_stock + quantity
+
+    # 1) Alış fiyatı 0'dan ilk kez bir değere çıkıyorsa maliyet direkt eşitlenir
+    first_price = (old_price == 0) & (new_price > 0)
+    # 2) Stok artışı varsa ve alış fiyatı 0 değilse ağırlıklı ortalama
+    receipt = ~first_price & (new_stock > old_stock) & (new_price > 0)
+    # 3) Stok sabitse ve maliyet 0 ise fiyat ile doldurulur
+    fill_empty = ~first_price & ~receipt & (new_price > 0) & (old_cost == 0)
+
+    failed = receipt & (new_stock == 0)
+    current_cost = np.where(old_cost > 0, old_cost, new_price)
+    total_value = old_stock * current_cost + (new_stock - old_stock) * new_price
+    averaged = _div_round_half_even(total_value, np.where(new_stock == 0, 1, new_stock))
+
+    new_cost = np.select([first_price, receipt, fill_empty], [new_price, averaged, new_price], default=old_cost)
+    return new_stock, new_price, new_cost, failed
+
+
+def existing_transaction_keys(marketplace, order_numbers, transaction_type='SALE'):
+    """
+    Bu pazaryerinde verilen sipariş numaralarıyla zaten kayıtlı işlemlerin
+    (order_number, product_id) anahtarlarını döndürür. Bileşik index'i kullanır.
+    """
+    batch = connection.ops.bulk_batch_size(['order_number'], order_numbers) or 1
+    keys = set()
+    for start in range(0, len(order_numbers), batch):
+        keys.update(Transaction.objects.filter(
+            marketplace=marketplace,
+            transaction_type=transaction_type,
+            order_number__in=order_numbers[start:start + batch],
+        ).values_list('order_number', 'product_id'))
+    return keys
+
+
+def fetch_products_by_sku(skus, fields=('id', 'sku', 'weighted_cost', 'buying_price'), lock=False):
+    """
+    Verilen SKU listesindeki ürünleri tek seferde getirir (sku -> dict).
+    SQLite parametre limitine takılmamak için IN sorgusu parçalara bölünür.
+    lock=True ise satırlar select_for_update ile kilitlenir (transaction içinde çağrılmalı).
+    """
+    skus = list(skus)
+    batch = connection.ops.bulk_batch_size(['sku'], skus) or len(skus) or 1
+    queryset = Product.objects.select_for_update() if lock else Product.objects.all()
+    products = {}
+    for start in range(0, len(skus), batch):
+        for row in queryset.filter(sku__in=skus[start:start + batch]).values(*fields):
+            products[row['sku']] = row
+    return products
 
 class ExcelProcessor:
     def __init__(self, marketplace, file_type):
         self.marketplace = marketplace
         self.file_type = file_type
+        # Son işlemde bulunan tüm satır sorunları (indirilebilir hata raporu için)
+        self.issues = IssueCollector()
 
     def get_column_mapping(self):
         """
-        Bu pazaryeri ve dosya türü için tanımlı sütun eşleşmelerini getirir.
+        Bu pazaryeri ve dosya türü için tanımlı sütun eşleşmelerini getirir (önbellekten).
         """
-        mappings = ColumnMapping.objects.filter(
-            marketplace=self.marketplace,
-            file_type=self.file_type
-        )
-        return {m.excel_column_name: m.db_field_name for m in mappings}
+        return dict(self.compiled_mapping.rename)
+
+    @property
+    def compiled_mapping(self):
+        """
+        Süreç içi önbellekten derlenmiş eşleştirme planı (başlık normalizasyonu,
+        yeniden adlandırma ve tip dönüşümleri). ColumnMapping değişince temizlenir.
+        """
+        return get_compiled_mapping(self.marketplace, self.file_type)
 
-    def process_sales_file(self, file_obj):
+    def process_sales_file(self, file_obj, bulk=True, chunksize=None, progress=None):
         """
         Satış / Hakediş raporlarını işler.
+        bulk=False verilirse eski satır satır (iterrows) yol kullanılır; kıyas için tutuluyor.
+        chunksize verilirse dosya parça parça okunur ve her parça bir sonraki okunmadan
+        önce veritabanına yazılır (büyük dosyalarda sabit bellek).
+        progress verilirse her parçadan sonra ara sayılarla çağrılır.
         """
+        self.issues = IssueCollector()
+        started = time.perf_counter()
+        frames = iter_frames(file_obj, chunksize)
         try:
-            df = pd.read_excel(file_obj) if file_obj.name.endswith('.xlsx') else pd.read_csv(file_obj)
+            df = next(frames)
         except Exception as e:
             return {"success": False, "error": f"Excel okunamadı: {str(e)}"}
 
-        mapping_dict = self.get_column_mapping()
-        df.rename(columns=mapping_dict, inplace=True)
-
-        required_fields = ['order_number', 'sale_price', 'sku']
-        missing_fields = [field for field in required_fields if field not in df.columns]
+        mapping = self.compiled_mapping
+        df = mapping.apply(df)
+        missing_fields = [field for field in SALES_REQUIRED_FIELDS if field not in df.columns]
         
         if missing_fields:
              return {
@@ -41,6 +155,42 @@ class ExcelProcessor:
                  "error": f"Eksik sütunlar: {', '.join(missing_fields)}. Admin panelden Mapping yapın."
              }
 
+        import_frame = self._import_sales_frame if bulk else self._import_sales_rows
+        row_count = 0
+        created_count = 0
+        skipped_count = 0
+        errors = []
+        while df is not None:
+            created, skipped, chunk_errors = import_frame(df)
+            row_count += len(df)
+            created_count += created
+            skipped_count += skipped
+            errors.extend(chunk_errors)
+            if progress:
+                progress(
+                    rows_processed=row_count, created_count=created_count,
+                    skipped_count=skipped_count, error_count=len(errors),
+                )
+            try:
+                df = mapping.apply(next(frames, None))
+            except Exception as e:
+                return {"success": False, "error": f"Excel okunamadı: {str(e)}", "created_count": created_count}
+
+        elapsed = time.perf_counter() - started
+        return {
+            "success": True,
+            "created_count": created_count,
+            "skipped_count": skipped_count,
+            "error_count": len(errors),
+            "errors": errors[:10],
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": _rows_per_sec(row_count, elapsed),
+        }
+
+    def _import_sales_rows(self, df):
+        """
+        Eski yol: her satır için ayrı ürün sorgusu ve ayrı INSERT.
+        """
         created_count = 0
         errors = []
 
@@ -52,33 +202,362 @@ class ExcelProcessor:
                 except Exception as e:
                     errors.append(f"Satır {index+1} hatası: {str(e)}")
 
+        return created_count, 0, errors
+
+    def _import_sales_frame(self, df):
+        """
+        Toplu yol: SKU'lar tek seferde çözülür, sayısal/tarih sütunları pandas ile
+        topluca dönüştürülür ve kayıtlar parça parça bulk_create ile yazılır.
+        """
+        if df.empty:
+            return 0, 0, []
+
+        # Sayısal/tarih sütunları önbellekteki plana göre tek geçişte dönüştürülür;
+        # boş ya da dönüştürülemeyen değerler hatalı satır sayılır
+        coerced = self.compiled_mapping.coerce(df)
+        skus = coerced.values['sku']
+        order_numbers = coerced.values['order_number']
+
+        invalid = {}
+        for field in SALES_DECIMAL_FIELDS + ['quantity', 'transaction_date']:
+            if field in coerced.values:
+                invalid[field] = coerced.missing[field] | coerced.invalid[field]
+        values = {
+            field: coerced.values.get(field, pd.Series(0.0, index=df.index))
+            for field in SALES_DECIMAL_FIELDS
+        }
+        if 'quantity' in coerced.values:
+            quantities = coerced.values['quantity'].fillna(0)
+        else:
+            quantities = pd.Series(1, index=df.index)
+        quantities = quantities.astype('int64')
+        dates = coerced.values.get('transaction_date', pd.Series(timezone.now(), index=df.index))
+
+        # Maliyet: ağırlıklı maliyet varsa o, yoksa son alış fiyatı (tek sorgu)
+        products = fetch_products_by_sku(skus.unique().tolist())
+        product_ids = skus.map({sku: p['id'] for sku, p in products.items()}).astype('Int64').astype(object)
+        product_ids = product_ids.where(product_ids.notna(), None)
+        costs = skus.map({
+            sku: p['weighted_cost'] if p['weighted_cost'] > 0 else p['buying_price']
+            for sku, p in products.items()
+        })
+
+        # Doğrulama: her sütun tek maskeyle kontrol edilir, tüm sorunlar rapora eklenir.
+        # Hatalı satırlar yazılmaz; SKU'su boş ya da ürünü bulunamayan satırlar (eskisi gibi)
+        # ürünsüz yazılır ama uyarı olarak raporlanır.
+        issue_frames = []
+        bad_mask = pd.Series(False, index=df.index)
+        for field, mask in invalid.items():
+            bad_mask |= mask
+            issue_frames.append(self.issues.add(df, coerced.missing[field], field, SALES_MISSING_REASON))
+            issue_frames.append(self.issues.add(df, coerced.invalid[field], field, INVALID_REASONS[self.compiled_mapping.field_types[field]]))
+        errors = row_errors(issue_frames)
+
+        sku_missing = ~bad_mask & coerced.missing['sku']
+        self.issues.add(df, sku_missing, 'sku', "SKU boş; ürünsüz kaydedildi", severity=WARNING)
+        self.issues.add(df, ~bad_mask & ~sku_missing & product_ids.isna(), 'sku', "Ürün bulunamadı; ürünsüz kaydedildi", severity=WARNING)
+
+        # Mükerrer kontrolü (doğal anahtar: pazaryeri + sipariş no + ürün + tip). Daha önce
+        # yüklenmiş ya da bu parçada ikinci kez geçen satırlar atlanır; veritabanı kontrolü
+        # parça başına sipariş numaralarıyla toplu yapılır.
+        good = ~bad_mask
+        keys = pd.Series(list(zip(order_numbers, product_ids)), index=df.index)
+        existing = existing_transaction_keys(self.marketplace, order_numbers[good].unique().tolist())
+        duplicate = good & (keys.isin(existing) | keys.where(good).duplicated())
+        good &= ~duplicate
+        self.issues.add(df, duplicate, 'order_number', "Daha önce yüklenmiş (mükerrer); atlandı", severity=SKIPPED)
+
+        rows = zip(
+            order_numbers[good].tolist(),
+            product_ids[good].tolist(),
+            quantities[good].tolist(),
+            values['sale_price'][good].tolist(),
+            values['commission_amount'][good].tolist(),
+            values['shipping_cost'][good].tolist(),
+            costs[good].tolist(),
+            dates[good].tolist(),
+        )
+        objs = [
+            Transaction(
+                marketplace=self.marketplace,
+                product_id=product_id,
+                transaction_type='SALE',
+                order_number=order_number,
+                quantity=quantity,
+                sale_price=sale_price,
+                commission_amount=commission,
+                shipping_cost=shipping,
+                cost_at_transaction=cost if pd.notna(cost) else Decimal('0'),
+                transaction_date=date,
+            )
+            for order_number, product_id, quantity, sale_price, commission, shipping, cost, date in rows
+        ]
+
+        # bulk_create save() çağırmaz; saklanan toplam maliyet/net kâr burada hesaplanır
+        for obj in objs:
+            obj.calculate_totals()
+
+        with transaction.atomic():
+            Transaction.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE)
+            # bulk_create sinyal göndermez; günlük özet ve rapor önbelleği burada güncellenir
+            record_transactions(objs)
+            bump_data_version()
+
+        return len(objs), int(duplicate.sum()), errors
+
+    def process_stock_file(self, file_obj, bulk=True, chunksize=None, progress=None):
+        """
+        Stok Envanter raporlarını işler.
+        bulk=False verilirse eski satır satır yol (her satırda product.save()) kullanılır.
+        chunksize verilirse dosya parça parça okunup her parça ayrı commit edilir.
+        progress verilirse her parçadan sonra ara sayılarla çağrılır.
+        """
+        self.issues = IssueCollector()
+        started = time.perf_counter()
+        frames = iter_frames(file_obj, chunksize)
+        try:
+            df = next(frames)
+            mapping = self.compiled_mapping
+            df = mapping.apply(df)
+        except Exception as e:
+            return {"success": False, "error": f"Dosya okunamadı: {str(e)}"}
+
+        if 'sku' not in df.columns:
+             return {"success": False, "error": "Excel'de 'sku' sütunu bulunamadı!"}
+
+        import_frame = self._import_stock_frame if bulk else self._import_stock_rows
+        row_count = 0
+        created_count = 0
+        updated_count = 0
+        errors = []
+        while df is not None:
+            created, updated, chunk_errors = import_frame(df)
+            row_count += len(df)
+            created_count += created
+            updated_count += updated
+            errors.extend(chunk_errors)
+            if progress:
+                progress(
+                    rows_processed=row_count, created_count=created_count,
+                    updated_count=updated_count, error_count=len(errors),
+                )
+            try:
+                df = mapping.apply(next(frames, None))
+            except Exception as e:
+                return {
+                    "success": False, "error": f"Dosya okunamadı: {str(e)}",
+                    "created_count": created_count, "updated_count": updated_count,
+                }
+
+        elapsed = time.perf_counter() - started
         return {
             "success": True,
             "created_count": created_count,
-            "errors": errors[:10]
+            "updated_count": updated_count,
+            "error_count": len(errors),
+            "errors": errors[:5],
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": _rows_per_sec(row_count, elapsed),
         }
 
-    def process_stock_file(self, file_obj):
+    def process_archive(self, file_obj, parse_pool=None, progress=None):
         """
-        Stok Envanter raporlarını işler.
+        ZIP içindeki her raporu (haftalık / mağaza bazlı dosyalar) işler.
+        parse_pool verilirse dosyalar süreç havuzunda paralel okunur (pandas Excel
+        okuması CPU'ya bağlı ve tek thread'lidir); okunan tablolar ise ZIP'teki sırayla
+        tek yazıcıdan (bu thread) veritabanına yazılır, SQLite'a aynı anda yazan olmaz.
         """
+        self.issues = IssueCollector()
+        started = time.perf_counter()
         try:
-            if file_obj.name.endswith('.csv'):
-                df = pd.read_csv(file_obj)
-            else:
-                df = pd.read_excel(file_obj)
-            
-            df.columns = [str(c).strip().lower() for c in df.columns]
+            archive = zipfile.ZipFile(file_obj)
+            names = [name for name in archive.namelist() if is_report_name(name)]
+        except zipfile.BadZipFile as e:
+            return {"success": False, "error": f"ZIP okunamadı: {str(e)}"}
+        if not names:
+            return {"success": False, "error": "ZIP içinde .xlsx, .xls veya .csv dosyası bulunamadı."}
+
+        mapping = self.compiled_mapping
+
+        def parsed_reports():
+            # Havuzda aynı anda en fazla ARCHIVE_PARSE_WINDOW dosya bekletilir (bellek sınırı)
+            if parse_pool is None:
+                for name in names:
+                    yield name, parse_report(name, archive.read(name))
+                return
+            pending = deque()
+            for name in names:
+                pending.append((name, parse_pool.submit(parse_report, name, archive.read(name))))
+                if len(pending) >= ARCHIVE_PARSE_WINDOW:
+                    done_name, future = pending.popleft()
+                    yield done_name, future.result()
+            while pending:
+                done_name, future = pending.popleft()
+                yield done_name, future.result()
+
+        totals = {"created_count": 0, "updated_count": 0, "skipped_count": 0}
+        files = []
+        errors = []
+        row_count = 0
+        for name, (df, parse_seconds, parse_error) in parsed_reports():
+            entry = {"file": name, "parse_seconds": round(parse_seconds, 3)}
+            self.issues.current_file = name
+            files.append(entry)
+            if parse_error is None:
+                df, parse_error = self._prepare_frame(df, mapping)
+            if parse_error:
+                entry.update(success=False, error=parse_error)
+                self.issues.add_file(parse_error)
+                errors.append(f"{name}: {parse_error}")
+                continue
+
+            write_started = time.perf_counter()
+            counts = self._import_mapped_frame(df)
+            file_errors = counts.pop('errors')
+            entry.update(success=True, rows=len(df), error_count=len(file_errors), **counts)
+            entry["write_seconds"] = round(time.perf_counter() - write_started, 3)
+            errors.extend(f"{name}: {error}" for error in file_errors)
+            row_count += len(df)
+            for key, value in counts.items():
+                totals[key] += value
+            if progress:
+                progress(rows_processed=row_count, error_count=len(errors), **totals)
+
+        elapsed = time.perf_counter() - started
+        return {
+            "success": any(entry['success'] for entry in files),
+            "error": "" if any(entry['success'] for entry in files) else "ZIP içindeki dosyaların hiçbiri işlenemedi.",
+            **totals,
+            "error_count": len(errors),
+            "errors": errors[:10],
+            "files": files,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": _rows_per_sec(row_count, elapsed),
+        }
+
+    def preview(self, file_obj, rows=PREVIEW_ROWS):
+        """
+        Dosyanın yalnızca ilk satırlarını okuyup eşleştirmeyi dener; veritabanına yazmaz.
+        Çözülen sütunları, eksik zorunlu alanları, SKU eşleşme oranını ve örnekten tüm
+        dosyaya oranlanmış tahmini toplamları döner. ZIP'te ilk rapor önizlenir.
+        """
+        started = time.perf_counter()
+        name = getattr(file_obj, 'name', '')
+        try:
+            if sniff_format(file_obj)[0] == 'zip':
+                with zipfile.ZipFile(file_obj) as archive:
+                    name = next(n for n in sorted(archive.namelist()) if is_report_name(n))
+                    file_obj = io.BytesIO(archive.read(name))
+            df, estimated_rows = read_head(file_obj, rows)
+        except StopIteration:
+            return {"success": False, "error": "ZIP içinde .xlsx, .xls veya .csv dosyası bulunamadı."}
         except Exception as e:
             return {"success": False, "error": f"Dosya okunamadı: {str(e)}"}
 
-        mapping_dict = self.get_column_mapping()
-        clean_mapping = {str(k).strip().lower(): v for k, v in mapping_dict.items()}
-        df.rename(columns=clean_mapping, inplace=True)
+        mapping = self.compiled_mapping
+        source_columns = [str(c) for c in df.columns]
+        df = mapping.apply(df)
+        fields = mapping.field_types
+        resolved = {source: field for source, field in zip(source_columns, df.columns) if field in fields}
+        required = SALES_REQUIRED_FIELDS if self.file_type == 'SALES' else ['sku']
+        missing_fields = [field for field in required if field not in df.columns]
 
-        if 'sku' not in df.columns:
-             return {"success": False, "error": "Excel'de 'sku' sütunu bulunamadı!"}
+        result = {
+            "success": True,
+            "file": name,
+            "ready": not missing_fields,
+            "columns": source_columns,
+            "resolved_columns": resolved,
+            "unmapped_columns": [source for source in source_columns if source not in resolved],
+            "missing_fields": missing_fields,
+            "sampled_rows": len(df),
+            "estimated_rows": estimated_rows,
+        }
+        if 'sku' in df.columns and not df.empty:
+            coerced = mapping.coerce(df)
+            result["invalid_values"] = {
+                field: int((coerced.invalid[field]).sum()) for field in coerced.invalid if coerced.invalid[field].any()
+            }
+            result.update(self._preview_totals(coerced, estimated_rows, len(df)))
+        result["sample"] = json.loads(df[list(resolved.values())].head(5).to_json(orient='records', date_format='iso'))
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    def _preview_totals(self, coerced, estimated_rows, sampled_rows):
+        """
+        Örnek satırlardan SKU eşleşmesini ve toplamları hesaplar; toplamlar tahmini satır
+        sayısı biliniyorsa tüm dosyaya oranlanır.
+        """
+        skus = coerced.values['sku'].where(~coerced.missing['sku'])
+        products = fetch_products_by_sku(skus.dropna().unique().tolist())
+        matched = skus.isin(list(products))
+        with_sku = int(skus.notna().sum())
+
+        def column(field, default=0):
+            if field not in coerced.values:
+                return pd.Series(default, index=skus.index)
+            return coerced.values[field].fillna(0)
+
+        if self.file_type == 'SALES':
+            quantities = column('quantity', 1)
+            costs = skus.map({
+                sku: float(p['weighted_cost'] if p['weighted_cost'] > 0 else p['buying_price'])
+                for sku, p in products.items()
+            }).fillna(0)
+            totals = {
+                "quantity": quantities.sum(),
+                "sale_price": column('sale_price').sum(),
+                "commission_amount": column('commission_amount').sum(),
+                "shipping_cost": column('shipping_cost').sum(),
+                "cost": (costs * quantities).sum(),
+            }
+            totals["net_profit"] = (
+                totals["sale_price"] - totals["cost"] - totals["commission_amount"] - totals["shipping_cost"]
+            )
+        else:
+            quantities = column('stock_quantity')
+            totals = {
+                "stock_quantity": quantities.sum(),
+                "stock_value": (quantities * column('buying_price')).sum(),
+                "new_products": int(skus[skus.notna() & ~matched].nunique()),
+            }
+
+        scale = estimated_rows / sampled_rows if estimated_rows and sampled_rows else None
+        return {
+            "sku_match_rate": round(int(matched.sum()) / with_sku, 4) if with_sku else None,
+            "matched_skus": len(products),
+            "sample_totals": {key: round(float(value), 2) for key, value in totals.items()},
+            "projected_totals": {key: round(float(value) * scale, 2) for key, value in totals.items()} if scale else None,
+        }
+
+    def _prepare_frame(self, df, mapping):
+        """
+        Tabloya sütun eşleştirmesini uygular ve zorunlu sütunları kontrol eder.
+        Dönüş: (tablo, hata mesajı ya da None).
+        """
+        df = mapping.apply(df)
+        if self.file_type == 'SALES':
+            missing_fields = [field for field in SALES_REQUIRED_FIELDS if field not in df.columns]
+            if missing_fields:
+                return df, f"Eksik sütunlar: {', '.join(missing_fields)}. Admin panelden Mapping yapın."
+        elif 'sku' not in df.columns:
+            return df, "Excel'de 'sku' sütunu bulunamadı!"
+        return df, None
+
+    def _import_mapped_frame(self, df):
+        """
+        Eşlenmiş tabloyu dosya türüne göre toplu yoldan yazar; sayıları sözlük olarak döner.
+        """
+        if self.file_type == 'SALES':
+            created, skipped, errors = self._import_sales_frame(df)
+            return {"created_count": created, "skipped_count": skipped, "errors": errors}
+        created, updated, errors = self._import_stock_frame(df)
+        return {"created_count": created, "updated_count": updated, "errors": errors}
 
+    def _import_stock_rows(self, df):
+        """
+        Eski yol: her satır için ürün sorgusu + product.save() (save içinde bir sorgu daha).
+        """
         updated_count = 0
         created_count = 0
         errors = []
@@ -121,12 +600,163 @@ class ExcelProcessor:
                 except Exception as e:
                     errors.append(f"Satır {index+1}: {str(e)}")
 
-        return {
-            "success": True,
-            "created_count": created_count,
-            "updated_count": updated_count,
-            "errors": errors[:5]
-        }
+        return created_count, updated_count, errors
+
+    def _import_stock_frame(self, df):
+        """
+        Toplu stok upsert: eşleşen ürünler tek seferde yüklenir, yeni stok ve ağırlıklı
+        maliyet Product.save ile aynı kurallarla tüm tablo için vektörel hesaplanır,
+        sonuç parça parça bulk_update / bulk_create ile yazılır.
+
+        Aynı SKU dosyada birden fazla geçiyorsa satırlar "tur"lara ayrılır (1. geçiş,
+        2. geçiş ...) ve her tur bir öncekinin sonucunun üzerine uygulanır; böylece
+        sonuç satır satır işlemeyle aynı olur.
+        """
+        if df.empty:
+            return 0, 0, []
+
+        coerced = self.compiled_mapping.coerce(df)
+        skus = coerced.values['sku']
+        keep = (skus != '') & (skus.str.lower() != 'nan')
+
+        # Stok/fiyat boşsa 0 sayılır; dolu ama sayı değilse satır hatalıdır
+        issue_frames = []
+        invalid = {}
+        numbers = {}
+        for field in ('stock_quantity', 'buying_price'):
+            if field in coerced.values:
+                numbers[field] = coerced.values[field].fillna(0)
+                invalid[field] = coerced.invalid[field]
+            else:
+                numbers[field] = pd.Series(0, index=df.index)
+                invalid[field] = pd.Series(False, index=df.index)
+
+        bad_mask = keep & (invalid['stock_quantity'] | invalid['buying_price'])
+        for field in ('stock_quantity', 'buying_price'):
+            issue_frames.append(self.issues.add(df, keep & invalid[field], field, INVALID_REASONS['number']))
+        self.issues.add(df, ~keep, 'sku', "SKU boş; satır atlandı", severity=SKIPPED)
+
+        def text_column(field, default):
+            if field not in coerced.values:
+                return default
+            return coerced.values[field].where(~coerced.missing[field], default)
+
+        good = keep & ~bad_mask
+        rows = pd.DataFrame({
+            'row': df.index,
+            'sku': skus,
+            'qty': np.trunc(numbers['stock_quantity']).astype('int64'),
+            'price': (numbers['buying_price'] * 100).round().astype('int64'),
+            'name': text_column('name', skus),
+            'barcode': text_column('barcode', ''),
+            'description': text_column('description', ''),
+        })[good]
+        if rows.empty:
+            return 0, 0, row_errors(issue_frames, STOCK_ERROR_MESSAGE)
+        rows['round'] = rows.groupby('sku').cumcount()
+
+        # Ürünler yazımla aynı transaction'da (kilitli) okunur: okuma ile yazma arasında başka bir
+        # süreçte yapılan alış ya da fiyat değişikliği eski değerlerle ezilmez
+        with transaction.atomic():
+            created_count, updated_count = self._upsert_stock_rows(rows, issue_frames)
+        return created_count, updated_count, row_errors(issue_frames, STOCK_ERROR_MESSAGE)
+
+    def _upsert_stock_rows(self, rows, issue_frames):
+        """
+        Eşleşen ürünleri okur, turları uygular ve sonucu yazar (bkz. _import_stock_frame);
+        çağıran transaction içinde çalışır. Dönüş: (eklenen, güncellenen) ürün sayısı.
+        """
+        products = fetch_products_by_sku(
+            rows['sku'].unique().tolist(),
+            fields=('id', 'sku', 'stock_quantity', 'buying_price', 'weighted_cost'),
+            lock=True,
+        )
+        state = pd.DataFrame.from_records(
+            [{
+                'sku': sku, 'id': p['id'], 'stock': p['stock_quantity'],
+                'bp': int(p['buying_price'] * 100), 'wc': int(p['weighted_cost'] * 100),
+                'is_new': False, 'touched': False,
+            } for sku, p in products.items()],
+            columns=['sku', 'id', 'stock', 'bp', 'wc', 'is_new', 'touched'],
+        ).set_index('sku')
+        state['name'] = state['barcode'] = state['description'] = ''
+        # Başlangıç stoku ve maliyeti: yazılan fark ve defterdeki değer farkı bunlara göre hesaplanır
+        state['stock0'] = state['stock']
+        state['wc0'] = state['wc']
+
+        created_count = 0
+        updated_count = 0
+        for round_no in range(rows['round'].max() + 1):
+            batch = rows[rows['round'] == round_no].set_index('sku')
+            exists = batch.index.isin(state.index)
+
+            # Mevcut ürünler: stok eklenir, maliyet Product.save kurallarıyla güncellenir
+            existing = batch[exists]
+            if not existing.empty:
+                old = state.loc[existing.index]
+                stock, bp, wc, failed = apply_stock_receipt(
+                    old['stock'].to_numpy('int64'), old['bp'].to_numpy('int64'), old['wc'].to_numpy('int64'),
+                    existing['qty'].to_numpy('int64'), existing['price'].to_numpy('int64'),
+                )
+                ok = existing.index[~failed]
+                state.loc[ok, 'stock'] = stock[~failed]
+                state.loc[ok, 'bp'] = bp[~failed]
+                state.loc[ok, 'wc'] = wc[~failed]
+                state.loc[ok, 'touched'] = True
+                updated_count += len(ok)
+                issue_frames.append(self.issues.add_rows(
+                    existing['row'][failed].tolist(), 'stock_quantity',
+                    "yeni stok 0 olduğu için ağırlıklı maliyet hesaplanamadı (sıfıra bölme)",
+                ))
+
+            # Yeni ürünler: fiyat girilmişse maliyet alış fiyatına eşitlenir
+            new = batch[~exists]
+            if not new.empty:
+                created = pd.DataFrame({
+                    'id': None, 'stock': new['qty'], 'bp': new['price'],
+                    'wc': new['price'].where(new['price'] > 0, 0),
+                    'is_new': True, 'touched': True, 'stock0': 0, 'wc0': 0,
+                    'name': new['name'], 'barcode': new['barcode'], 'description': new['description'],
+                }, index=new.index)
+                state = pd.concat([state, created])
+                created_count += len(created)
+
+        state = state[state['touched']]
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        movements = []
+        for sku, item in zip(state.index, state.itertuples(index=False)):
+            product = Product(
+                id=item.id, sku=sku, stock_quantity=int(item.stock),
+                buying_price=Decimal(int(item.bp)).scaleb(-2),
+                weighted_cost=Decimal(int(item.wc)).scaleb(-2),
+                updated_at=now,
+            )
+            if item.is_new:
+                product.name, product.barcode, product.description = item.name, item.barcode, item.description
+                to_create.append(product)
+            else:
+                # Mevcut ürünlere stok farkı yazılır (bkz. bulk_update_rows increments)
+                product.stock_quantity = int(item.stock - item.stock0)
+                to_update.append(product)
+            if item.stock != item.stock0:
+                # Değer farkı kuruş cinsinden: yeni stok * yeni maliyet - eski stok * eski maliyet
+                movements.append((product, StockMovement(
+                    kind='IMPORT', quantity=int(item.stock - item.stock0), occurred_at=now,
+                    value=Decimal(int(item.stock) * int(item.wc) - int(item.stock0) * int(item.wc0)).scaleb(-2),
+                )))
+
+        bulk_update_rows(
+            Product, ['stock_quantity', 'buying_price', 'weighted_cost', 'updated_at'], to_update,
+            increments=('stock_quantity',),
+        )
+        Product.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        for product, movement in movements:
+            movement.product_id = product.pk
+        record_movements([movement for _, movement in movements])
+        bump_data_version()
+        return created_count, updated_count
 
     def _create_transaction_from_row(self, row):
         product_sku = str(row.get('sku', '')).strip()
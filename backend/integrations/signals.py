@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ColumnMapping
+from .mappings import invalidate_mappings
+
+
+@receiver([post_save, post_delete], sender=ColumnMapping)
+def invalidate_mapping_cache(sender, instance, **kwargs):
+    """
+    Sütun eşleştirmesi eklendiğinde/değiştiğinde/silindiğinde o pazaryerinin
+    önbellekteki derlenmiş planını siler; bir sonraki yükleme planı yeniden kurar.
+    """
+    invalidate_mappings(instance.marketplace_id)
@@ -1,3 +1,548 @@
-from django.test import TestCase
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from unittest import mock
+import pandas as pd
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from finance.models import Transaction
+from products.models import Product, StockMovement
+from .mappings import get_compiled_mapping, invalidate_mappings
+from .models import Marketplace, ImportJob, ColumnMapping
+from . import jobs, readers, services
+from .services import ExcelProcessor
 
-# Create your tests here.
+
+def make_csv(rows, name='rapor.csv'):
+    buffer = io.BytesIO(pd.DataFrame(rows).to_csv(index=False).encode())
+    buffer.name = name
+    return buffer
+
+
+def make_xlsx(rows, name='rapor.xlsx'):
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+def make_zip(files, name='raporlar.zip'):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for file_name, content in files.items():
+            archive.writestr(file_name, content.getvalue())
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class ReaderTests(TestCase):
+    rows = [{'sku': 'A1', 'stock_quantity': 3, 'buying_price': 12.5}, {'sku': 'B2', 'stock_quantity': 1, 'buying_price': 4}]
+
+    def text_file(self, text, name):
+        buffer = io.BytesIO(text.encode())
+        buffer.name = name
+        return buffer
+
+    def test_format_is_sniffed_from_content(self):
+        self.assertEqual(readers.sniff_format(make_xlsx(self.rows, name='yanlis.csv')), ('xlsx', None))
+        self.assertEqual(readers.sniff_format(make_zip({'a.csv': make_csv(self.rows)}, name='a.xlsx')), ('zip', None))
+        self.assertEqual(readers.sniff_format(io.BytesIO(readers.OLE2_MAGIC + b'\0' * 8)), ('xls', None))
+        self.assertEqual(readers.sniff_format(self.text_file('sku\tadet\nA1\t3\n', 'a.tsv')), ('csv', '\t'))
+        self.assertEqual(readers.sniff_format(self.text_file('sku;adet\nA1;3\n', 'a.csv')), ('csv', ';'))
+
+    def test_engines_agree(self):
+        expected = pd.DataFrame(self.rows)
+        for make_file in (make_csv, make_xlsx):
+            fast = readers.read_frame(make_file(self.rows))
+            with mock.patch.object(readers, 'HAS_CALAMINE', False), mock.patch.object(readers, 'HAS_PYARROW', False):
+                fallback = readers.read_frame(make_file(self.rows))
+            pd.testing.assert_frame_equal(fast, expected, check_dtype=False)
+            pd.testing.assert_frame_equal(fallback, expected, check_dtype=False)
+
+    def test_tsv_upload_is_imported(self):
+        marketplace = Marketplace.objects.create(name='N11')
+        processor = ExcelProcessor(marketplace=marketplace, file_type='STOCK')
+        result = processor.process_stock_file(self.text_file('SKU\tstock_quantity\tbuying_price\nT1\t5\t9.90\n', 'stok.tsv'))
+        self.assertEqual(result['created_count'], 1)
+        self.assertEqual(Product.objects.get(sku='T1').stock_quantity, 5)
+
+
+class MappingCacheTests(TestCase):
+    def setUp(self):
+        invalidate_mappings()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        ColumnMapping.objects.create(marketplace=self.marketplace, file_type='STOCK', excel_column_name='Stok Kodu', db_field_name='sku')
+
+    def test_compiled_mapping_is_cached(self):
+        first = get_compiled_mapping(self.marketplace, 'STOCK')
+        with self.assertNumQueries(0):
+            self.assertIs(get_compiled_mapping(self.marketplace, 'STOCK'), first)
+        self.assertEqual(first.rename, {'stok kodu': 'sku'})
+
+    def test_mapping_changes_invalidate_cache(self):
+        first = get_compiled_mapping(self.marketplace, 'STOCK')
+        mapping = ColumnMapping.objects.create(marketplace=self.marketplace, file_type='STOCK', excel_column_name='ADET', db_field_name='stock_quantity')
+        second = get_compiled_mapping(self.marketplace, 'STOCK')
+        self.assertIsNot(second, first)
+        self.assertEqual(second.rename['adet'], 'stock_quantity')
+
+        mapping.delete()
+        self.assertNotIn('adet', get_compiled_mapping(self.marketplace, 'STOCK').rename)
+
+    def test_apply_and_coerce(self):
+        plan = get_compiled_mapping(self.marketplace, 'STOCK')
+        df = plan.apply(pd.DataFrame({' STOK KODU ': ['A1', None], 'stock_quantity': ['3', 'x'], 'buying_price': [1.5, None]}))
+        coerced = plan.coerce(df)
+        self.assertEqual(coerced.values['sku'].tolist(), ['A1', 'nan'])
+        self.assertEqual(coerced.missing['sku'].tolist(), [False, True])
+        self.assertEqual(coerced.invalid['stock_quantity'].tolist(), [False, True])
+        self.assertEqual(coerced.missing['buying_price'].tolist(), [False, True])
+
+
+class SalesImportTests(TestCase):
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.processor = ExcelProcessor(marketplace=self.marketplace, file_type='SALES')
+        Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('40'))
+        Product.objects.create(sku='B2', name='Ürün B', buying_price=Decimal('10'))
+        Product.objects.filter(sku='B2').update(weighted_cost=Decimal('12.50'))
+        self.rows = [
+            {'order_number': 'S1', 'sku': 'A1', 'sale_price': 100, 'quantity': 2, 'transaction_date': '2025-01-05'},
+            {'order_number': 'S2', 'sku': 'B2', 'sale_price': 50, 'quantity': 1, 'transaction_date': '2025-01-06'},
+            {'order_number': 'S3', 'sku': 'YOK', 'sale_price': 20, 'quantity': 1, 'transaction_date': '2025-01-07'},
+            {'order_number': 'S4', 'sku': 'A1', 'sale_price': 'abc', 'quantity': 1, 'transaction_date': '2025-01-08'},
+            {'order_number': 'S5', 'sku': 'A1', 'sale_price': 30, 'quantity': None, 'transaction_date': '2025-01-09'},
+        ]
+
+    def test_bulk_matches_row_path_counts(self):
+        legacy = self.processor.process_sales_file(make_csv(self.rows), bulk=False)
+        Transaction.objects.all().delete()
+        bulk = self.processor.process_sales_file(make_csv(self.rows))
+
+        self.assertEqual(bulk['created_count'], legacy['created_count'])
+        self.assertEqual(bulk['error_count'], legacy['error_count'])
+        self.assertEqual(bulk['error_count'], 2)
+        self.assertIsNotNone(bulk['rows_per_sec'])
+
+    def test_bulk_matches_row_path_values(self):
+        fields = ('order_number', 'product__sku', 'quantity', 'sale_price', 'cost_at_transaction')
+        self.processor.process_sales_file(make_csv(self.rows[:3]), bulk=False)
+        legacy_rows = list(Transaction.objects.order_by('order_number').values_list(*fields))
+        Transaction.objects.all().delete()
+
+        self.processor.process_sales_file(make_csv(self.rows[:3]))
+        bulk_rows = list(Transaction.objects.order_by('order_number').values_list(*fields))
+        self.assertEqual(bulk_rows, legacy_rows)
+
+    def test_reimport_skips_existing_rows(self):
+        first = self.processor.process_sales_file(make_csv(self.rows[:3]))
+        again = self.processor.process_sales_file(make_csv(self.rows[:3]))
+        overlapping = self.processor.process_sales_file(make_csv(self.rows[1:3] + [
+            {'order_number': 'S6', 'sku': 'B2', 'sale_price': 70, 'quantity': 1, 'transaction_date': '2025-01-10'},
+            {'order_number': 'S6', 'sku': 'B2', 'sale_price': 70, 'quantity': 1, 'transaction_date': '2025-01-10'},
+        ]))
+
+        self.assertEqual((first['created_count'], first['skipped_count']), (3, 0))
+        self.assertEqual((again['created_count'], again['skipped_count']), (0, 3))
+        self.assertEqual((overlapping['created_count'], overlapping['skipped_count']), (1, 3))
+        self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_issue_report_lists_every_problem(self):
+        result = self.processor.process_sales_file(make_csv(self.rows))
+        report = self.processor.issues.to_frame()
+
+        issues = list(zip(report['row'], report['column'], report['severity']))
+        self.assertEqual(issues, [
+            (3, 'sku', 'WARNING'), (4, 'sale_price', 'ERROR'), (5, 'quantity', 'ERROR'),
+        ])
+        self.assertEqual(result['errors'], [
+            "Satır 4 hatası: 'sale_price' sayıya çevrilemedi (abc)",
+            "Satır 5 hatası: 'quantity' değeri boş (nan)",
+        ])
+        self.assertTrue(self.processor.issues.to_csv().startswith('\ufeffDosya,Satır,Sütun'.encode('utf-8')))
+
+    def test_bulk_uses_weighted_cost(self):
+        self.processor.process_sales_file(make_csv(self.rows[:3]))
+        costs = dict(Transaction.objects.values_list('order_number', 'cost_at_transaction'))
+        self.assertEqual(costs, {'S1': Decimal('40.00'), 'S2': Decimal('12.50'), 'S3': Decimal('0.00')})
+
+
+class StockImportTests(TestCase):
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.processor = ExcelProcessor(marketplace=self.marketplace, file_type='STOCK')
+        self.rows = [
+            {'sku': 'A1', 'name': 'Ürün A', 'stock_quantity': 10, 'buying_price': 20},
+            {'sku': 'B2', 'name': 'Ürün B', 'stock_quantity': 5, 'buying_price': 0},
+            {'sku': 'C3', 'name': None, 'stock_quantity': 3, 'buying_price': 7.5},
+            {'sku': 'A1', 'name': 'Ürün A', 'stock_quantity': 4, 'buying_price': 27.33},
+            {'sku': 'D4', 'name': 'Ürün D', 'stock_quantity': 'çok', 'buying_price': 5},
+            {'sku': 'NEG', 'name': 'Negatif', 'stock_quantity': 2, 'buying_price': 10},
+            {'sku': None, 'name': 'Boş', 'stock_quantity': 1, 'buying_price': 1},
+            {'sku': 'B2', 'name': 'Ürün B', 'stock_quantity': 0, 'buying_price': 9},
+        ]
+
+    def seed(self):
+        StockMovement.objects.all().delete()  # defter ürün silinmesini engeller
+        Product.objects.all().delete()
+        Product.objects.create(sku='A1', name='Ürün A', stock_quantity=6, buying_price=Decimal('15'))
+        Product.objects.create(sku='NEG', name='Negatif', stock_quantity=-2, buying_price=Decimal('8'))
+
+    def snapshot(self):
+        return list(Product.objects.order_by('sku').values_list(
+            'sku', 'name', 'stock_quantity', 'buying_price', 'weighted_cost'))
+
+    def test_bulk_matches_row_path(self):
+        self.seed()
+        legacy = self.processor.process_stock_file(make_csv(self.rows), bulk=False)
+        legacy_products = self.snapshot()
+
+        self.seed()
+        bulk = self.processor.process_stock_file(make_csv(self.rows))
+
+        for key in ('created_count', 'updated_count', 'error_count'):
+            self.assertEqual(bulk[key], legacy[key])
+        self.assertEqual([e.split(':')[0] for e in bulk['errors']], [e.split(':')[0] for e in legacy['errors']])
+        self.assertEqual(self.snapshot(), legacy_products)
+
+
+class StockImportConcurrencyTests(TransactionTestCase):
+    def test_purchase_between_read_and_write_is_kept(self):
+        from products.stock import receive_stock
+
+        marketplace = Marketplace.objects.create(name='Trendyol')
+        product = Product.objects.create(sku='A1', name='Ürün A', stock_quantity=10, buying_price=Decimal('10'))
+        fetch = services.fetch_products_by_sku
+        purchases = []
+
+        def purchase():
+            try:
+                receive_stock(product.pk, 10, Decimal('40'))
+            finally:
+                connection.close()
+
+        def read_then_purchase(*args, **kwargs):
+            # Ürünler okunduktan sonra başka bir bağlantıda alış yapılır; kilit varsa içe aktarma bitene kadar bekler
+            products = fetch(*args, **kwargs)
+            thread = threading.Thread(target=purchase)
+            thread.start()
+            thread.join(timeout=0.5)
+            purchases.append(thread)
+            return products
+
+        with mock.patch('integrations.services.fetch_products_by_sku', side_effect=read_then_purchase):
+            ExcelProcessor(marketplace=marketplace, file_type='STOCK').process_stock_file(make_csv([
+                {'sku': 'A1', 'stock_quantity': 10, 'buying_price': 20},
+            ]))
+        purchases[0].join()
+
+        # İçe aktarma: (10 * 10 + 10 * 20) / 20 = 15; ardından alış: (20 * 15 + 10 * 40) / 30 = 23.33
+        product.refresh_from_db()
+        self.assertEqual(
+            (product.stock_quantity, product.weighted_cost, product.buying_price),
+            (30, Decimal('23.33'), Decimal('40.00')),
+        )
+
+
+class UploadConcurrencyTests(TransactionTestCase):
+    UPLOADS = 4
+
+    def test_concurrent_uploads_of_the_same_file_open_one_job(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        marketplace = Marketplace.objects.create(name='Trendyol')
+        content = make_xlsx([{'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}]).getvalue()
+        barrier = threading.Barrier(self.UPLOADS)
+        statuses = []
+
+        def fingerprint(file_obj):
+            # Tüm yüklemeler özeti aynı anda hesaplar; mükerrer kontrolüne birlikte gelirler
+            digest = readers.fingerprint_file(file_obj)
+            barrier.wait()
+            return digest
+
+        def upload():
+            try:
+                statuses.append(APIClient().post('/api/integrations/upload/', {
+                    'marketplace_id': marketplace.id, 'file_type': 'SALES',
+                    'file': SimpleUploadedFile('rapor.xlsx', content),
+                }, format='multipart').status_code)
+            finally:
+                connection.close()
+
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch('integrations.views.fingerprint_file', side_effect=fingerprint), \
+                mock.patch('integrations.views.enqueue_import'):
+            threads = [threading.Thread(target=upload) for _ in range(self.UPLOADS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(statuses), [200] * (self.UPLOADS - 1) + [202])
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+
+class StreamingImportTests(TestCase):
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Hepsiburada')
+        Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('40'))
+        self.sales_rows = [
+            {'order_number': f'S{i}', 'sku': 'A1' if i % 3 else 'YOK',
+             'sale_price': 'x' if i == 4 else 100 + i, 'quantity': 1, 'transaction_date': '2025-02-01'}
+            for i in range(11)
+        ]
+
+    def test_sales_chunks_match_one_shot(self):
+        processor = ExcelProcessor(marketplace=self.marketplace, file_type='SALES')
+        for make_file in (make_csv, make_xlsx):
+            one_shot = processor.process_sales_file(make_file(self.sales_rows))
+            Transaction.objects.all().delete()
+            streamed = processor.process_sales_file(make_file(self.sales_rows), chunksize=3)
+            self.assertEqual(streamed['created_count'], one_shot['created_count'])
+            self.assertEqual(streamed['errors'], one_shot['errors'])
+            self.assertEqual(Transaction.objects.count(), 10)
+            Transaction.objects.all().delete()
+
+    def test_stock_chunks_match_one_shot(self):
+        processor = ExcelProcessor(marketplace=self.marketplace, file_type='STOCK')
+        rows = [{'sku': f'P{i % 4}', 'stock_quantity': 2, 'buying_price': 10 + i} for i in range(9)]
+        one_shot = processor.process_stock_file(make_xlsx(rows))
+        expected = list(Product.objects.order_by('sku').values_list('sku', 'stock_quantity', 'weighted_cost'))
+
+        StockMovement.objects.filter(product__sku__startswith='P').delete()
+        Product.objects.filter(sku__startswith='P').delete()
+        streamed = processor.process_stock_file(make_xlsx(rows), chunksize=2)
+        self.assertEqual((streamed['created_count'], streamed['updated_count']), (4, 5))
+        self.assertEqual((one_shot['created_count'], one_shot['updated_count']), (4, 5))
+        self.assertEqual(list(Product.objects.order_by('sku').values_list('sku', 'stock_quantity', 'weighted_cost')), expected)
+
+
+class ArchiveImportTests(TestCase):
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.processor = ExcelProcessor(marketplace=self.marketplace, file_type='SALES')
+        week = lambda w: [
+            {'order_number': f'W{w}-{i}', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-04-01'}
+            for i in range(4)
+        ]
+        self.archive = {
+            'hafta1.xlsx': make_xlsx(week(1)),
+            'hafta2.csv': make_csv(week(2)),
+            'notlar/bos.xlsx': make_xlsx([{'aciklama': 'x'}]),
+        }
+
+    def check_result(self, result):
+        self.assertTrue(result['success'])
+        self.assertEqual(result['created_count'], 8)
+        self.assertEqual([f['file'] for f in result['files']], list(self.archive))
+        self.assertEqual([f['success'] for f in result['files']], [True, True, False])
+        self.assertEqual(result['files'][0]['rows'], 4)
+        self.assertIn('write_seconds', result['files'][1])
+        self.assertEqual(Transaction.objects.count(), 8)
+
+    def test_archive_inline(self):
+        self.check_result(self.processor.process_archive(make_zip(self.archive)))
+
+    def test_archive_with_process_pool(self):
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn')) as pool:
+            self.check_result(self.processor.process_archive(make_zip(self.archive), parse_pool=pool))
+
+
+class PreviewTests(TestCase):
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        ColumnMapping.objects.create(marketplace=self.marketplace, file_type='SALES', excel_column_name='Sipariş No', db_field_name='order_number')
+        ColumnMapping.objects.create(marketplace=self.marketplace, file_type='SALES', excel_column_name='Fiyat', db_field_name='sale_price')
+        Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('4'))
+        self.processor = ExcelProcessor(marketplace=self.marketplace, file_type='SALES')
+        self.rows = [
+            {'Sipariş No': f'S{i:06d}', 'sku': 'A1' if i % 4 else 'YOK', 'Fiyat': 10, 'Adet': 1}
+            for i in range(20000)
+        ]
+
+    def test_preview_reads_only_the_head(self):
+        for make in (make_csv, make_xlsx):
+            result = self.processor.preview(make(self.rows), rows=100)
+
+            self.assertTrue(result['ready'])
+            self.assertEqual(result['sampled_rows'], 100)
+            self.assertEqual(result['resolved_columns'], {'Sipariş No': 'order_number', 'sku': 'sku', 'Fiyat': 'sale_price'})
+            self.assertEqual(result['unmapped_columns'], ['Adet'])
+            self.assertEqual(result['sku_match_rate'], 0.75)
+            self.assertEqual(result['sample_totals']['sale_price'], 1000)
+            self.assertAlmostEqual(result['estimated_rows'], 20000, delta=200)
+            self.assertAlmostEqual(result['projected_totals']['sale_price'], 200000, delta=2000)
+            self.assertLess(result['elapsed_seconds'], 1)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_preview_reads_quoted_newlines_in_csv(self):
+        rows = [{'Sipariş No': f'S{i:04d}', 'sku': 'A1', 'Fiyat': 10, 'Not': 'ilk satır\nikinci satır'} for i in range(500)]
+        result = self.processor.preview(make_csv(rows), rows=100)
+
+        self.assertEqual(result['sampled_rows'], 100)
+        self.assertAlmostEqual(result['estimated_rows'], 500, delta=10)
+        self.assertEqual(result['sample_totals']['sale_price'], 1000)
+
+    def test_preview_reports_missing_fields(self):
+        ColumnMapping.objects.filter(db_field_name='sale_price').delete()
+        result = self.processor.preview(make_csv(self.rows[:10]))
+
+        self.assertFalse(result['ready'])
+        self.assertEqual(result['missing_fields'], ['sale_price'])
+        self.assertEqual(result['estimated_rows'], 10)
+        self.assertIn('Fiyat', result['unmapped_columns'])
+
+
+class ImportJobApiTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.client = APIClient()
+
+    def upload(self, rows, file_type='SALES'):
+        content = rows if isinstance(rows, bytes) else make_xlsx(rows).getvalue()
+        with override_settings(MEDIA_ROOT=self.media_root, IMPORT_JOBS_SYNC=True):
+            return self.client.post('/api/integrations/upload/', {
+                'marketplace_id': self.marketplace.id,
+                'file_type': file_type,
+                'file': SimpleUploadedFile('rapor.xlsx', content),
+            }, format='multipart')
+
+    def test_upload_returns_job_and_status_reports_result(self):
+        rows = [{'order_number': f'S{i}', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'} for i in range(3)]
+        response = self.upload(rows)
+
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(f"/api/integrations/jobs/{response.data['job_id']}/").data
+        self.assertEqual(job['status'], 'SUCCESS')
+        self.assertEqual((job['rows_processed'], job['created_count'], job['error_count']), (3, 3, 0))
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_same_file_twice_is_not_reimported(self):
+        content = make_xlsx([{'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}]).getvalue()
+        first = self.upload(content)
+        second = self.upload(content)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.data['duplicate'])
+        self.assertEqual(second.data['job_id'], first.data['job_id'])
+        self.assertEqual(ImportJob.objects.count(), 1)
+
+    def test_failed_or_orphaned_job_does_not_block_reupload(self):
+        content = make_xlsx([{'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}]).getvalue()
+        first = self.upload(content)
+        # İlk iş sunucu yeniden başlatılırken yarıda kalmış gibi: RUNNING, kalp atışı eski
+        ImportJob.objects.filter(pk=first.data['job_id']).update(
+            status='RUNNING', heartbeat_at=timezone.now() - timedelta(hours=2),
+        )
+        second = self.upload(content)
+
+        self.assertEqual(second.status_code, 202)
+        self.assertNotEqual(second.data['job_id'], first.data['job_id'])
+
+        ImportJob.objects.filter(pk=second.data['job_id']).update(status='FAILED')
+        self.assertEqual(self.upload(content).status_code, 202)
+
+    def test_recover_jobs_reruns_pending_and_fails_stale_running(self):
+        content = make_xlsx([{'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}]).getvalue()
+        with override_settings(MEDIA_ROOT=self.media_root, IMPORT_JOBS_SYNC=True):
+            pending = ImportJob.objects.create(
+                marketplace=self.marketplace, file_type='SALES', file=SimpleUploadedFile('a.xlsx', content),
+            )
+            stale = ImportJob.objects.create(
+                marketplace=self.marketplace, file_type='SALES', file=SimpleUploadedFile('b.xlsx', content),
+                status='RUNNING', heartbeat_at=timezone.now() - timedelta(hours=2),
+            )
+            stale_path = stale.file.path
+            live = ImportJob.objects.create(
+                marketplace=self.marketplace, file_type='SALES', file=SimpleUploadedFile('c.xlsx', content),
+                status='RUNNING',
+            )
+            call_command('recover_import_jobs', stdout=io.StringIO())
+
+        pending.refresh_from_db()
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((pending.status, pending.created_count), ('SUCCESS', 1))
+        self.assertEqual(stale.status, 'FAILED')
+        self.assertIn('yarıda kesildi', stale.error)
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertEqual(live.status, 'RUNNING')
+        # Sahiplenilmiş bir iş tekrar kuyruğa alınsa da ikinci kez çalışmaz
+        self.assertIsNone(jobs.run_import_job(pending.pk))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_multiple_files_become_one_archive_job(self):
+        files = [
+            SimpleUploadedFile(f'hafta{w}.xlsx', make_xlsx([
+                {'order_number': f'W{w}', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}
+            ]).getvalue())
+            for w in (1, 2)
+        ]
+        with override_settings(MEDIA_ROOT=self.media_root, IMPORT_JOBS_SYNC=True, IMPORT_PARSE_PROCESSES=0):
+            response = self.client.post('/api/integrations/upload/', {
+                'marketplace_id': self.marketplace.id, 'file_type': 'SALES', 'files': files,
+            }, format='multipart')
+
+        job = ImportJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, 'SUCCESS')
+        self.assertEqual(job.created_count, 2)
+        self.assertEqual([f['file'] for f in job.result['files']], ['hafta1.xlsx', 'hafta2.xlsx'])
+
+    def test_failed_job_reports_error(self):
+        response = self.upload([{'siparis': 1}])
+
+        job = ImportJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIn('Eksik sütunlar', job.error)
+
+    def test_error_report_can_be_downloaded(self):
+        Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('5'))
+        rows = [
+            {'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'},
+            {'order_number': 'S2', 'sku': 'A1', 'sale_price': 'x', 'transaction_date': '2025-03-01'},
+        ]
+        response = self.upload(rows)
+        job = self.client.get(f"/api/integrations/jobs/{response.data['job_id']}/").data
+        self.assertTrue(job['error_report_url'].endswith(f"/jobs/{job['id']}/errors/"))
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            download = self.client.get(job['error_report_url'])
+            report = pd.read_csv(io.BytesIO(b''.join(download.streaming_content)), encoding='utf-8-sig')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(report[['Satır', 'Sütun', 'Seviye']].values.tolist(), [[2, 'sale_price', 'ERROR']])
+
+    def test_clean_job_has_no_error_report(self):
+        Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('5'))
+        response = self.upload([{'order_number': 'S1', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'}])
+        job = self.client.get(f"/api/integrations/jobs/{response.data['job_id']}/").data
+        self.assertIsNone(job['error_report_url'])
+        self.assertEqual(self.client.get(f"/api/integrations/jobs/{job['id']}/errors/").status_code, 404)
+
+    def test_preview_endpoint_does_not_create_job(self):
+        rows = [{'order_number': f'S{i}', 'sku': 'A1', 'sale_price': 10, 'transaction_date': '2025-03-01'} for i in range(3)]
+        response = self.client.post('/api/integrations/upload/preview/', {
+            'marketplace_id': self.marketplace.id,
+            'file_type': 'SALES',
+            'rows': 2,
+            'file': SimpleUploadedFile('rapor.xlsx', make_xlsx(rows).getvalue()),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['sampled_rows'], response.data['missing_fields']), (2, []))
+        self.assertEqual(ImportJob.objects.count(), 0)
@@ -1,18 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # Senin Importların (Lütfen views.py'da sınıf adın neyse onu bırak)
-from .views import ExcelUploadView, MarketplaceViewSet
+from .views import ExcelUploadView, ExcelPreviewView, MarketplaceViewSet, ImportJobViewSet
 
 # --- DEBUG: Terminale çalıştığını kanıtlayan yazı ---
 print(">>> INTEGRATIONS URLS DOSYASI OKUNDU! <<<")
 
 router = DefaultRouter()
 router.register(r'list', MarketplaceViewSet, basename='marketplace')
+router.register(r'jobs', ImportJobViewSet, basename='import-job') # /api/integrations/jobs/<id>/
 
 urlpatterns = [
     # 1. MANUEL YOLLAR (EN ÜSTTE OLMAK ZORUNDA)
     # Router'ın "upload" kelimesini ID sanıp yutmasını engellemek için bunu tepeye koyuyoruz.
     path('upload/', ExcelUploadView.as_view(), name='excel-upload'),
+    path('upload/preview/', ExcelPreviewView.as_view(), name='excel-preview'),
 
     # 2. OTOMATİK YOLLAR (EN ALTTA)
     path('', include(router.urls)),
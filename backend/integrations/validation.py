@@ -0,0 +1,95 @@
+import pandas as pd
+
+# Sorun seviyeleri: ERROR satır yazılmadı, WARNING satır yazıldı ama dikkat gerektirir,
+# SKIPPED satır bilerek atlandı (boş SKU, mükerrer kayıt)
+ERROR = 'ERROR'
+WARNING = 'WARNING'
+SKIPPED = 'SKIPPED'
+
+REPORT_HEADERS = {
+    'file': 'Dosya',
+    'row': 'Satır',
+    'column': 'Sütun',
+    'value': 'Değer',
+    'reason': 'Hata',
+    'severity': 'Seviye',
+}
+
+
+class IssueCollector:
+    """
+    İçe aktarma sırasında bulunan tüm sorunları (satır, sütun, değer, sebep) toplar.
+    Sorunlar satır satır değil maskelerle toplu eklenir; sonunda tam rapor CSV olarak alınır.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.current_file = ''
+
+    def add(self, df, mask, column, reason, severity=ERROR, values=None):
+        """
+        mask'in True olduğu satırlar için sorun ekler. Eklenen kayıtları DataFrame olarak döner.
+        """
+        if not mask.any():
+            return None
+        if values is None:
+            values = df[column] if column in df.columns else pd.Series('', index=df.index)
+        issues = pd.DataFrame({
+            'file': self.current_file,
+            'row': df.index[mask.to_numpy()] + 1,
+            'column': column,
+            'value': values[mask].astype(str).to_numpy(),
+            'reason': reason,
+            'severity': severity,
+        })
+        self.frames.append(issues)
+        return issues
+
+    def add_rows(self, rows, column, reason, severity=ERROR):
+        """
+        Maskesi olmayan (ör. hesaplama sırasında ortaya çıkan) sorunlar için; rows 0 tabanlıdır.
+        """
+        if not len(rows):
+            return None
+        issues = pd.DataFrame({
+            'file': self.current_file,
+            'row': [row + 1 for row in rows],
+            'column': column,
+            'value': '',
+            'reason': reason,
+            'severity': severity,
+        })
+        self.frames.append(issues)
+        return issues
+
+    def add_file(self, reason, severity=ERROR):
+        """Dosyanın tamamını etkileyen sorun (okunamadı, zorunlu sütun yok); satır 0 yazılır."""
+        return self.add_rows([-1], '', reason, severity)
+
+    def __len__(self):
+        return sum(len(frame) for frame in self.frames)
+
+    def to_frame(self):
+        if not self.frames:
+            return pd.DataFrame(columns=list(REPORT_HEADERS))
+        return pd.concat(self.frames, ignore_index=True).sort_values(['file', 'row'], kind='stable')
+
+    def to_csv(self):
+        """Excel'de Türkçe karakterler bozulmasın diye BOM'lu UTF-8 CSV döner."""
+        return self.to_frame().rename(columns=REPORT_HEADERS).to_csv(index=False).encode('utf-8-sig')
+
+
+def row_errors(issue_frames, message="Satır {row} hatası: '{column}' {reason} ({value})"):
+    """
+    Bir parçadaki ERROR kayıtlarından satır başına tek bir okunabilir mesaj üretir
+    (her satırın ilk sorunu). Sayısı hatalı satır sayısına eşittir.
+    """
+    frames = [frame for frame in issue_frames if frame is not None]
+    if not frames:
+        return []
+    issues = pd.concat(frames, ignore_index=True)
+    issues = issues[issues['severity'] == ERROR].drop_duplicates('row').sort_values('row', kind='stable')
+    return [
+        message.format(row=row, column=column, reason=reason, value=value)
+        for row, column, reason, value in zip(issues['row'], issues['column'], issues['reason'], issues['value'])
+    ]
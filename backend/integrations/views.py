@@ -1,12 +1,37 @@
+import io
+import zipfile
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-from .serializers import FileUploadSerializer
-from .models import Marketplace
-from .services import ExcelProcessor
+from rest_framework.reverse import reverse
+from .serializers import FileUploadSerializer, FilePreviewSerializer
+from .models import Marketplace, ImportJob
+from .jobs import enqueue_import, stale_before
+from .readers import fingerprint_file
+from .services import ExcelProcessor, PREVIEW_ROWS
 from rest_framework import viewsets
-from .serializers import MarketplaceSerializer
+from rest_framework.decorators import action
+from .serializers import MarketplaceSerializer, ImportJobSerializer
+
+def pack_uploads(uploads):
+    """
+    Tek dosya olduğu gibi döner; birden fazla dosya tek bir ZIP'e paketlenir ve tek iş
+    olarak işlenir. İsme göre sıralanıp sabit tarihle yazıldığından aynı dosya seti
+    her seferinde aynı özeti (file_hash) verir.
+    """
+    if len(uploads) == 1:
+        return uploads[0]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for upload in sorted(uploads, key=lambda f: f.name):
+            archive.writestr(zipfile.ZipInfo(upload.name), upload.read(), compress_type=zipfile.ZIP_DEFLATED)
+    return ContentFile(buffer.getvalue(), name=f"toplu_yukleme_{len(uploads)}_dosya.zip")
+
 
 class ExcelUploadView(GenericAPIView):
     serializer_class = FileUploadSerializer
@@ -21,48 +46,109 @@ class ExcelUploadView(GenericAPIView):
         })
 
     def post(self, request, *args, **kwargs):
+        """
+        Dosyayı kaydedip arka plan işi olarak kuyruğa alır ve hemen 202 döner.
+        İlerleme /api/integrations/jobs/<id>/ adresinden izlenir.
+        """
         serializer = self.get_serializer(data=request.data)
         
         if serializer.is_valid():
-            file_obj = request.FILES['file']
+            file_obj = pack_uploads(serializer.validated_data['uploads'])
             marketplace_id = serializer.validated_data['marketplace_id']
             file_type = serializer.validated_data['file_type']
 
+            # Aynı içerik daha önce başarıyla işlendiyse ya da hâlâ işleniyorsa tekrar işlenmez.
+            # Kalp atışı kesilmiş (sahipsiz kalmış) bekleyen/çalışan işler yeni yüklemeyi engellemez.
+            # Kontrol ve kayıt tek transaction'da, pazaryeri satırı kilitliyken yapılır: aynı dosyanın
+            # eş zamanlı iki yüklemesi kontrolü birlikte geçip iki iş açamaz.
+            file_hash = fingerprint_file(file_obj)
             try:
-                marketplace = Marketplace.objects.get(id=marketplace_id)
-                
-                # Servisi Başlat
-                processor = ExcelProcessor(marketplace=marketplace, file_type=file_type)
-                
-                # Dosya türüne göre doğru işlemi seç
-                result = {}
-                if file_type == 'SALES':
-                    result = processor.process_sales_file(file_obj)
-                elif file_type == 'STOCK':
-                    result = processor.process_stock_file(file_obj)
-                else:
-                    return Response({"error": "Geçersiz dosya türü"}, status=status.HTTP_400_BAD_REQUEST)
-
-                if result['success']:
-                    return Response({
-                        "message": "İşlem Tamamlandı",
-                        "detaylar": result
-                    }, status=status.HTTP_201_CREATED)
-                else:
-                    return Response({
-                        "message": "İşlem Başarısız",
-                        "error": result.get('error', 'Bilinmeyen hata')
-                    }, status=status.HTTP_400_BAD_REQUEST)
-
+                with transaction.atomic():
+                    marketplace = Marketplace.objects.select_for_update().get(id=marketplace_id)
+                    previous = ImportJob.objects.filter(
+                        Q(status='SUCCESS') | Q(status__in=['PENDING', 'RUNNING'], heartbeat_at__gte=stale_before()),
+                        marketplace=marketplace, file_type=file_type, file_hash=file_hash,
+                    ).first()
+                    if previous is None:
+                        job = ImportJob.objects.create(
+                            marketplace=marketplace,
+                            file_type=file_type,
+                            file=file_obj,
+                            original_name=file_obj.name,
+                            file_hash=file_hash,
+                        )
             except Marketplace.DoesNotExist:
                  return Response({"error": "Pazaryeri bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if previous:
+                return Response({
+                    "message": "Bu dosya daha önce yüklendi, tekrar işlenmedi",
+                    "duplicate": True,
+                    "job_id": previous.id,
+                    "status_url": reverse('import-job-detail', args=[previous.id], request=request),
+                }, status=status.HTTP_200_OK)
+
+            try:
+                enqueue_import(job)
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            return Response({
+                "message": "İçe aktarma kuyruğa alındı",
+                "job_id": job.id,
+                "status_url": reverse('import-job-detail', args=[job.id], request=request),
+            }, status=status.HTTP_202_ACCEPTED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class ExcelPreviewView(GenericAPIView):
+    """
+    Dry-run: dosyanın yalnızca ilk satırlarını okuyup eşleştirmeyi kontrol eder.
+    Hiçbir şey kaydedilmez; birden fazla dosya gönderilirse ilki önizlenir.
+    """
+    serializer_class = FilePreviewSerializer
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            marketplace = Marketplace.objects.get(id=serializer.validated_data['marketplace_id'])
+        except Marketplace.DoesNotExist:
+            return Response({"error": "Pazaryeri bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
+
+        processor = ExcelProcessor(marketplace=marketplace, file_type=serializer.validated_data['file_type'])
+        result = processor.preview(
+            serializer.validated_data['uploads'][0],
+            rows=serializer.validated_data.get('rows', PREVIEW_ROWS),
+        )
+        return Response(result, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
+
+
 class MarketplaceViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Pazaryerlerini listeler (Sadece okuma yeterli).
     """
     queryset = Marketplace.objects.filter(is_active=True)
-    serializer_class = MarketplaceSerializer
\ No newline at end of file
+    serializer_class = MarketplaceSerializer
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    İçe aktarma işlerinin durumu: işlenen satır, satır/sn, hatalar ve sonuç.
+    """
+    queryset = ImportJob.objects.select_related('marketplace')
+    serializer_class = ImportJobSerializer
+
+    @action(detail=True, methods=['get'])
+    def errors(self, request, pk=None):
+        """Satır bazlı hata raporunu (CSV) indirir."""
+        job = self.get_object()
+        if not job.error_report:
+            raise Http404("Bu iş için hata raporu yok.")
+        return FileResponse(
+            job.error_report.open('rb'), as_attachment=True,
+            filename=f"{job.original_name.rsplit('.', 1)[0]}_hatalar.csv", content_type='text/csv',
+        )
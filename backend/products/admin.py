@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product
+from .models import CostLayer, Product, StockMovement, StockSnapshot
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -8,4 +8,26 @@ class ProductAdmin(admin.ModelAdmin):
     # Hangi alanlarda arama yapılabilsin?
     search_fields = ('sku', 'name')
     # Hangi alanlara göre filtreleme yapılsın?
-    list_filter = ('created_at',)
\ No newline at end of file
+    list_filter = ('created_at',)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('occurred_at', 'product', 'kind', 'quantity', 'value', 'transaction')
+    list_filter = ('kind',)
+    search_fields = ('product__sku',)
+    raw_id_fields = ('product', 'transaction')
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'quantity', 'value')
+    list_filter = ('date',)
+    search_fields = ('product__sku',)
+    raw_id_fields = ('product',)
+
+
+@admin.register(CostLayer)
+class CostLayerAdmin(admin.ModelAdmin):
+    list_display = ('received_at', 'product', 'quantity', 'remaining', 'unit_cost', 'transaction')
+    search_fields = ('product__sku',)
+    raw_id_fields = ('product', 'transaction')
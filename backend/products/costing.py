@@ -0,0 +1,125 @@
+from collections import defaultdict, deque
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from core.bulk import bulk_update_rows
+from .models import CostLayer, Product
+
+AVERAGE = 'AVERAGE'
+FIFO = 'FIFO'
+CENT = Decimal('0.01')
+UNIT = Decimal('0.0001')
+
+
+def fifo_enabled():
+    return settings.INVENTORY_COSTING == FIFO
+
+
+def unit_cost(product):
+    """Ortalama maliyet yönteminde satışın birim maliyeti: ağırlıklı maliyet, yoksa son alış fiyatı."""
+    return product.weighted_cost if product.weighted_cost > 0 else product.buying_price
+
+
+def sale_costs(lines):
+    """
+    Satış satırlarının maliyeti: [(ürün, adet)] → her satır için (birim maliyet, toplam maliyet).
+    FIFO'da katmanlar tüketilir; çağıran satışı aynı transaction içinde yazmalıdır. Birim maliyet
+    kuruşa yuvarlıdır; saklanan toplamlar toplam maliyetten hesaplanır (Transaction.line_cost).
+    """
+    if not fifo_enabled():
+        return [(unit_cost(product), unit_cost(product) * quantity) for product, quantity in lines]
+    totals = consume_layers(
+        [(product.pk, quantity) for product, quantity in lines],
+        {product.pk: unit_cost(product) for product, _ in lines},
+    )
+    return [
+        ((total / quantity).quantize(CENT) if quantity else unit_cost(product), total)
+        for (product, quantity), total in zip(lines, totals)
+    ]
+
+
+def consume_layers(demands, fallback):
+    """
+    Açık katmanları giriş sırasıyla tüketir: [(ürün id, adet)] → her talep için toplam maliyet.
+    Talepteki ürünlerin açık katmanları tek sorguda (kısmi indeksten) okunur, kalan miktarlar
+    tek executemany ile yazılır; sepet büyüklüğünden bağımsız iki sorgu çalışır.
+    Katmanlar yetmezse (stok eksiye düşüyorsa) kalan adet son katmanın, o da yoksa fallback
+    ({ürün id: birim maliyet}) maliyetinden hesaplanır. Negatif adetler (iade) tüketim yapmaz.
+    """
+    wanted = {product_id for product_id, quantity in demands if product_id and quantity > 0}
+    queues = defaultdict(deque)
+    if wanted:
+        layers = (
+            CostLayer.objects.select_for_update()
+            .filter(product_id__in=wanted, remaining__gt=0)
+            .order_by('product_id', 'received_at', 'id')
+            .only('id', 'product_id', 'remaining', 'unit_cost')
+        )
+        for layer in layers:
+            queues[layer.product_id].append(layer)
+
+    touched = {}
+    totals = []
+    for product_id, quantity in demands:
+        total = Decimal('0')
+        last_cost = None
+        queue = queues.get(product_id, ())
+        while quantity > 0 and queue:
+            layer = queue[0]
+            taken = min(quantity, layer.remaining)
+            total += taken * layer.unit_cost
+            last_cost = layer.unit_cost
+            layer.remaining -= taken
+            quantity -= taken
+            touched[layer.pk] = layer
+            if not layer.remaining:
+                queue.popleft()
+        if quantity:
+            total += quantity * (last_cost if last_cost is not None else Decimal(fallback.get(product_id) or 0))
+        totals.append(total.quantize(CENT))
+    if touched:
+        # bulk_update'in CASE ifadesi yerine parametreli tek satırlık UPDATE (executemany)
+        bulk_update_rows(CostLayer, ['remaining'], list(touched.values()))
+    return totals
+
+
+def apply_movements(movements):
+    """
+    FIFO'da deftere yazılacak hareketleri katmanlara işler (bkz. ledger.record_movements):
+    girişler (alış, açılış, içe aktarma, düzeltme) yeni katman açar; satış dışındaki çıkışlar katman
+    tüketir ve değerleri tüketilen maliyete eşitlenir. Satışlar katmanlarını sale_costs ile tüketir.
+    """
+    if not fifo_enabled():
+        return
+    outgoing = [m for m in movements if m.quantity < 0 and m.kind != 'SALE']
+    if outgoing:
+        totals = consume_layers(
+            [(m.product_id, -m.quantity) for m in outgoing],
+            {m.product_id: m.value / m.quantity for m in outgoing},
+        )
+        for movement, total in zip(outgoing, totals):
+            movement.value = -total
+    CostLayer.objects.bulk_create([
+        CostLayer(
+            product_id=m.product_id, quantity=m.quantity, remaining=m.quantity, received_at=m.occurred_at,
+            unit_cost=(m.value / m.quantity).quantize(UNIT), transaction_id=m.transaction_id,
+        )
+        for m in movements if m.quantity > 0
+    ])
+
+
+def reset_layers():
+    """
+    Tüm katmanları siler ve stoğu olan her ürün için mevcut stok/maliyetle tek açılış katmanı yazar.
+    Ortalama maliyetten FIFO'ya geçerken (katmanlar bu sürede işlenmediği için) çalıştırılır.
+    Dönüş: açılan katman sayısı.
+    """
+    with transaction.atomic():
+        CostLayer.objects.all().delete()
+        layers = CostLayer.objects.bulk_create([
+            CostLayer(product=product, quantity=product.stock_quantity, remaining=product.stock_quantity,
+                      unit_cost=unit_cost(product))
+            for product in Product.objects.filter(stock_quantity__gt=0)
+            .only('id', 'stock_quantity', 'weighted_cost', 'buying_price').iterator()
+        ], batch_size=2000)
+    return len(layers)
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+from .costing import apply_movements
+from .models import Product, StockMovement, StockSnapshot
+
+CENT = Decimal('0.01')
+
+
+def day_end(day):
+    """Günün (geçerli saat dilimindeki) bitişinden hemen sonraki an: occurred_at < day_end(gün)."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def local_day(moment):
+    return timezone.localtime(moment).date() if timezone.is_aware(moment) else moment.date()
+
+
+def record_movements(movements):
+    """
+    Hareketleri tek bulk_create ile deftere yazar. Geçmiş tarihli hareketler (alınmış bir
+    görüntünün gününe ya da öncesine düşenler) o günden sonraki görüntülere de eklenir;
+    böylece görüntü + sonraki hareketler toplamı her zaman doğru kalır. FIFO'da hareketler
+    önce maliyet katmanlarına işlenir (bkz. costing.apply_movements).
+    """
+    if not movements:
+        return
+    for movement in movements:
+        movement.value = Decimal(movement.value).quantize(CENT)
+        if movement.occurred_at is None:
+            movement.occurred_at = timezone.now()
+    with transaction.atomic():
+        apply_movements(movements)
+        StockMovement.objects.bulk_create(movements)
+        latest = StockSnapshot.objects.aggregate(latest=Max('date'))['latest']
+        if latest is None:
+            return
+        backdated = defaultdict(lambda: [0, Decimal('0')])
+        for movement in movements:
+            day = local_day(movement.occurred_at)
+            if day <= latest:
+                totals = backdated[(movement.product_id, day)]
+                totals[0] += movement.quantity
+                totals[1] += movement.value
+        if not backdated:
+            return
+        dates = list(StockSnapshot.objects.filter(date__gte=min(day for _, day in backdated))
+                     .values_list('date', flat=True).distinct())
+        # Görüntüsü olmayan ürünler için boş satırlar açılır, sonra farklar eklenir
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(date=snapshot_date, product_id=product_id)
+            for product_id, day in backdated for snapshot_date in dates if snapshot_date >= day
+        ], ignore_conflicts=True)
+        for (product_id, day), (quantity, value) in backdated.items():
+            StockSnapshot.objects.filter(product_id=product_id, date__gte=day).update(
+                quantity=F('quantity') + quantity, value=F('value') + value,
+            )
+
+
+def take_snapshot(day):
+    """
+    day gün sonu itibarıyla tüm ürünlerin stok/değer görüntüsünü yazar (varsa yeniler).
+    Önceki görüntü + aradaki hareketler toplanır; ilk görüntüde tüm defter okunur.
+    Bugün ve sonrası için görüntü alınmaz (gün bitmeden yazılan hareketler kaçardı).
+    Dönüş: yazılan satır sayısı.
+    """
+    if day >= timezone.localdate():
+        raise ValueError("Görüntü yalnızca bitmiş günler için alınabilir.")
+    with transaction.atomic():
+        totals = stock_at(day)
+        StockSnapshot.objects.filter(date=day).delete()
+        StockSnapshot.objects.bulk_create([
+            StockSnapshot(date=day, product_id=product_id, quantity=quantity, value=value)
+            for product_id, (quantity, value) in totals.items()
+        ], batch_size=2000)
+    return len(totals)
+
+
+def stock_at(day, product_ids=None):
+    """
+    day gün sonu itibarıyla ürün bazında (stok, envanter değeri): {ürün id: (adet, değer)}.
+    En yakın önceki görüntü + sonrasındaki hareketler; toplam üç sorgu.
+    """
+    snapshots = StockSnapshot.objects.all()
+    movements = StockMovement.objects.filter(occurred_at__lt=day_end(day))
+    if product_ids is not None:
+        snapshots = snapshots.filter(product_id__in=product_ids)
+        movements = movements.filter(product_id__in=product_ids)
+
+    base = snapshots.filter(date__lte=day).aggregate(latest=Max('date'))['latest']
+    totals = {}
+    if base is not None:
+        for product_id, quantity, value in snapshots.filter(date=base).values_list('product_id', 'quantity', 'value'):
+            totals[product_id] = (quantity, value)
+        movements = movements.filter(occurred_at__gte=day_end(base))
+    rows = movements.values('product_id').annotate(quantity=Sum('quantity'), value=Sum('value')).order_by()
+    for row in rows:
+        quantity, value = totals.get(row['product_id'], (0, Decimal('0')))
+        totals[row['product_id']] = (quantity + row['quantity'], (value + row['value']).quantize(CENT))
+    return totals
+
+
+def valuation(day, detail=False):
+    """Tüm kataloğun day gün sonundaki stok adedi ve envanter değeri."""
+    totals = stock_at(day)
+    data = {
+        "date": day,
+        "total_quantity": sum(quantity for quantity, _ in totals.values()),
+        "total_value": sum((value for _, value in totals.values()), Decimal('0')).quantize(CENT),
+        "product_count": sum(1 for quantity, _ in totals.values() if quantity),
+    }
+    if detail:
+        skus = dict(Product.objects.filter(pk__in=totals).values_list('id', 'sku'))
+        data["items"] = sorted(
+            ({"product_id": pk, "sku": skus.get(pk), "quantity": quantity, "value": value}
+             for pk, (quantity, value) in totals.items() if quantity or value),
+            key=lambda item: item["value"], reverse=True,
+        )
+    return data
@@ -0,0 +1,95 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from finance.models import Transaction
+from integrations.models import Marketplace
+from products.costing import AVERAGE, FIFO, sale_costs
+from products.models import Product
+from products.stock import adjust_stock, receive_stock, sale_movement
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Yüksek hacimli satış akışında maliyet yöntemlerinin (ortalama / FIFO) hızını ölçer: "
+        "sepetler halinde satış yazılır, katmanlar tüketilir. Veritabanına kalıcı yazmaz."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sales', type=int, default=20000, help="Satış satırı sayısı")
+        parser.add_argument('--skus', type=int, default=500)
+        parser.add_argument('--lots', type=int, default=20, help="Ürün başına açık alış katmanı")
+        parser.add_argument('--basket', type=int, default=5, help="Sepet başına satır")
+
+    def prepare(self, skus, lots):
+        """Her ürüne farklı fiyatlı 'lots' adet alış yapılır (FIFO'da her biri bir katman açar)."""
+        rng = np.random.default_rng(42)
+        marketplace = Marketplace.objects.create(name='__benchmark__')
+        Product.objects.bulk_create([
+            Product(sku=f"BENCH-{i}", name=f"Bench {i}", buying_price=100, weighted_cost=100)
+            for i in range(skus)
+        ])
+        products = list(Product.objects.filter(sku__startswith='BENCH-'))
+        for product in products:
+            for price in rng.uniform(50, 150, lots).round(2):
+                receive_stock(product.pk, 100, price)
+        return marketplace, products
+
+    def run(self, method, sales, skus, lots, basket):
+        rng = np.random.default_rng(7)
+        result = {}
+        executed = []
+
+        def count_queries(execute, sql, params, many, context):
+            executed.append(1)
+            return execute(sql, params, many, context)
+
+        try:
+            with override_settings(INVENTORY_COSTING=method), transaction.atomic():
+                marketplace, products = self.prepare(skus, lots)
+                picks = rng.integers(0, len(products), sales)
+                quantities = rng.integers(1, 4, sales)
+                now = timezone.now()
+                started = time.perf_counter()
+                with connection.execute_wrapper(count_queries):
+                    for start in range(0, sales, basket):
+                        lines = [(products[i], int(q)) for i, q in zip(picks[start:start + basket], quantities[start:start + basket])]
+                        costs = sale_costs(lines)
+                        objs = [
+                            Transaction(
+                                marketplace=marketplace, product=product, transaction_type='SALE',
+                                order_number=f"B{start}", quantity=quantity, sale_price=200,
+                                cost_at_transaction=cost, transaction_date=now,
+                            )
+                            for (product, quantity), (cost, _) in zip(lines, costs)
+                        ]
+                        for tx, (_, line_cost) in zip(objs, costs):
+                            tx.line_cost = line_cost
+                            tx.calculate_totals()
+                        Transaction.objects.bulk_create(objs)
+                        adjust_stock([sale_movement(tx, line_cost) for tx, (_, line_cost) in zip(objs, costs)])
+                elapsed = time.perf_counter() - started
+                result = {
+                    "elapsed": round(elapsed, 2),
+                    "rate": round(sales / elapsed) if elapsed else None,
+                    "queries": round(len(executed) / -(-sales // basket), 1),
+                }
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return result
+
+    def handle(self, *args, **options):
+        sales, skus, lots, basket = options['sales'], options['skus'], options['lots'], options['basket']
+        for method in (AVERAGE, FIFO):
+            result = self.run(method, sales, skus, lots, basket)
+            self.stdout.write(
+                f"{method:<8} {sales} satış ({skus} SKU, ürün başına {lots} katman, sepet {basket}): "
+                f"{result['elapsed']} sn, {result['rate']} satış/sn, sepet başına {result['queries']} sorgu"
+            )
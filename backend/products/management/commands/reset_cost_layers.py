@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from products.costing import reset_layers
+
+
+class Command(BaseCommand):
+    help = (
+        "FIFO maliyet katmanlarını mevcut stok ve ortalama maliyetten yeniden açar. "
+        "Ortalama maliyetten FIFO'ya geçerken bir kez çalıştırılır."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = reset_layers()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {count} ürün için açılış katmanı {time.perf_counter() - started:.2f} sn içinde yazıldı."
+        ))
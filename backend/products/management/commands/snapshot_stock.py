@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from products.ledger import take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Gün sonu stok/envanter değeri görüntüsünü yazar (varsayılan: dün). "
+        "Örn. her gece ya da her ay sonu zamanlanmış görev olarak çalıştırılır."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="YYYY-AA-GG (bugünden önce olmalı)")
+
+    def handle(self, *args, **options):
+        day = parse_date(options['date']) if options['date'] else timezone.localdate() - timedelta(days=1)
+        if day is None:
+            raise CommandError("Tarih YYYY-AA-GG biçiminde olmalı.")
+        started = time.perf_counter()
+        try:
+            count = take_snapshot(day)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {day} için {count} ürünün görüntüsü {time.perf_counter() - started:.2f} sn içinde yazıldı."
+        ))
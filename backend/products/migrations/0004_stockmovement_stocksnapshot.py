@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-18 14:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def opening_balances(apps, schema_editor):
+    # Defter bugünden başlar: mevcut stoklar açılış hareketi olarak yazılır (değer = stok * ortalama maliyet)
+    from decimal import Decimal
+    from django.utils import timezone
+
+    Product = apps.get_model('products', 'Product')
+    StockMovement = apps.get_model('products', 'StockMovement')
+    now = timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=pk, kind='OPENING', quantity=stock, occurred_at=now,
+            value=(Decimal(stock) * weighted_cost).quantize(Decimal('0.01')),
+        )
+        for pk, stock, weighted_cost in Product.objects.exclude(stock_quantity=0)
+        .values_list('id', 'stock_quantity', 'weighted_cost').iterator()
+    ], batch_size=2000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_transaction_date_indexes'),
+        ('products', '0003_product_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('OPENING', 'Açılış'), ('SALE', 'Satış'), ('PURCHASE', 'Alış'), ('IMPORT', 'Stok İçe Aktarma'), ('ADJUSTMENT', 'Düzeltme')], max_length=10)),
+                ('quantity', models.IntegerField(verbose_name='Miktar Farkı')),
+                ('value', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Değer Farkı')),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Hareket Zamanı')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='products.product')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='finance.transaction')),
+            ],
+            options={
+                'verbose_name': 'Stok Hareketi',
+                'verbose_name_plural': 'Stok Hareketleri',
+                'indexes': [models.Index(fields=['occurred_at', 'product'], name='stockmovement_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Stok Görüntüsü',
+                'verbose_name_plural': 'Stok Görüntüleri',
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='stocksnapshot_unique_key')],
+            },
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-18 15:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def opening_layers(apps, schema_editor):
+    # Mevcut stoklar ortalama maliyetle tek açılış katmanı olarak yazılır; FIFO bu noktadan başlar
+    from django.utils import timezone
+
+    Product = apps.get_model('products', 'Product')
+    CostLayer = apps.get_model('products', 'CostLayer')
+    now = timezone.now()
+    CostLayer.objects.bulk_create([
+        CostLayer(
+            product_id=pk, quantity=stock, remaining=stock, received_at=now,
+            unit_cost=weighted_cost if weighted_cost > 0 else buying_price,
+        )
+        for pk, stock, weighted_cost, buying_price in Product.objects.filter(stock_quantity__gt=0)
+        .values_list('id', 'stock_quantity', 'weighted_cost', 'buying_price').iterator()
+    ], batch_size=2000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_transaction_date_indexes'),
+        ('products', '0004_stockmovement_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Giriş Zamanı')),
+                ('quantity', models.IntegerField(verbose_name='Giriş Miktarı')),
+                ('remaining', models.IntegerField(verbose_name='Kalan Miktar')),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Birim Maliyet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='products.product')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layers', to='finance.transaction')),
+            ],
+            options={
+                'verbose_name': 'Maliyet Katmanı',
+                'verbose_name_plural': 'Maliyet Katmanları',
+                'indexes': [models.Index(condition=models.Q(('remaining__gt', 0)), fields=['product', 'received_at', 'id'], name='costlayer_open_idx')],
+            },
+        ),
+        migrations.RunPython(opening_layers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from decimal import Decimal
 
 class TimeStampedModel(models.Model):
@@ -8,6 +9,10 @@ class TimeStampedModel(models.Model):
     class Meta:
         abstract = True
 
+# Product.save'in eski değerlerle karşılaştırdığı alanlar
+STOCK_FIELDS = ('buying_price', 'weighted_cost', 'stock_quantity')
+
+
 class Product(TimeStampedModel):
     sku = models.CharField(max_length=100, unique=True, help_text="Stok Kodu")
     name = models.CharField(max_length=255, help_text="Ürün Adı")
@@ -21,41 +26,191 @@ class Product(TimeStampedModel):
     def __str__(self):
         return f"{self.sku} - {self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kaydederken eski değerlerle karşılaştırmak için okunan değerler saklanır (ek SELECT gerekmez)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using, fields, **kwargs)
+        loaded = getattr(self, '_loaded_values', {})
+        for name in STOCK_FIELDS:
+            if fields is None or name in fields:
+                loaded[name] = getattr(self, name)
+        self._loaded_values = loaded
+
+    def _previous_values(self):
+        loaded = getattr(self, '_loaded_values', {})
+        if all(name in loaded for name in STOCK_FIELDS):
+            return loaded
+        # Veritabanından okunmamış (elle pk verilmiş) örnekler için eski yol
+        return Product.objects.filter(pk=self.pk).values(*STOCK_FIELDS).first()
+
     def save(self, *args, **kwargs):
-        # Ürün zaten varsa (güncelleme yapılıyorsa)
-        if self.pk:
+        from .ledger import record_movements  # ledger bu modülü içe aktarır
+
+        old_instance = self._previous_values() if self.pk else None
+
+        if not old_instance:
+            # Ürün ilk kez oluşturulurken fiyat girilmişse maliyeti eşitle
+            if self.buying_price > 0:
+                self.weighted_cost = self.buying_price
+            super().save(*args, **kwargs)
+            if self.stock_quantity:
+                record_movements([StockMovement(
+                    product=self, kind='OPENING', quantity=self.stock_quantity,
+                    value=Decimal(self.stock_quantity) * Decimal(self.weighted_cost),
+                )])
+        elif any(getattr(self, name) != old_instance[name] for name in STOCK_FIELDS):
+            # Stok/maliyet satırın kilitli güncel halinden hesaplanıp yazılır: okuma ile kayıt
+            # arasında başka bir süreçte yapılan satış ya da mal kabulü ezilmez
+            with transaction.atomic():
+                current = Product.objects.select_for_update().filter(pk=self.pk).values(*STOCK_FIELDS).get()
+                change = self.stock_quantity - old_instance['stock_quantity']
+                self._apply_stock_change(old_instance, current, change)
+                super().save(*args, **kwargs)
+                if change:
+                    # Değer farkı: yeni stok * yeni maliyet - eski stok * eski maliyet (alışta gelen * fiyat)
+                    record_movements([StockMovement(
+                        product=self, kind='ADJUSTMENT', quantity=change,
+                        value=Decimal(self.stock_quantity) * Decimal(self.weighted_cost)
+                        - Decimal(current['stock_quantity']) * Decimal(current['weighted_cost']),
+                    )])
+        else:
+            # Stok/maliyet alanlarına dokunulmadı: veritabanındaki değerleri olduğu gibi kalır
+            values = {name: getattr(self, name) for name in STOCK_FIELDS}
+            for name in STOCK_FIELDS:
+                setattr(self, name, models.F(name))
             try:
-                old_instance = Product.objects.get(pk=self.pk)
-                
-                # Alış fiyatı 0'dan ilk kez bir değere çıkıyorsa maliyeti direkt eşitle
-                if old_instance.buying_price == 0 and self.buying_price > 0:
-                    self.weighted_cost = self.buying_price
-                
-                # Stok artışı varsa ve yeni alış fiyatı 0 değilse Ağırlıklı Ortalama Hesapla
-                elif self.stock_quantity > old_instance.stock_quantity and self.buying_price > 0:
-                    added_stock = Decimal(self.stock_quantity - old_instance.stock_quantity)
-                    current_stock = Decimal(old_instance.stock_quantity)
-                    
-                    # Mevcut maliyet 0 ise son alış fiyatını, o da 0 ise yeni fiyatı baz al
-                    current_cost = old_instance.weighted_cost if old_instance.weighted_cost > 0 else self.buying_price
-                    
-                    # Formül: ((Eski Stok * Eski Maliyet) + (Yeni Gelen * Yeni Fiyat)) / Toplam Stok
-                    total_value = (current_stock * current_cost) + (added_stock * self.buying_price)
-                    self.weighted_cost = total_value / Decimal(self.stock_quantity)
-                
-                # Sadece fiyat değiştiyse (stok sabit) ve maliyet alanı boşsa (0 ise) doldur
-                elif self.buying_price > 0 and self.weighted_cost == 0:
-                    self.weighted_cost = self.buying_price
-
-            except Product.DoesNotExist:
-                pass
-        
-        # Ürün ilk kez oluşturulurken fiyat girilmişse maliyeti eşitle
-        elif self.buying_price > 0:
-            self.weighted_cost = self.buying_price
-
-        super().save(*args, **kwargs)
+                super().save(*args, **kwargs)
+            finally:
+                for name, value in values.items():
+                    setattr(self, name, value)
+        self._loaded_values = {name: getattr(self, name) for name in STOCK_FIELDS}
+
+    def _apply_stock_change(self, old_instance, current, change):
+        """
+        Kullanıcının okuduğu değerlere göre yaptığı değişikliği (stok farkı, yeni alış fiyatı ya da
+        elle girilen maliyet) satırın güncel değerlerine uygular. Değişmeyen alanlar güncel
+        değerini korur.
+        """
+        price = self.buying_price if self.buying_price != old_instance['buying_price'] else current['buying_price']
+        cost = self.weighted_cost if self.weighted_cost != old_instance['weighted_cost'] else current['weighted_cost']
+        stock = current['stock_quantity'] + change
+
+        # Alış fiyatı 0'dan ilk kez bir değere çıkıyorsa maliyeti direkt eşitle
+        if current['buying_price'] == 0 and price > 0:
+            cost = price
+
+        # Stok artışı varsa ve alış fiyatı 0 değilse Ağırlıklı Ortalama Hesapla
+        elif change > 0 and price > 0:
+            # Mevcut maliyet 0 ise son alış fiyatını baz al
+            current_cost = current['weighted_cost'] if current['weighted_cost'] > 0 else price
+
+            # Formül: ((Eski Stok * Eski Maliyet) + (Yeni Gelen * Yeni Fiyat)) / Toplam Stok
+            total_value = (Decimal(current['stock_quantity']) * current_cost) + (Decimal(change) * price)
+            cost = total_value / Decimal(stock)
+
+        # Sadece fiyat değiştiyse (stok sabit) ve maliyet alanı boşsa (0 ise) doldur
+        elif price > 0 and cost == 0:
+            cost = price
+
+        self.buying_price, self.weighted_cost, self.stock_quantity = price, cost, stock
 
     class Meta:
         verbose_name = "Ürün"
-        verbose_name_plural = "Ürünler"
\ No newline at end of file
+        verbose_name_plural = "Ürünler"
+        indexes = [
+            # Sepette barkod okutularak ürün arama
+            models.Index(fields=['barcode'], name='product_barcode_idx'),
+            # Ürün listesi son güncellenene göre sıralanır
+            models.Index(fields=['updated_at'], name='product_updated_at_idx'),
+        ]
+
+class StockMovement(models.Model):
+    """
+    Stok hareket defteri (yalnızca ekleme yapılır). Stoğu değiştiren her yol bir satır yazar:
+    miktar farkı ve envanter değerine etkisi (satışta adet * satış anındaki maliyet, alışta
+    adet * alış fiyatı). Bir tarihteki stok ve envanter değeri = o tarihe kadarki hareketlerin toplamı.
+    """
+    KINDS = (
+        ('OPENING', 'Açılış'),
+        ('SALE', 'Satış'),
+        ('PURCHASE', 'Alış'),
+        ('IMPORT', 'Stok İçe Aktarma'),
+        ('ADJUSTMENT', 'Düzeltme'),
+    )
+
+    # Defter geçmişi envanter değerlemesinin kaynağıdır; hareketi olan ürün silinemez
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='stock_movements')
+    kind = models.CharField(max_length=10, choices=KINDS)
+    quantity = models.IntegerField(verbose_name="Miktar Farkı")
+    value = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Değer Farkı")
+    occurred_at = models.DateTimeField(default=timezone.now, verbose_name="Hareket Zamanı")
+    transaction = models.ForeignKey(
+        'finance.Transaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements',
+    )
+
+    class Meta:
+        indexes = [
+            # Ürün bazında zaman aralığı toplamları (anlık görüntüden sonraki hareketler)
+            models.Index(fields=['occurred_at', 'product'], name='stockmovement_time_idx'),
+        ]
+        verbose_name = "Stok Hareketi"
+        verbose_name_plural = "Stok Hareketleri"
+
+    def __str__(self):
+        return f"{self.product_id} {self.kind} {self.quantity:+d}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Gün sonu itibarıyla ürün bazında stok ve envanter değeri (bkz. products/ledger.py).
+    Geçmiş tarihli bir hareket yazıldığında o tarihten sonraki görüntüler de güncellenir.
+    """
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='stock_snapshots')
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='stocksnapshot_unique_key'),
+        ]
+        verbose_name = "Stok Görüntüsü"
+        verbose_name_plural = "Stok Görüntüleri"
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}: {self.quantity}"
+
+
+class CostLayer(models.Model):
+    """
+    FIFO maliyet katmanı: bir stok girişi (alış, açılış, içe aktarma, düzeltme) ve henüz satılmamış
+    kalan miktarı. Satışlar açık katmanları alış sırasıyla tüketir (bkz. products/costing.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cost_layers')
+    received_at = models.DateTimeField(default=timezone.now, verbose_name="Giriş Zamanı")
+    quantity = models.IntegerField(verbose_name="Giriş Miktarı")
+    remaining = models.IntegerField(verbose_name="Kalan Miktar")
+    unit_cost = models.DecimalField(max_digits=14, decimal_places=4, verbose_name="Birim Maliyet")
+    transaction = models.ForeignKey(
+        'finance.Transaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='cost_layers',
+    )
+
+    class Meta:
+        indexes = [
+            # Satışta yalnızca bir ürünün açık katmanları, tüketim sırasıyla okunur; biten katmanlar
+            # indekste yer tutmaz
+            models.Index(
+                fields=['product', 'received_at', 'id'], name='costlayer_open_idx',
+                condition=models.Q(remaining__gt=0),
+            ),
+        ]
+        verbose_name = "Maliyet Katmanı"
+        verbose_name_plural = "Maliyet Katmanları"
+
+    def __str__(self):
+        return f"{self.product_id} {self.remaining}/{self.quantity} @ {self.unit_cost}"
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+from .ledger import record_movements
+from .models import Product, StockMovement
+
+COST_FIELD = DecimalField(max_digits=10, decimal_places=2)
+# Stok * maliyet toplamları birim maliyetten geniş tutulur (PostgreSQL numeric taşmasın)
+VALUE_FIELD = DecimalField(max_digits=20, decimal_places=4)
+
+
+class DecimalCast(Cast):
+    """
+    Ondalıklı tipe çevirme. SQLite'ın decimal tipi NUMERIC yakınlığındadır ve tam sayı değerleri
+    tam sayı bırakır (bölme yine tam sayı bölmesi olur); orada REAL'e çevrilir.
+    """
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='%(function)s(%(expressions)s AS REAL)', **extra_context)
+
+
+def adjust_stock(movements):
+    """
+    Stok hareketlerini (kaydedilmemiş StockMovement listesi) uygular: stoklar tek UPDATE ile
+    veritabanında 'stock_quantity = stock_quantity + fark' olarak değişir, hareketler deftere
+    yazılır. Önce okuma yapılmadığı için eş zamanlı satışlarda güncelleme kaybolmaz.
+    Dönüş: güncellenen ürün sayısı.
+    """
+    changes = {}
+    for movement in movements:
+        changes[movement.product_id] = changes.get(movement.product_id, 0) + movement.quantity
+    changes = {pk: delta for pk, delta in changes.items() if delta}
+    with transaction.atomic():
+        record_movements(movements)
+        if not changes:
+            return 0
+        if len(changes) == 1:
+            (pk, delta), = changes.items()
+            amount = Value(delta)
+        else:
+            amount = Case(*[When(pk=pk, then=Value(delta)) for pk, delta in changes.items()], output_field=IntegerField())
+        return Product.objects.filter(pk__in=changes).update(
+            stock_quantity=F('stock_quantity') + amount, updated_at=timezone.now(),
+        )
+
+
+def sale_movement(tx, cost=None):
+    """
+    Satış işleminin stok hareketi: adet kadar çıkış, değer = satılan malın maliyeti
+    (cost verilmezse adet * satış anındaki birim maliyet; FIFO'da tüketilen katmanların toplamı).
+    """
+    quantity = int(tx.quantity or 0)
+    if cost is None:
+        cost = quantity * Decimal(str(tx.cost_at_transaction))
+    return StockMovement(
+        product_id=tx.product_id, kind='SALE', quantity=-quantity,
+        value=-cost, occurred_at=tx.transaction_date, transaction=tx,
+    )
+
+
+def receive_stock(product_id, quantity, unit_cost, tx=None):
+    """
+    Mal kabulü: stok artar, son alış fiyatı ve ağırlıklı maliyet Product.save kurallarıyla
+    tek UPDATE içinde, satırın o anki değerlerinden hesaplanır:
+    - alış fiyatı ilk kez giriliyorsa maliyet = yeni fiyat
+    - aksi halde ((stok * maliyet) + (gelen * fiyat)) / yeni stok (maliyet 0 ise fiyat kullanılır)
+    - stok artmıyorsa ve maliyet 0 ise maliyet = yeni fiyat
+    Deftere adet * alış fiyatı değerinde bir PURCHASE hareketi yazılır.
+    """
+    unit_cost = Decimal(str(unit_cost))
+    updates = {
+        'stock_quantity': F('stock_quantity') + quantity,
+        'updated_at': timezone.now(),
+    }
+    if unit_cost > 0:
+        current_cost = Case(When(weighted_cost__gt=0, then=F('weighted_cost')), default=Value(unit_cost), output_field=COST_FIELD)
+        # Pay ondalıklı tipe çevrilir; tam sayı olarak saklanan tutarlarda tam sayı bölmesi yapılmasın
+        averaged = Round(ExpressionWrapper(
+            DecimalCast(F('stock_quantity') * current_cost + Value(quantity * unit_cost), VALUE_FIELD)
+            / (F('stock_quantity') + quantity),
+            output_field=COST_FIELD,
+        ), 2, output_field=COST_FIELD)
+        whens = [When(buying_price=0, then=Value(unit_cost))]
+        if quantity > 0:
+            # Yeni stok 0 olacaksa ortalama alınamaz; maliyet olduğu gibi kalır
+            whens.append(When(~Q(stock_quantity=-quantity), then=averaged))
+        whens.append(When(weighted_cost=0, then=Value(unit_cost)))
+        updates['weighted_cost'] = Case(*whens, default=F('weighted_cost'), output_field=COST_FIELD)
+        updates['buying_price'] = Value(unit_cost)
+    with transaction.atomic():
+        record_movements([StockMovement(
+            product_id=product_id, kind='PURCHASE', quantity=quantity, value=quantity * unit_cost,
+            occurred_at=tx.transaction_date if tx else None, transaction=tx,
+        )])
+        return Product.objects.filter(pk=product_id).update(**updates)
@@ -1,3 +1,365 @@
-from django.test import TestCase
+import io
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+from django.db import connection
+from django.db.models import Sum
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from integrations.models import Marketplace
+from .ledger import stock_at, take_snapshot
+from .models import CostLayer, Product, StockMovement, StockSnapshot
 
-# Create your tests here.
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(7):
+            Product.objects.create(sku=f'P{i}', name=f'Ürün {i}', buying_price=Decimal('10'))
+
+    def test_pages_follow_updated_at(self):
+        Product.objects.get(sku='P2').save()  # en son güncellenen ilk sırada gelir
+        seen, cursor = [], None
+        while True:
+            data = self.client.get('/api/products/', {'page_size': 3, **({'cursor': cursor} if cursor else {})}).data
+            seen += [row['sku'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ['P2', 'P6', 'P5', 'P4', 'P3', 'P1', 'P0'])
+
+    def test_search_filters_on_the_server(self):
+        Product.objects.filter(sku='P4').update(name='Kırmızı Kupa', barcode='8690004')
+        Product.objects.filter(sku='P5').update(description='kırmızı renk')
+
+        def search(term):
+            return sorted(row['sku'] for row in self.client.get('/api/products/', {'search': term}).data['results'])
+
+        self.assertEqual(search('P1'), ['P1'])
+        self.assertEqual(search('869'), ['P4'])
+        self.assertEqual(search('Kupa'), ['P4'])
+        self.assertEqual(search('renk'), ['P5'])
+        self.assertEqual(len(search('  ')), 7)
+
+    def test_export(self):
+        import io
+        from openpyxl import load_workbook
+
+        Product.objects.filter(sku='P3').update(description='kontrol\x01karakteri', barcode='869<&>')
+        response = self.client.get('/api/products/export/', {'file_format': 'xlsx'})
+        self.assertTrue(response.streaming)
+        chunks = iter(response.streaming_content)
+        first = next(chunks)  # başlık satırı sorgu bitmeden gönderilir
+        self.assertTrue(first)
+        sheet = load_workbook(io.BytesIO(first + b''.join(chunks)), read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][:3], ('SKU', 'Barkod', 'Ürün Adı'))
+        self.assertEqual([row[0] for row in rows[1:]], [f'P{i}' for i in range(7)])
+        self.assertEqual(rows[4][1], '869<&>')
+
+        response = self.client.get('/api/products/export/')
+        self.assertTrue(b''.join(response.streaming_content).decode('utf-8-sig').startswith('SKU,Barkod'))
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    SALES = 20
+
+    def setUp(self):
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'), stock_quantity=100)
+
+    def test_concurrent_sales_decrement_exactly(self):
+        barrier = threading.Barrier(self.SALES)
+        failures = []
+
+        def sell(i):
+            try:
+                barrier.wait()
+                response = APIClient().post('/api/finance/transactions/', {
+                    'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+                    'order_number': f'S{i}', 'quantity': 1, 'sale_price': '50.00',
+                    'transaction_date': timezone.now().isoformat(),
+                }, format='json')
+                if response.status_code != 201:
+                    failures.append(response.data)
+            except Exception as e:
+                failures.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sell, args=(i,)) for i in range(self.SALES)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 100 - self.SALES)
+
+    def test_saving_a_stale_copy_keeps_other_changes(self):
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        first.stock_quantity -= 3
+        first.save()
+        second.stock_quantity -= 2
+        second.name = 'Yeni Ad'
+        second.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, self.product.name), (95, 'Yeni Ad'))
+
+        # Stok/maliyet değişmeyen kayıtta eski değerler için ek SELECT çalışmaz
+        with self.assertNumQueries(1):
+            first.save()
+
+    def test_saving_a_stale_copy_keeps_concurrent_cost_changes(self):
+        from .stock import receive_stock
+
+        Product.objects.filter(pk=self.product.pk).update(weighted_cost=Decimal('10'))
+        renamed = Product.objects.get(pk=self.product.pk)
+        restocked = Product.objects.get(pk=self.product.pk)
+        receive_stock(self.product.pk, 100, Decimal('20'))  # 200 adet, maliyet 15, son alış 20
+
+        renamed.name = 'Yeni Ad'
+        renamed.save()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.stock_quantity, self.product.weighted_cost, self.product.buying_price),
+            (200, Decimal('15.00'), Decimal('20.00')),
+        )
+
+        # Eski kopyadan 10 adet giriş: ortalama güncel stok/maliyet ve (fiyat değiştirilmediği için)
+        # güncel son alış fiyatı üzerinden alınır: (200 * 15 + 10 * 20) / 210
+        restocked.stock_quantity += 10
+        restocked.save()
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.stock_quantity, self.product.weighted_cost, self.product.buying_price),
+            (210, Decimal('15.24'), Decimal('20.00')),
+        )
+
+    def test_purchase_updates_cost_in_the_database(self):
+        from finance.models import Transaction
+
+        Product.objects.filter(pk=self.product.pk).update(weighted_cost=Decimal('10'))
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='PURCHASE', order_number='A1',
+            quantity=100, sale_price=0, cost_at_transaction=Decimal('20'), transaction_date=timezone.now(),
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(
+            (self.product.stock_quantity, self.product.weighted_cost, self.product.buying_price),
+            (200, Decimal('15.00'), Decimal('20.00')),
+        )
+
+    def test_purchase_average_keeps_the_fraction(self):
+        from .stock import receive_stock
+
+        Product.objects.filter(pk=self.product.pk).update(weighted_cost=Decimal('10'))
+        receive_stock(self.product.pk, 50, Decimal('11'))
+        self.product.refresh_from_db()
+        # (100 * 10 + 50 * 11) / 150; tam sayı bölmesi 10 verirdi
+        self.assertEqual(self.product.weighted_cost, Decimal('10.33'))
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'), stock_quantity=100)
+        self.today = timezone.localdate()
+
+    def at(self, day, hour=12):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def sell(self, quantity, day):
+        return self.client.post('/api/finance/transactions/', {
+            'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+            'order_number': f'S{quantity}{day}', 'quantity': quantity, 'sale_price': '50.00',
+            'transaction_date': self.at(day).isoformat(),
+        }, format='json')
+
+    def test_every_stock_path_writes_the_ledger(self):
+        from finance.models import Transaction
+        from integrations.services import ExcelProcessor
+        from integrations.tests import make_csv
+
+        self.sell(5, self.today)
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='PURCHASE', order_number='A1',
+            quantity=10, sale_price=0, cost_at_transaction=Decimal('12'), transaction_date=timezone.now(),
+        )
+        ExcelProcessor(marketplace=self.marketplace, file_type='STOCK').process_stock_file(make_csv([
+            {'sku': 'A1', 'stock_quantity': 7, 'buying_price': 12},
+            {'sku': 'B1', 'stock_quantity': 3, 'buying_price': 4},
+        ]))
+        product = Product.objects.get(pk=self.product.pk)
+        product.stock_quantity -= 2
+        product.save()
+
+        kinds = list(StockMovement.objects.filter(product=self.product).order_by('id').values_list('kind', 'quantity'))
+        self.assertEqual(kinds, [('OPENING', 100), ('SALE', -5), ('PURCHASE', 10), ('IMPORT', 7), ('ADJUSTMENT', -2)])
+        for product in Product.objects.all():
+            quantity, value = stock_at(self.today, [product.pk])[product.pk]
+            self.assertEqual(quantity, product.stock_quantity)
+            # Ortalama maliyetle değerlenen envanter: kuruş yuvarlaması kadar fark olabilir
+            self.assertAlmostEqual(value, product.stock_quantity * product.weighted_cost, delta=Decimal('1'))
+
+    def test_point_in_time_with_snapshots_and_backdated_movements(self):
+        StockMovement.objects.filter(product=self.product).update(occurred_at=self.at(date(2025, 1, 1)))
+        self.sell(4, date(2025, 3, 10))
+        self.sell(6, date(2025, 6, 10))
+        call_command('snapshot_stock', date='2025-04-30', stdout=io.StringIO())
+        self.assertEqual(StockSnapshot.objects.get().quantity, 96)
+
+        # Görüntüden önceye yazılan satış görüntüyü de günceller
+        self.sell(1, date(2025, 2, 1))
+        self.assertEqual(StockSnapshot.objects.get().quantity, 95)
+
+        expected = {date(2024, 12, 31): 0, date(2025, 2, 1): 99, date(2025, 5, 1): 95, date(2025, 6, 30): 89}
+        for day, quantity in expected.items():
+            self.assertEqual(stock_at(day).get(self.product.pk, (0, 0))[0], quantity, day)
+
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/products/valuation/', {'date': '2025-05-01'}).data
+        self.assertEqual((data['total_quantity'], data['total_value']), (95, Decimal('950.00')))
+        data = self.client.get('/api/products/valuation/', {'date': '2025-05-01', 'detail': '1'}).data
+        self.assertEqual(data['items'], [{'product_id': self.product.pk, 'sku': 'A1', 'quantity': 95, 'value': Decimal('950.00')}])
+        self.assertEqual(self.client.get('/api/products/valuation/', {'date': '31-12-2025'}).status_code, 400)
+
+    def test_product_with_ledger_history_cannot_be_deleted(self):
+        StockMovement.objects.filter(product=self.product).update(occurred_at=self.at(date(2025, 1, 1)))
+        self.sell(4, date(2025, 3, 10))
+        call_command('snapshot_stock', date='2025-04-30', stdout=io.StringIO())
+        before = self.client.get('/api/products/valuation/', {'date': '2025-05-01'}).data
+
+        response = self.client.delete(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Product.objects.filter(pk=self.product.pk).exists())
+        self.assertEqual(self.client.get('/api/products/valuation/', {'date': '2025-05-01'}).data, before)
+        self.assertEqual((before['total_quantity'], before['total_value']), (96, Decimal('960.00')))
+
+        # Geçmişi olmayan ürün silinebilir
+        unused = Product.objects.create(sku='BOS', name='Hareketsiz')
+        self.assertEqual(self.client.delete(f'/api/products/{unused.pk}/').status_code, 204)
+
+    def test_snapshot_only_for_finished_days(self):
+        with self.assertRaises(ValueError):
+            take_snapshot(self.today)
+
+
+@override_settings(INVENTORY_COSTING='FIFO')
+class FifoCostingTests(TestCase):
+    def setUp(self):
+        from finance.models import Transaction
+
+        self.client = APIClient()
+        self.marketplace = Marketplace.objects.create(name='Trendyol')
+        self.product = Product.objects.create(sku='A1', name='Ürün A', buying_price=Decimal('10'), stock_quantity=10)
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='PURCHASE', order_number='F1',
+            quantity=10, sale_price=0, cost_at_transaction=Decimal('20'), transaction_date=timezone.now(),
+        )
+
+    def checkout(self, items, order_number='B1'):
+        return self.client.post('/api/finance/transactions/bulk_create/', {
+            'common': {'marketplace': self.marketplace.id, 'transaction_date': '2025-03-01', 'order_number': order_number},
+            'items': items,
+        }, format='json')
+
+    def open_layers(self, product):
+        return list(CostLayer.objects.filter(product=product, remaining__gt=0)
+                    .order_by('received_at', 'id').values_list('remaining', 'unit_cost'))
+
+    def test_sales_consume_layers_in_order(self):
+        from finance.models import Transaction
+
+        response = self.client.post('/api/finance/transactions/', {
+            'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+            'order_number': 'S1', 'quantity': 15, 'sale_price': '500.00', 'transaction_date': timezone.now().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        # 10 adet 10'dan + 5 adet 20'den = 200 → birim 13.33
+        tx = Transaction.objects.get(order_number='S1')
+        self.assertEqual(tx.cost_at_transaction, Decimal('13.33'))
+        self.assertEqual(StockMovement.objects.get(transaction=tx).value, Decimal('-200.00'))
+        self.assertEqual(self.open_layers(self.product), [(5, Decimal('20.0000'))])
+
+        # Aynı sepette iki satır: ikincisi son katmanı bitirir, eksiye düşen adet son katman maliyetinden
+        self.checkout([
+            {'product': self.product.id, 'quantity': 3, 'sale_price': '100'},
+            {'product': self.product.id, 'quantity': 4, 'sale_price': '100'},
+        ])
+        costs = list(Transaction.objects.filter(order_number='B1').order_by('id').values_list('cost_at_transaction', flat=True))
+        self.assertEqual(costs, [Decimal('20.00'), Decimal('20.00')])
+        self.assertEqual(self.open_layers(self.product), [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, -2)
+
+    def test_stored_totals_use_the_consumed_layer_cost(self):
+        from finance.models import DailyRollup, Transaction
+
+        # 10 * 10 + 5 * 20 = 200; yuvarlı birim maliyetle 13.33 * 15 = 199.95 olurdu
+        self.client.post('/api/finance/transactions/', {
+            'marketplace': self.marketplace.id, 'product': self.product.id, 'transaction_type': 'SALE',
+            'order_number': 'S1', 'quantity': 15, 'sale_price': '500.00', 'commission_amount': '50.00',
+            'transaction_date': timezone.now().isoformat(),
+        }, format='json')
+        # Sepet: 5 * 20 + 1 * 10.01 = 110.01; yuvarlı birim maliyetle 18.34 * 6 = 110.04 olurdu
+        Transaction.objects.create(
+            marketplace=self.marketplace, product=self.product, transaction_type='PURCHASE', order_number='F2',
+            quantity=2, sale_price=0, cost_at_transaction=Decimal('10.01'), transaction_date=timezone.now(),
+        )
+        self.checkout([{'product': self.product.id, 'quantity': 6, 'sale_price': '300'}])
+
+        for order_number, line_cost in (('S1', Decimal('200.00')), ('B1', Decimal('110.01'))):
+            tx = Transaction.objects.get(order_number=order_number)
+            self.assertEqual(tx.total_cost - tx.commission_amount - tx.shipping_cost, line_cost)
+            self.assertEqual(tx.net_profit, tx.sale_price - tx.total_cost)
+            self.assertEqual(StockMovement.objects.get(transaction=tx).value, -line_cost)
+        rollup = DailyRollup.objects.filter(transaction_type='SALE').aggregate(cost=Sum('cost'))['cost']
+        self.assertEqual(rollup, Decimal('310.01'))
+
+    def test_adjustments_open_and_consume_layers(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.stock_quantity -= 12
+        product.save()
+        # Düzeltme çıkışı da FIFO ile değerlenir: 10 * 10 + 2 * 20
+        self.assertEqual(StockMovement.objects.get(kind='ADJUSTMENT').value, Decimal('-140.00'))
+        self.assertEqual(self.open_layers(product), [(8, Decimal('20.0000'))])
+        quantity, value = stock_at(timezone.localdate(), [product.pk])[product.pk]
+        self.assertEqual((quantity, value), (8, Decimal('160.00')))
+
+    def test_checkout_query_count_does_not_grow_with_basket_size(self):
+        products = [
+            Product.objects.create(sku=f'P{i}', name=f'Ürün {i}', buying_price=Decimal('10'), stock_quantity=100)
+            for i in range(10)
+        ]
+        counts = []
+        for size in (2, 10):
+            with CaptureQueriesContext(connection) as captured:
+                self.checkout([{'product': p.id, 'quantity': 2, 'sale_price': '40'} for p in products[:size]], f'B{size}')
+            counts.append(len(captured))
+        self.assertEqual(counts[0], counts[1])
+
+    @skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN çıktısı SQLite'a özgü")
+    def test_open_layers_are_read_from_the_partial_index(self):
+        query = (CostLayer.objects.filter(product_id__in=[self.product.pk], remaining__gt=0)
+                 .order_by('product_id', 'received_at', 'id'))
+        self.assertIn('costlayer_open_idx', query.explain())
+
+    @override_settings(INVENTORY_COSTING='AVERAGE')
+    def test_average_costing_leaves_layers_alone(self):
+        from finance.models import Transaction
+
+        self.checkout([{'product': self.product.id, 'quantity': 5, 'sale_price': '100'}])
+        self.assertEqual(Transaction.objects.get(order_number='B1').cost_at_transaction, Decimal('15.00'))
+        self.assertEqual(self.open_layers(self.product), [(10, Decimal('10.0000')), (10, Decimal('20.0000'))])
+
+        # Ortalama maliyetle çalışılan dönemden sonra FIFO'ya geçiş: katmanlar mevcut stoktan açılır
+        call_command('reset_cost_layers', stdout=io.StringIO())
+        self.assertEqual(self.open_layers(self.product), [(15, Decimal('15.0000'))])
@@ -1,4 +1,12 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from core.exports import export_response
+from core.pagination import KeysetPagination
+from django.db.models import ProtectedError, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from . import ledger
 from .models import Product
 from .serializers import ProductSerializer
 
@@ -11,4 +19,70 @@ class ProductViewSet(viewsets.ModelViewSet):
     - DELETE /api/products/{id}/ -> Silme
     """
     queryset = Product.objects.all().order_by('-updated_at')
-    serializer_class = ProductSerializer
\ No newline at end of file
+    serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-updated_at', '-id')
+
+    def get_queryset(self):
+        """
+        ?search= ile SKU/barkod başlangıcı ya da ad/nitelik içinde geçen metne göre filtreler
+        (liste ekranı ve işlem girişindeki ürün arama kutusu için).
+        """
+        queryset = super().get_queryset()
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = queryset.filter(
+                Q(sku__istartswith=search) | Q(barcode__startswith=search)
+                | Q(name__icontains=search) | Q(description__icontains=search)
+            )
+        return queryset
+
+    def destroy(self, request, *args, **kwargs):
+        """Stok hareketi ya da işlemi olan ürün silinmez (değerleme ve raporlar geçmişe dayanır)."""
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response(
+                {"error": "Ürünün stok hareketi ya da işlemi var; geçmişi korumak için silinemez."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        Barkod (ya da SKU) ile tek ürün: GET /api/products/lookup/?barcode=869...
+        """
+        barcode, sku = request.query_params.get('barcode'), request.query_params.get('sku')
+        if not barcode and not sku:
+            return Response({"error": "barcode ya da sku parametresi gerekli"}, status=status.HTTP_400_BAD_REQUEST)
+        product = Product.objects.filter(**({'barcode': barcode} if barcode else {'sku': sku})).first()
+        if product is None:
+            return Response({"error": "Ürün bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(product).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Tüm ürünleri CSV/XLSX olarak akıtır: GET /api/products/export/?file_format=xlsx"""
+        rows = (
+            Product.objects.order_by('sku')
+            .values_list('sku', 'barcode', 'name', 'stock_quantity', 'buying_price', 'weighted_cost', 'vat_rate', 'updated_at')
+            .iterator(chunk_size=2000)
+        )
+        headers = ['SKU', 'Barkod', 'Ürün Adı', 'Stok', 'Son Alış Fiyatı', 'Ortalama Maliyet', 'KDV Oranı', 'Güncellenme']
+        return export_response(request, 'urunler', headers, rows, sheet='Ürünler')
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """
+        Tüm kataloğun verilen gün sonundaki stok adedi ve envanter değeri:
+        GET /api/products/valuation/?date=2025-12-31 (&detail=1 ile ürün bazında)
+        En yakın stok görüntüsü + sonrasındaki hareketlerden hesaplanır.
+        """
+        value = request.query_params.get('date')
+        try:
+            day = parse_date(value) if value else timezone.localdate()
+        except ValueError:
+            day = None
+        if day is None:
+            return Response({"error": "date YYYY-AA-GG biçiminde olmalı"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ledger.valuation(day, detail=request.query_params.get('detail') in ('1', 'true', 'True')))
@@ -1,11 +1,11 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { X, Plus, Trash2, Search } from 'lucide-react';
 import { productService, marketplaceService, financeService } from '../services/api';
 
 export default function TransactionModal({ isOpen, onClose, onSave }) {
     const [marketplaces, setMarketplaces] = useState([]);
-    const [allProducts, setAllProducts] = useState([]);
     const [filteredProducts, setFilteredProducts] = useState([]);
+    const searchRef = useRef(0); // Yalnızca en son aramanın sonuçları gösterilir
     const [showSearch, setShowSearch] = useState(false);
     const [searchQuery, setSearchQuery] = useState('');
     const [isSaving, setIsSaving] = useState(false);
@@ -25,10 +25,8 @@ export default function TransactionModal({ isOpen, onClose, onSave }) {
 
     const loadData = async () => {
         try {
-            const [mpRes, prodRes] = await Promise.all([marketplaceService.getAll(), productService.getAll()]);
+            const mpRes = await marketplaceService.getAll();
             setMarketplaces(mpRes.data);
-            setAllProducts(prodRes.data);
-            setFilteredProducts(prodRes.data);
         } catch (e) { console.error(e); }
     };
 
@@ -38,11 +36,18 @@ export default function TransactionModal({ isOpen, onClose, onSave }) {
         setCommonData({ marketplace: '', transaction_date: new Date().toISOString().split('T')[0], order_number: '', transaction_type: 'SALE', shipping_cost: '0' });
     };
 
+    // Ürünler sunucuda aranır (tüm katalog indirilmez); yazarken kısa bir gecikmeyle istek gider
     useEffect(() => {
-        const query = searchQuery.toLowerCase();
-        const filtered = allProducts.filter(p => (p.name || '').toLowerCase().includes(query) || (p.description || '').toLowerCase().includes(query));
-        setFilteredProducts(filtered);
-    }, [searchQuery, allProducts]);
+        if (!isOpen || !showSearch) return;
+        const timer = setTimeout(async () => {
+            const request = ++searchRef.current;
+            try {
+                const res = await productService.search(searchQuery.trim());
+                if (request === searchRef.current) setFilteredProducts(res.data.results);
+            } catch (e) { console.error(e); }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [searchQuery, showSearch, isOpen]);
 
     const selectProduct = (p) => {
         setCurrentItem({ ...currentItem, product: p.id, product_name: `${p.name} - ${p.description || ''}`, sale_price: p.buying_price ? (parseFloat(p.buying_price) * 1.5).toFixed(2) : '' });
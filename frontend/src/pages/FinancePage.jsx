@@ -1,12 +1,13 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { financeService, marketplaceService } from '../services/api'; // marketplaceService eklendi
-import { Search, DollarSign, Plus, ArrowUpDown, Trash2, Filter } from 'lucide-react'; // Filter ikonu eklendi
+import { Search, DollarSign, Plus, ArrowUpDown, Trash2, Filter, Download } from 'lucide-react'; // Filter ikonu eklendi
 import TransactionModal from '../components/TransactionModal';
 
 export default function FinancePage() {
   const [transactions, setTransactions] = useState([]);
   const [marketplaces, setMarketplaces] = useState([]); // Pazaryeri listesi için state
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null); // Sonraki sayfanın imleci (yoksa liste bitti)
   
   // Filtre State'leri
   const [searchTerm, setSearchTerm] = useState('');
@@ -17,25 +18,51 @@ export default function FinancePage() {
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [selectedIds, setSelectedIds] = useState([]);
 
+  const requestRef = useRef(0); // Yalnızca en son aramanın yanıtı listeye yazılır
+
   useEffect(() => {
-    fetchData();
+    marketplaceService.getAll()
+      .then(res => setMarketplaces(res.data))
+      .catch(error => console.error("Pazaryerleri çekilemedi", error));
   }, []);
 
-  const fetchData = async () => {
+  // Arama ve pazaryeri filtresi sunucuda uygulanır; değiştiklerinde liste ilk sayfadan
+  // (imleçsiz) yeniden çekilir. Yazarken her tuşta istek gitmesin diye kısa bir gecikme var.
+  useEffect(() => {
+    const timer = setTimeout(fetchTransactions, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, selectedMarketplace]);
+
+  const listParams = () => ({
+    ...(searchTerm.trim() ? { search: searchTerm.trim() } : {}),
+    ...(selectedMarketplace ? { marketplace: selectedMarketplace } : {}),
+  });
+
+  const fetchTransactions = async () => {
+    const request = ++requestRef.current;
     try {
-      // Hem İşlemleri hem Pazaryerlerini aynı anda çekiyoruz
-      const [transRes, mpRes] = await Promise.all([
-          financeService.getAll(),
-          marketplaceService.getAll()
-      ]);
-      
-      setTransactions(transRes.data);
-      setMarketplaces(mpRes.data);
-      setSelectedIds([]); 
+      const res = await financeService.getPage(null, listParams());
+      if (request !== requestRef.current) return;
+      setTransactions(res.data.results);
+      setNextCursor(res.data.next_cursor);
+      setSelectedIds([]);
     } catch (error) {
       console.error("Veriler çekilemedi", error);
     } finally {
-      setLoading(false);
+      if (request === requestRef.current) setLoading(false);
+    }
+  };
+
+  // Sonraki sayfa: aynı filtrelerle imleçten devam edilir, her sayfa aynı sürede gelir
+  const loadMore = async () => {
+    const request = requestRef.current;
+    try {
+      const res = await financeService.getPage(nextCursor, listParams());
+      if (request !== requestRef.current) return;
+      setTransactions(prev => [...prev, ...res.data.results]);
+      setNextCursor(res.data.next_cursor);
+    } catch (error) {
+      console.error("Sonraki sayfa çekilemedi", error);
     }
   };
 
@@ -45,7 +72,7 @@ export default function FinancePage() {
           await financeService.create(formData);
           alert("İşlem başarıyla eklendi.");
           setIsModalOpen(false);
-          fetchData();
+          fetchTransactions();
       } catch (error) {
           console.error(error);
           let errorMsg = "Bilinmeyen hata";
@@ -85,7 +112,7 @@ export default function FinancePage() {
   // Seçim Mantığı
   const handleSelectAll = (e) => {
       if (e.target.checked) {
-          const visibleIds = filteredData.map(t => t.id);
+          const visibleIds = sortedData.map(t => t.id);
           setSelectedIds(visibleIds);
       } else {
           setSelectedIds([]);
@@ -106,22 +133,8 @@ export default function FinancePage() {
     setSortConfig({ key, direction });
   };
 
-  // --- GELİŞMİŞ FİLTRELEME VE SIRALAMA ---
-  const filteredData = [...transactions]
-    .filter(t => {
-        // 1. Arama Metni Kontrolü
-        const matchesSearch = 
-            t.order_number.toLowerCase().includes(searchTerm.toLowerCase()) ||
-            (t.product_name && t.product_name.toLowerCase().includes(searchTerm.toLowerCase()));
-        
-        // 2. Pazaryeri Filtresi Kontrolü
-        // DİKKAT: Artık 't.marketplace' DEĞİL 't.marketplace_id' kullanıyoruz!
-        const matchesMarketplace = selectedMarketplace 
-            ? t.marketplace_id === parseInt(selectedMarketplace) 
-            : true;
-
-        return matchesSearch && matchesMarketplace;
-    })
+  // --- SIRALAMA --- (arama ve pazaryeri filtresi sunucuda uygulanır; yüklenen satırlar sıralanır)
+  const sortedData = [...transactions]
     .sort((a, b) => {
         if (!sortConfig.key) return 0;
         let aValue = a[sortConfig.key];
@@ -196,6 +209,10 @@ export default function FinancePage() {
                 />
             </div>
 
+            <a href={financeService.exportUrl('xlsx', listParams())} className="flex items-center gap-2 bg-white border border-gray-300 text-gray-700 px-4 py-2 rounded-lg hover:bg-gray-50 transition-colors shadow-sm whitespace-nowrap">
+                <Download size={20} /> Excel'e Aktar
+            </a>
+
             <button onClick={() => setIsModalOpen(true)} className="flex items-center gap-2 bg-green-600 text-white px-4 py-2 rounded-lg hover:bg-green-700 transition-colors shadow-sm whitespace-nowrap">
                 <Plus size={20} /> Yeni İşlem
             </button>
@@ -209,7 +226,7 @@ export default function FinancePage() {
             <thead className="bg-gray-50 text-gray-600 font-medium border-b">
               <tr>
                 <th className="p-4 w-10">
-                    <input type="checkbox" className="w-4 h-4 rounded border-gray-300 text-blue-600 cursor-pointer" onChange={handleSelectAll} checked={filteredData.length > 0 && selectedIds.length === filteredData.length} />
+                    <input type="checkbox" className="w-4 h-4 rounded border-gray-300 text-blue-600 cursor-pointer" onChange={handleSelectAll} checked={sortedData.length > 0 && selectedIds.length === sortedData.length} />
                 </th>
                 <th className="p-4 cursor-pointer" onClick={() => handleSort('transaction_date')}>Tarih {getSortIcon('transaction_date')}</th>
                 <th className="p-4 cursor-pointer" onClick={() => handleSort('marketplace_name')}>Pazaryeri</th>
@@ -227,10 +244,10 @@ export default function FinancePage() {
             <tbody className="divide-y divide-gray-100">
               {loading ? (
                 <tr><td colSpan="12" className="p-6 text-center text-gray-500">Yükleniyor...</td></tr>
-              ) : filteredData.length === 0 ? (
+              ) : sortedData.length === 0 ? (
                 <tr><td colSpan="12" className="p-6 text-center text-gray-500">Kayıt bulunamadı.</td></tr>
               ) : (
-                filteredData.map((item) => {
+                sortedData.map((item) => {
                     const profit = parseFloat(item.net_profit);
                     const productCost = parseFloat(item.cost_at_transaction) * item.quantity;
                     const salePrice = parseFloat(item.sale_price);
@@ -290,6 +307,11 @@ export default function FinancePage() {
               )}
             </tbody>
           </table>
+          {nextCursor && (
+            <div className="p-4 text-center border-t border-gray-100">
+              <button onClick={loadMore} className="text-sm font-medium text-blue-600 hover:text-blue-800">Daha fazla yükle</button>
+            </div>
+          )}
         </div>
       </div>
 
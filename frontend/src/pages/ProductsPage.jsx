@@ -1,12 +1,13 @@
 import React, { useEffect, useState, useRef } from 'react';
 import { productService } from '../services/api';
-import { Search, Package, Plus, Edit2, CheckCircle, ArrowUpDown, Trash2, Settings2, Check } from 'lucide-react';
+import { Search, Package, Plus, Edit2, CheckCircle, ArrowUpDown, Trash2, Settings2, Check, Download } from 'lucide-react';
 import ProductModal from '../components/ProductModal';
 import EditableCell from '../components/EditableCell';
 
 export default function ProductsPage() {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null); // Sonraki sayfanın imleci (yoksa liste bitti)
   const [searchTerm, setSearchTerm] = useState('');
   const [sortConfig, setSortConfig] = useState({ key: null, direction: 'asc' });
   const [isModalOpen, setIsModalOpen] = useState(false);
@@ -37,15 +38,35 @@ export default function ProductsPage() {
   });
 
   const resizerRef = useRef({ activeCol: null, startX: 0, startWidth: 0 });
+  const requestRef = useRef(0); // Yalnızca en son aramanın yanıtı listeye yazılır
 
-  useEffect(() => { fetchProducts(); }, []);
+  // Arama sunucuda yapılır; terim değişince liste ilk sayfadan (imleçsiz) yeniden çekilir
+  useEffect(() => {
+    const timer = setTimeout(fetchProducts, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const listParams = () => (searchTerm.trim() ? { search: searchTerm.trim() } : {});
 
   const fetchProducts = async () => {
+    const request = ++requestRef.current;
     try {
-      const response = await productService.getAll();
-      setProducts(response.data);
+      const response = await productService.getPage(null, listParams());
+      if (request !== requestRef.current) return;
+      setProducts(response.data.results);
+      setNextCursor(response.data.next_cursor);
     } catch (error) { console.error("Ürünler çekilemedi", error); }
-    finally { setLoading(false); }
+    finally { if (request === requestRef.current) setLoading(false); }
+  };
+
+  const loadMore = async () => {
+    const request = requestRef.current;
+    try {
+      const response = await productService.getPage(nextCursor, listParams());
+      if (request !== requestRef.current) return;
+      setProducts(prev => [...prev, ...response.data.results]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) { console.error("Sonraki sayfa çekilemedi", error); }
   };
 
   // --- RESIZING MANTIK ---
@@ -107,11 +128,8 @@ export default function ProductsPage() {
     return <ArrowUpDown size={14} className={`text-blue-600 ${sortConfig.direction === 'desc' ? 'rotate-180' : ''}`} />;
   };
 
+  // Arama sunucuda uygulanır; burada yalnızca yüklenen satırlar sıralanır
   const processedProducts = [...products]
-    .filter(p => 
-      (p.name || '').toLowerCase().includes(searchTerm.toLowerCase()) || 
-      (p.sku || '').toLowerCase().includes(searchTerm.toLowerCase())
-    )
     .sort((a, b) => {
       if (!sortConfig.key) return 0;
       let aVal = a[sortConfig.key] || '', bVal = b[sortConfig.key] || '';
@@ -181,6 +199,10 @@ export default function ProductsPage() {
             )}
           </div>
 
+          <a href={productService.exportUrl('xlsx')} className="bg-white border border-gray-300 text-gray-700 px-4 py-2 rounded-lg flex items-center gap-2 hover:bg-gray-50">
+            <Download size={20} /> <span className="hidden sm:inline">Excel'e Aktar</span>
+          </a>
+
           <button onClick={() => { setEditingProduct(null); setIsModalOpen(true); }} className="bg-blue-600 text-white px-4 py-2 rounded-lg flex items-center gap-2 hover:bg-blue-700">
             <Plus size={20} /> <span className="hidden sm:inline">Yeni Ürün</span>
           </button>
@@ -225,7 +247,7 @@ export default function ProductsPage() {
                       <div className="flex justify-center gap-2">
                         {lastSavedId === product.id && <CheckCircle size={16} className="text-green-500" />}
                         <button onClick={() => { setEditingProduct(product); setIsModalOpen(true); }} className="text-gray-400 hover:text-blue-600 p-1"><Edit2 size={16} /></button>
-                        <button onClick={() => { if(window.confirm("Silinsin mi?")) productService.delete(product.id).then(() => fetchProducts()) }} className="text-gray-400 hover:text-red-600 p-1"><Trash2 size={16} /></button>
+                        <button onClick={() => { if(window.confirm("Silinsin mi?")) productService.delete(product.id).then(() => fetchProducts()).catch((error) => alert(error.response?.data?.error || "Silinemedi.")) }} className="text-gray-400 hover:text-red-600 p-1"><Trash2 size={16} /></button>
                       </div>
                     </td>
                   )}
@@ -233,6 +255,11 @@ export default function ProductsPage() {
               ))}
             </tbody>
           </table>
+          {nextCursor && (
+            <div className="p-4 text-center border-t border-gray-100">
+              <button onClick={loadMore} className="text-sm font-medium text-blue-600 hover:text-blue-800">Daha fazla yükle</button>
+            </div>
+          )}
         </div>
       </div>
       <ProductModal isOpen={isModalOpen} onClose={() => setIsModalOpen(false)} onSave={handleSaveProduct} productToEdit={editingProduct} />
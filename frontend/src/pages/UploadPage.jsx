@@ -4,16 +4,17 @@ import { Upload, FileSpreadsheet, CheckCircle, AlertCircle } from 'lucide-react'
 import { uploadService } from '../services/api';
 
 export default function UploadPage() {
-    const [file, setFile] = useState(null);
+    const [files, setFiles] = useState([]); // Birden fazla dosya ya da ZIP tek iş olarak yüklenir
     const [status, setStatus] = useState('idle'); // idle, uploading, success, error
     const [message, setMessage] = useState('');
     const [marketplaceId, setMarketplaceId] = useState('1'); // Şimdilik 1 (Trendyol) varsayılan
     const [fileType, setFileType] = useState('SALES');
+    const [errorReportUrl, setErrorReportUrl] = useState(null);
 
     // Sürükle-Bırak Mantığı
     const onDrop = useCallback(acceptedFiles => {
         if (acceptedFiles?.length > 0) {
-            setFile(acceptedFiles[0]);
+            setFiles(acceptedFiles);
             setStatus('idle');
             setMessage('');
         }
@@ -23,27 +24,71 @@ export default function UploadPage() {
         onDrop,
         accept: {
             'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
-            'application/vnd.ms-excel': ['.xls']
-        },
-        maxFiles: 1
+            'application/vnd.ms-excel': ['.xls'],
+            'text/csv': ['.csv'],
+            'text/tab-separated-values': ['.tsv'],
+            'application/zip': ['.zip']
+        }
     });
 
+    const buildFormData = (selected) => {
+        const formData = new FormData();
+        selected.forEach(f => formData.append('files', f));
+        formData.append('marketplace_id', marketplaceId);
+        formData.append('file_type', fileType);
+        return formData;
+    };
+
+    // Önizleme: tüm dosyayı içe aktarmadan önce eşleştirmeyi kontrol et
+    // (birden fazla dosya seçildiyse sunucu ilkini önizler)
+    const handlePreview = async () => {
+        if (files.length === 0) return;
+
+        const formData = buildFormData(files.slice(0, 1));
+
+        try {
+            const preview = (await uploadService.previewExcel(formData)).data;
+            if (preview.missing_fields.length > 0) {
+                setStatus('error');
+                setMessage(`Eksik sütunlar: ${preview.missing_fields.join(', ')}`);
+            } else {
+                const matchRate = preview.sku_match_rate == null ? '-' : `%${Math.round(preview.sku_match_rate * 100)}`;
+                setStatus('success');
+                setMessage(`Eşleştirme hazır. Tahmini ${preview.estimated_rows ?? '?'} satır, SKU eşleşmesi ${matchRate}.`);
+            }
+        } catch (error) {
+            setStatus('error');
+            setMessage(error.response?.data?.error || "Önizleme yapılamadı.");
+        }
+    };
+
     // Gönderme İşlemi
     const handleUpload = async () => {
-        if (!file) return;
+        if (files.length === 0) return;
 
         setStatus('uploading');
-        const formData = new FormData();
-        formData.append('file', file);
-        formData.append('marketplace_id', marketplaceId);
-        formData.append('file_type', fileType);
+        setErrorReportUrl(null);
+        const formData = buildFormData(files);
 
         try {
             const response = await uploadService.uploadExcel(formData);
-            setStatus('success');
-            // Backend'den gelen detaylı mesajı göster (kaç satır eklendi vs.)
-            const detailMsg = `Başarılı! ${response.data.detaylar.created_count} satır işlendi.`;
-            setMessage(detailMsg);
+            // Dosya arka planda işleniyor; iş bitene kadar durumunu yokla
+            const jobId = response.data.job_id;
+            let job = null;
+            do {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                job = (await uploadService.getJob(jobId)).data;
+                setMessage(`İşleniyor... ${job.rows_processed} satır`);
+            } while (job.status === 'PENDING' || job.status === 'RUNNING');
+            setErrorReportUrl(job.error_report_url);
+
+            if (job.status === 'SUCCESS') {
+                setStatus('success');
+                setMessage(`Başarılı! ${job.created_count} satır işlendi.`);
+            } else {
+                setStatus('error');
+                setMessage(job.error || "Bir hata oluştu.");
+            }
         } catch (error) {
             setStatus('error');
             // Backend'den gelen hatayı yakala
@@ -90,22 +135,26 @@ export default function UploadPage() {
                     {...getRootProps()} 
                     className={`border-2 border-dashed rounded-xl p-10 text-center cursor-pointer transition-colors
                         ${isDragActive ? 'border-blue-500 bg-blue-50' : 'border-gray-300 hover:border-blue-400'}
-                        ${file ? 'bg-green-50 border-green-400' : ''}
+                        ${files.length > 0 ? 'bg-green-50 border-green-400' : ''}
                     `}
                 >
                     <input {...getInputProps()} />
                     
-                    {file ? (
+                    {files.length > 0 ? (
                         <div className="flex flex-col items-center text-green-700">
                             <FileSpreadsheet size={48} className="mb-2" />
-                            <p className="font-semibold text-lg">{file.name}</p>
-                            <p className="text-sm opacity-75">Dosya yüklemeye hazır</p>
+                            <p className="font-semibold text-lg">
+                                {files.length === 1 ? files[0].name : `${files.length} dosya seçildi`}
+                            </p>
+                            <p className="text-sm opacity-75">
+                                {files.length === 1 ? 'Dosya yüklemeye hazır' : 'Dosyalar tek iş olarak yüklenecek'}
+                            </p>
                         </div>
                     ) : (
                         <div className="flex flex-col items-center text-gray-500">
                             <Upload size={48} className="mb-2" />
-                            <p className="font-semibold text-lg">Excel dosyasını buraya sürükleyin</p>
-                            <p className="text-sm">veya seçmek için tıklayın</p>
+                            <p className="font-semibold text-lg">Excel dosyalarını ya da ZIP arşivini buraya sürükleyin</p>
+                            <p className="text-sm">veya seçmek için tıklayın (birden fazla dosya seçilebilir)</p>
                         </div>
                     )}
                 </div>
@@ -113,6 +162,11 @@ export default function UploadPage() {
                 {/* 3. Durum Mesajları ve Buton */}
                 <div className="mt-6 flex items-center justify-between">
                     <div className="flex-1 mr-4">
+                        {status === 'uploading' && message && (
+                            <div className="flex items-center text-blue-600 bg-blue-50 p-3 rounded-lg text-sm">
+                                {message}
+                            </div>
+                        )}
                         {status === 'error' && (
                             <div className="flex items-center text-red-600 bg-red-50 p-3 rounded-lg text-sm">
                                 <AlertCircle size={18} className="mr-2" />
@@ -125,13 +179,25 @@ export default function UploadPage() {
                                 {message}
                             </div>
                         )}
+                        {errorReportUrl && (
+                            <a href={errorReportUrl} className="inline-block mt-2 text-sm text-blue-600 hover:underline">
+                                Hatalı satırların raporunu indir (CSV)
+                            </a>
+                        )}
                     </div>
 
+                    <button
+                        onClick={handlePreview}
+                        disabled={files.length === 0 || status === 'uploading'}
+                        className="px-4 py-3 mr-3 rounded-lg font-semibold text-blue-600 border border-blue-600 hover:bg-blue-50 disabled:opacity-50"
+                    >
+                        Önizle
+                    </button>
                     <button
                         onClick={handleUpload}
-                        disabled={!file || status === 'uploading'}
+                        disabled={files.length === 0 || status === 'uploading'}
                         className={`px-6 py-3 rounded-lg font-semibold text-white transition-all
-                            ${!file || status === 'uploading' 
+                            ${files.length === 0 || status === 'uploading' 
                                 ? 'bg-gray-300 cursor-not-allowed' 
                                 : 'bg-blue-600 hover:bg-blue-700 shadow-lg hover:shadow-blue-500/30'}
                         `}
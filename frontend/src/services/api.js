@@ -8,19 +8,35 @@ const api = axios.create({
     headers: { 'Content-Type': 'application/json' }
 });
 
+// Liste uç noktaları imleçle sayfalanır: { results, next_cursor }. Arama ve filtreler sunucuya
+// sorgu parametresi olarak gider; sonraki sayfa aynı parametreler + next_cursor ile istenir.
+const getPage = (url, cursor, params = {}) => api.get(url, { params: { ...params, ...(cursor ? { cursor } : {}) } });
+
 export const uploadService = {
     uploadExcel: async (formData) => await api.post('/integrations/upload/', formData, { headers: { 'Content-Type': 'multipart/form-data' } }),
+    // Arka plan içe aktarma işinin durumu (ilerleme, satır/sn, sonuç)
+    getJob: async (id) => await api.get(`/integrations/jobs/${id}/`),
+    // Dry-run: yalnızca ilk satırları okuyup eşleştirmeyi kontrol eder, hiçbir şey kaydetmez
+    previewExcel: async (formData) => await api.post('/integrations/upload/preview/', formData, { headers: { 'Content-Type': 'multipart/form-data' } }),
 };
 
 export const productService = {
-    getAll: async () => await api.get('/products/'),
+    getPage: async (cursor, params) => await getPage('/products/', cursor, params),
+    // Ürün seçim kutusu için sunucu tarafı arama (SKU/barkod başı, ad/nitelik içinde)
+    search: async (query, limit = 20) => await getPage('/products/', null, { search: query, page_size: limit }),
+    // Dışa aktarma sunucudan akış olarak iner; tarayıcı doğrudan bu adrese yönlendirilir
+    exportUrl: (fileFormat = 'xlsx') => `${API_URL}/products/export/?file_format=${fileFormat}`,
+    // Barkod okutma: tek ürünü indeksli barkod aramasıyla getirir
+    getByBarcode: async (barcode) => await api.get('/products/lookup/', { params: { barcode } }),
     create: async (data) => await api.post('/products/', data),
     update: async (id, data) => await api.put(`/products/${id}/`, data),
     delete: async (id) => await api.delete(`/products/${id}/`)
 };
 
 export const financeService = {
-    getAll: async () => await api.get('/finance/transactions/'),
+    getPage: async (cursor, params) => await getPage('/finance/transactions/', cursor, params),
+    exportUrl: (fileFormat = 'xlsx', params = {}) =>
+        `${API_URL}/finance/transactions/export/?${new URLSearchParams({ ...params, file_format: fileFormat })}`,
     // Manuel sepet girişi için tek kapı
     bulkCreate: async (data) => await api.post('/finance/transactions/bulk_create/', data),
     delete: async (id) => await api.delete(`/finance/transactions/${id}/`),